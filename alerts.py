@@ -0,0 +1,204 @@
+"""
+Détection d'anomalies et alertes GEO-Radar (étape post-scan de monitor.py).
+
+Pour chaque (client, requête, moteur) — et "GLOBAL" pour Score_Global — on garde
+des statistiques glissantes : moyenne et variance exponentielles (EWMA), nombre
+d'observations, dernières sources, concurrents déjà vus. Chaque nouvelle ligne
+met à jour cet état en O(1), sans relire l'historique.
+
+Anomalies signalées :
+- chute de score : z-score EWMA sous -GEO_ALERTES_Z et baisse d'au moins GEO_ALERTES_BAISSE points,
+- nouveau concurrent principal jamais vu pour la requête,
+- perte de source : le domaine du client n'est plus cité par un moteur qui le citait.
+
+Les alertes partent vers des "sinks" déclarés dans SINKS (console, fichier JSONL,
+webhook) ; en ajouter un = ajouter une entrée au registre.
+"""
+import json
+import math
+
+import requests
+
+from domains import registrable_domain
+
+ETAT_HEADERS = ["Client", "Mot_Cle", "Moteur", "N", "Moyenne", "Variance", "Sources", "Concurrents", "Date"]
+GLOBAL = "GLOBAL"
+# Nombre max de concurrents mémorisés par requête (les plus récents)
+MAX_CONCURRENTS = 50
+
+
+# =============================================================================
+# 1. DÉTECTION
+# =============================================================================
+def parse_sources_str(sources_str):
+    """Sources_Detectees ("PPLX:a.fr,b.com|GEM:...") -> {code: [domaines]}"""
+    result = {}
+    for part in str(sources_str or "").split("|"):
+        code, sep, sources = part.partition(":")
+        if sep:
+            result[code.strip()] = [s.strip() for s in sources.split(",") if s.strip() and s.strip() != "N/A"]
+    return result
+
+def ewma_update(state, value, alpha):
+    """Met à jour moyenne et variance exponentielles (formules incrémentales de West)"""
+    if state["n"] == 0:
+        state["moyenne"], state["variance"] = float(value), 0.0
+    else:
+        diff = value - state["moyenne"]
+        incr = alpha * diff
+        state["moyenne"] += incr
+        state["variance"] = (1 - alpha) * (state["variance"] + diff * incr)
+    state["n"] += 1
+
+class AnomalyDetector:
+    """État glissant par clé et règles de détection"""
+
+    def __init__(self, state=None, alpha=0.3, z_seuil=3.0, baisse_min=15, historique_min=3, ecart_type_min=5.0):
+        self.state = state if state is not None else {}
+        self.alpha = alpha
+        self.z_seuil = z_seuil
+        self.baisse_min = baisse_min
+        self.historique_min = historique_min
+        self.ecart_type_min = ecart_type_min
+
+    def _get(self, key):
+        if key not in self.state:
+            self.state[key] = {"n": 0, "moyenne": 0.0, "variance": 0.0, "sources": "", "concurrents": "", "date": ""}
+        return self.state[key]
+
+    def _check_score(self, key, score, date):
+        """Teste la chute de score avant d'intégrer la nouvelle valeur à l'état"""
+        st = self._get(key)
+        alert = None
+        if st["n"] >= self.historique_min:
+            std = max(math.sqrt(st["variance"]), self.ecart_type_min)
+            z = (score - st["moyenne"]) / std
+            if z <= -self.z_seuil and st["moyenne"] - score >= self.baisse_min:
+                alert = {
+                    "type": "chute_score", "client": key[0], "mot_cle": key[1], "moteur": key[2],
+                    "message": f"Score {key[2]} {st['moyenne']:.0f} → {score:.0f} (z={z:.1f})",
+                    "valeur": score, "reference": round(st["moyenne"], 1), "date": date,
+                }
+        ewma_update(st, score, self.alpha)
+        st["date"] = date
+        return alert
+
+    def observe(self, row, codes, target_domain):
+        """Intègre une ligne de LOGS_RESULTATS et retourne la liste des anomalies détectées"""
+        client_name, query, date = row["Client"], row["Mot_Cle"], row.get("Date", "")
+        alerts = []
+
+        for code in codes:
+            key = (client_name, query, code)
+            alert = self._check_score(key, float(row.get(f"Score_{code}", 0) or 0), date)
+            if alert:
+                alerts.append(alert)
+
+        global_key = (client_name, query, GLOBAL)
+        alert = self._check_score(global_key, float(row.get("Score_Global", 0) or 0), date)
+        if alert:
+            alerts.append(alert)
+
+        # Perte de source : le domaine client disparaît des sources d'un moteur
+        parsed = parse_sources_str(row.get("Sources_Detectees", ""))
+        for code in codes:
+            st = self.state[(client_name, query, code)]
+            current = [registrable_domain(s) or s.lower() for s in parsed.get(code, [])]
+            before = st["sources"].split(",") if st["sources"] else []
+            if target_domain and target_domain in before and target_domain not in current:
+                alerts.append({
+                    "type": "perte_source", "client": client_name, "mot_cle": query, "moteur": code,
+                    "message": f"{target_domain} n'est plus cité par {code}",
+                    "valeur": ",".join(current), "reference": st["sources"], "date": date,
+                })
+            st["sources"] = ",".join(current)
+
+        # Nouveau concurrent principal
+        # (domaine enregistrable : www.darty.com, darty.com et https://darty.com/ sont le même concurrent ;
+        # l'état déjà stocké est normalisé de la même façon)
+        competitor = (row.get("Concurrent_Principal") or "N/A").strip()
+        if competitor != "N/A":
+            competitor = registrable_domain(competitor) or competitor.lower()
+        st = self.state[global_key]
+        known = [registrable_domain(c) or c for c in st["concurrents"].split(",")] if st["concurrents"] else []
+        if competitor != "N/A" and competitor not in known:
+            if st["n"] > 1:
+                alerts.append({
+                    "type": "nouveau_concurrent", "client": client_name, "mot_cle": query, "moteur": GLOBAL,
+                    "message": f"Nouveau concurrent principal : {competitor}",
+                    "valeur": competitor, "reference": "", "date": date,
+                })
+            st["concurrents"] = ",".join((known + [competitor])[-MAX_CONCURRENTS:])
+
+        return alerts
+
+
+# =============================================================================
+# 2. PERSISTANCE DE L'ÉTAT (feuille ALERTES_ETAT)
+# =============================================================================
+def load_state(values):
+    """Relit l'état depuis les valeurs de la feuille (en-têtes en première ligne)"""
+    state = {}
+    for row in values[1:]:
+        row = row + [""] * (len(ETAT_HEADERS) - len(row))
+        client_name, query, code, n, mean, var, sources, competitors, date = row[:9]
+        try:
+            state[(client_name, query, code)] = {
+                "n": int(n), "moyenne": float(mean), "variance": float(var),
+                "sources": sources, "concurrents": competitors, "date": date,
+            }
+        except ValueError:
+            continue
+    return state
+
+def dump_state(state):
+    """Lignes de la feuille ALERTES_ETAT (sans en-têtes)"""
+    return [
+        [key[0], key[1], key[2], st["n"], round(st["moyenne"], 3), round(st["variance"], 3),
+         st["sources"], st["concurrents"], st["date"]]
+        for key, st in sorted(state.items())
+    ]
+
+
+# =============================================================================
+# 3. SINKS
+# =============================================================================
+def console_sink(alerts, settings):
+    for alert in alerts:
+        print(f"   🚨 [{alert['client']}] {alert['mot_cle']} : {alert['message']}")
+
+def file_sink(alerts, settings):
+    """Ajoute les alertes au fichier JSONL (GEO_ALERTES_FICHIER, défaut alertes.jsonl)"""
+    with open(settings.get("fichier") or "alertes.jsonl", "a", encoding="utf-8") as f:
+        for alert in alerts:
+            f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+def webhook_sink(alerts, settings):
+    """POST JSON des alertes vers GEO_ALERTES_WEBHOOK (Slack, Teams, n8n...)"""
+    url = settings.get("webhook")
+    if not url:
+        print("   ⚠️ Sink webhook activé sans GEO_ALERTES_WEBHOOK")
+        return
+    text = "\n".join(f"[{a['client']}] {a['mot_cle']} : {a['message']}" for a in alerts)
+    r = requests.post(url, json={"text": f"🚨 GEO-Radar : {len(alerts)} alerte(s)\n{text}", "alertes": alerts}, timeout=30)
+    r.raise_for_status()
+
+SINKS = {
+    "console": console_sink,
+    "fichier": file_sink,
+    "webhook": webhook_sink,
+}
+
+def dispatch(alerts, sink_names, settings):
+    """Envoie les alertes à chaque sink demandé ; l'échec d'un sink n'empêche pas les autres"""
+    if not alerts:
+        return
+    for name in sink_names:
+        sink = SINKS.get(name)
+        if sink is None:
+            print(f"   ⚠️ Sink d'alertes inconnu : {name}")
+            continue
+        try:
+            sink(alerts, settings)
+        except Exception as e:
+            print(f"   ⚠️ Sink {name} en échec : {e}")
@@ -9,35 +9,33 @@ from datetime import datetime, timedelta
 from google.oauth2.service_account import Credentials
 from collections import Counter
 import io
+import html
+import numpy as np
+import threading
+import time
+
+from engines import get_engine_meta, engine_codes_from_columns
+from stats import Z_95, parse_stats, mean_variance
+from storage import decode_text, resolve_text_refs
+from schema import apply_schema
+from diff_engine import sentence_diff
+import cocitation
+from domains import registrable_domain
+import search_index
+import clients
+import topics
 
 # =============================================================================
 # 1. CONFIGURATION CLIENTS
 # =============================================================================
-CONFIG_CLIENTS = {
-    "SPF": {
-        "url_cible": "tabac-info-service.fr",
-        "urls_partenaires": ["sante.gouv.fr", "santepubliquefrance.fr", "ameli.fr", "mois-sans-tabac.tabac-info-service.fr"],
-        "mots_signatures": ["3989", "kit gratuit", "accompagnement", "défi collectif", "30 jours", "inscription", 
-                           "consultation", "tabacologue", "pharmacies partenaires", "espace personnel", 
-                           "app gratuite", "coaching", "suivi", "Mois sans tabac"],
-        "couleur": "#4F46E5"
-    },
-    "Conforama": {
-        "url_cible": "conforama.fr",
-        "urls_partenaires": [],
-        "mots_signatures": ["confo", "canapé convertible", "stock", "matelas ressorts", "mémoire de forme",
-                           "hublot", "livraison gratuite", "garantie", "design", "velours", "confort",
-                           "bon plan", "promo", "électroménager"],
-        "couleur": "#DC2626"
-    },
-    "IKEA": {
-        "url_cible": "ikea.com",
-        "urls_partenaires": [],
-        "mots_signatures": ["EKTORP", "KIVIK", "design suédois", "PAX", "BILLY", "gain de place",
-                           "BEKANT", "METOD", "plan de travail", "îlot central"],
-        "couleur": "#0058A3"
-    }
-}
+# Fiches client (URL cible, partenaires, mots signatures, couleur) : registre partagé
+# avec monitor.py (clients.py), chargé depuis clients.json et la feuille CONFIG_CIBLES.
+# Voir get_config_values() et la section 4.
+
+# Copy-on-Write : sélections et assign() partagent les colonnes du jeu de données commun
+# au lieu de les copier (comportement natif à partir de pandas 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 # =============================================================================
 # 2. CONFIGURATION STREAMLIT & STYLES
@@ -182,8 +180,6 @@ st.markdown("""
         justify-content: space-between;
         align-items: center;
     }
-    .motor-header.pplx { background: linear-gradient(135deg, #8B5CF6, #7C3AED); }
-    .motor-header.gem { background: linear-gradient(135deg, #10B981, #059669); }
     
     /* Citation badge */
     .citation-yes { 
@@ -310,9 +306,9 @@ def _fix_private_key(creds):
         creds["private_key"] = pk
     return creds
 
-@st.cache_resource(ttl=600)
-def get_data():
-    """Charge les données depuis Google Sheets"""
+@st.cache_resource
+def get_workbook():
+    """Connexion au classeur GEO-Radar_DATA (une fois par processus)"""
     raw = st.secrets["GOOGLE_JSON_KEY"]
 
     # Gère les deux cas : chaîne JSON ou dict déjà parsé (AttrDict Streamlit)
@@ -327,17 +323,31 @@ def get_data():
     scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
     creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
     client = gspread.authorize(creds)
-    sh = client.open("GEO-Radar_DATA")
-    ws = sh.worksheet("LOGS_RESULTATS")
+    return client.open("GEO-Radar_DATA")
 
-    # Récupère toutes les valeurs et crée le DataFrame manuellement
-    # pour gérer les colonnes vides ou en double
-    all_values = ws.get_all_values()
-    if not all_values:
-        return pd.DataFrame()
+@st.cache_data(ttl=600)
+def get_config_values():
+    """Lignes de CONFIG_CIBLES pour le registre clients (vide si la feuille est inaccessible)"""
+    try:
+        return get_workbook().worksheet("CONFIG_CIBLES").get_all_values()
+    except Exception:
+        return []
 
-    headers = all_values[0]
-    data = all_values[1:]
+@st.cache_resource(ttl=600)
+def get_client_registry():
+    """
+    Registre clients, construit une fois par rafraîchissement de CONFIG_CIBLES (même TTL) :
+    les reruns Streamlit ne relisent ni ne réempreintent les valeurs de la feuille.
+    """
+    return clients.get_registry(get_config_values())
+
+def build_dataframe(headers, data):
+    """
+    Crée le DataFrame manuellement à partir des valeurs brutes de LOGS_RESULTATS
+    pour gérer les colonnes vides ou en double
+    """
+    if not headers:
+        return pd.DataFrame()
 
     # Filtre les colonnes vides et renomme les doublons
     clean_headers = []
@@ -352,139 +362,328 @@ def get_data():
             seen[h] = 0
             clean_headers.append((i, h))
 
-    # Crée le DataFrame avec seulement les colonnes valides
-    df_data = [[row[i] for i, _ in clean_headers] for row in data]
+    # Crée le DataFrame avec seulement les colonnes valides (lignes courtes complétées)
+    df_data = [[row[i] if i < len(row) else '' for i, _ in clean_headers] for row in data]
     df = pd.DataFrame(df_data, columns=[h for _, h in clean_headers])
 
-    # Convertit toutes les colonnes contenant "Score" ou "score" en numérique
-    for col in df.columns:
-        if 'score' in col.lower() or col in ['Position', 'Reco']:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    if 'Timestamp' in df.columns:
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+    # monitor.py écrit la date dans la colonne "Date" (types fixés par schema.apply_schema)
+    if 'Timestamp' not in df.columns and 'Date' in df.columns:
+        df = df.rename(columns={'Date': 'Timestamp'})
     return df
 
+@st.cache_data(ttl=30)
+def get_data_marker():
+    """
+    Marqueur de version publié par monitor.py dans la feuille METADONNEES
+    (lignes, dernière date, colonnes). Seule lecture périodique : une cellule de métadonnées
+    toutes les 30 s au lieu de tout LOGS_RESULTATS. None si la feuille n'existe pas.
+    """
+    try:
+        values = get_workbook().worksheet("METADONNEES").get_all_values()
+        meta = {row[0]: row[1] for row in values[1:] if len(row) >= 2}
+        return {"version": meta["version"], "lignes": int(meta["lignes"]), "colonnes": int(meta["colonnes"])}
+    except Exception:
+        return None
+
+@st.cache_resource
+def get_data_store():
+    """Dernier jeu de données chargé, partagé par toutes les sessions"""
+    return {"lock": threading.Lock(), "version": None, "lignes": 0, "headers": [], "df": None}
+
+def get_data():
+    """
+    Charge les données depuis Google Sheets, seulement quand le marqueur de version change.
+    Le DataFrame renvoyé est partagé par toutes les sessions : il ne doit jamais être modifié
+    (les sessions n'en sélectionnent que des positions, voir build_client_index()).
+    Mêmes colonnes et lignes ajoutées : seules les nouvelles lignes sont téléchargées et
+    ajoutées au jeu partagé ; sinon rechargement complet. Sans marqueur (monitor antérieur
+    à METADONNEES), rechargement complet toutes les 10 minutes comme auparavant.
+    """
+    marker = get_data_marker() or {"version": f"ttl-{int(time.time() // 600)}", "lignes": None, "colonnes": None}
+    store = get_data_store()
+    with store["lock"]:
+        if store["df"] is not None and store["version"] == marker["version"]:
+            return store["df"]
+
+        ws = get_workbook().worksheet("LOGS_RESULTATS")
+        headers = store["headers"]
+        extend = (
+            store["df"] is not None and marker["lignes"] is not None
+            and marker["lignes"] > store["lignes"] and marker["colonnes"] == len(headers)
+        )
+        if extend:
+            end = gspread.utils.rowcol_to_a1(marker["lignes"] + 1, len(headers))
+            new_rows = ws.get(f"A{store['lignes'] + 2}:{end}")
+            # Catégories différentes des deux côtés : la concaténation repasse en objets, retypés plus bas
+            df = pd.concat([store["df"], apply_schema(build_dataframe(headers, new_rows))], ignore_index=True)
+            lignes = store["lignes"] + len(new_rows)
+        else:
+            all_values = ws.get_all_values()
+            headers = all_values[0] if all_values else []
+            df = build_dataframe(headers, all_values[1:])
+            lignes = max(0, len(all_values) - 1)
+
+        # Stockage delta : les références "REF::<ligne>" pointent vers le texte complet
+        df = apply_schema(resolve_text_refs(df))
+        store.update(version=marker["version"], lignes=lignes, headers=headers, df=df)
+        return df
+
+def get_data_version(df):
+    """Version du jeu de données : nombre de lignes et dernier horodatage"""
+    if df.empty or 'Timestamp' not in df.columns:
+        return (len(df), "")
+    return (len(df), str(df['Timestamp'].max()))
+
+@st.cache_resource
+def sync_search_index(version, _df, _codes):
+    """Indexe les nouvelles réponses une seule fois par version des données"""
+    return search_index.sync_index(_df, _codes, parse_sources)
+
+@st.cache_resource
+def build_query_index(version, _df):
+    """
+    Index (client, requête) -> positions des lignes dans df, de la plus récente à la plus ancienne.
+    Construit une seule fois par version des données.
+    """
+    if _df.empty:
+        return {}
+    timestamps = _df['Timestamp'].to_numpy()
+    index = {}
+    for key, positions in _df.groupby(['Client', 'Mot_Cle'], sort=False, observed=True).indices.items():
+        index[key] = positions[np.argsort(timestamps[positions], kind='stable')[::-1]]
+    return index
+
+@st.cache_resource
+def build_client_index(version, _df):
+    """
+    Index partagé par client, construit une fois par version des données :
+    positions des lignes triées par date et dates (jour) correspondantes, pour
+    sélectionner une période par recherche dichotomique sans parcourir df.
+    """
+    index = {"clients": [], "positions": {}, "jours": {}, "min": None, "max": None}
+    if _df.empty:
+        return index
+    timestamps = _df['Timestamp'].to_numpy()
+    for client_name, positions in _df.groupby('Client', sort=False, observed=True).indices.items():
+        positions = positions[np.argsort(timestamps[positions], kind='stable')]
+        index["positions"][client_name] = positions
+        index["jours"][client_name] = timestamps[positions].astype('datetime64[D]')
+    index["clients"] = list(_df['Client'].unique())
+    index["min"], index["max"] = _df['Timestamp'].min(), _df['Timestamp'].max()
+    return index
+
+def select_client_rows(client_index, client, start_date, end_date):
+    """Positions des lignes d'un client dans la période (tranche de l'index partagé, sans copie)"""
+    positions = client_index["positions"].get(client, np.array([], dtype=int))
+    if len(positions) == 0:
+        return positions
+    days = client_index["jours"][client]
+    lo = np.searchsorted(days, np.datetime64(start_date), side='left')
+    hi = np.searchsorted(days, np.datetime64(end_date), side='right')
+    return positions[lo:hi]
+
+@st.cache_resource
+def get_periods(version, granularity, _df):
+    """Période (jour, début de semaine ou de mois) de chaque ligne, calculée une fois par version"""
+    if _df.empty:
+        return np.array([], dtype=object)
+    timestamps = _df['Timestamp']
+    if granularity == "Semaine":
+        periods = timestamps.dt.to_period('W').dt.start_time
+    elif granularity == "Mois":
+        periods = timestamps.dt.to_period('M').dt.start_time
+    else:
+        periods = timestamps
+    return periods.dt.date.to_numpy()
+
+def get_timeline(query_index, timestamps, client, query, start_date, end_date):
+    """
+    Positions des réponses d'une (client, requête) dans la période, plus récentes d'abord.
+    timestamps : colonne Timestamp (tableau numpy) du jeu qui a servi à construire query_index.
+    """
+    positions = query_index.get((client, query), np.array([], dtype=int))
+    if len(positions) == 0:
+        return positions
+    dates = timestamps[positions].astype('datetime64[D]')
+    mask = (dates >= np.datetime64(start_date)) & (dates <= np.datetime64(end_date))
+    return positions[mask]
+
+@st.cache_data
+def get_cocitation_graph(version, client, start_date, end_date, max_nodes=60):
+    """
+    Graphe de co-citation d'un client sur une période (une fois par version des données).
+    Retourne (nœuds : domaine, citations, centralité, cluster, x, y ; arêtes affichées).
+    """
+    edges, counts = search_index.get_cocitations(client, start_date, end_date)
+    adj = cocitation.build_graph(edges)
+    if not adj:
+        return pd.DataFrame(), []
+    rank = cocitation.pagerank(adj)
+    clusters = cocitation.label_propagation(adj)
+
+    shown = sorted(adj, key=lambda d: -rank[d])[:max_nodes]
+    layout = cocitation.spring_layout(adj, shown)
+    nodes = pd.DataFrame([{
+        'domaine': d, 'citations': counts.get(d, 0), 'centralite': rank[d],
+        'cluster': clusters[d], 'x': layout[d][0], 'y': layout[d][1]
+    } for d in shown])
+    shown_set = set(shown)
+    shown_edges = [(a, b, w) for a, b, w in edges if a in shown_set and b in shown_set]
+    return nodes, shown_edges
+
 def get_client_config(client_name):
-    """Récupère la config d'un client"""
-    return CONFIG_CLIENTS.get(client_name, {
-        "url_cible": "",
-        "urls_partenaires": [],
-        "mots_signatures": [],
-        "couleur": "#6366f1"
-    })
+    """Récupère la config d'un client (registre partagé, valeurs par défaut s'il est inconnu)"""
+    return registry.get(client_name)
 
-def parse_sources(sources_str):
-    """Parse la colonne Sources_Detectees"""
-    result = {"PPLX": [], "GEM": [], "GPT": []}
+def parse_sources(sources_str, codes=()):
+    """Parse la colonne Sources_Detectees ("PPLX:a.fr,b.com|GEM:...|<CODE>:...")"""
+    result = {code: [] for code in codes}
     if not sources_str or pd.isna(sources_str) or sources_str == "":
         return result
 
-    parts = str(sources_str).split("|")
-    for part in parts:
-        part = part.strip()
-        if part.startswith("PPLX:"):
-            sources = part.replace("PPLX:", "").strip()
-            if sources and sources != "N/A":
-                result["PPLX"] = [s.strip() for s in sources.split(",") if s.strip() and s.strip() != "N/A"]
-        elif part.startswith("GEM:"):
-            sources = part.replace("GEM:", "").strip()
-            if sources and sources != "N/A":
-                result["GEM"] = [s.strip() for s in sources.split(",") if s.strip() and s.strip() != "N/A"]
-        elif part.startswith("GPT:"):
-            sources = part.replace("GPT:", "").strip()
-            if sources and sources != "N/A":
-                result["GPT"] = [s.strip() for s in sources.split(",") if s.strip() and s.strip() != "N/A"]
+    for part in str(sources_str).split("|"):
+        code, sep, sources = part.strip().partition(":")
+        if not sep:
+            continue
+        sources = sources.strip()
+        if sources and sources != "N/A":
+            result[code.strip()] = [s.strip() for s in sources.split(",") if s.strip() and s.strip() != "N/A"]
     return result
 
+def get_friendly_domains(config):
+    """Domaines enregistrables de l'URL cible et des partenaires d'un client"""
+    matcher = registry.matcher(config.get("nom", ""))
+    return matcher.cible, matcher.partenaires
+
 def classify_source(source, config):
-    """Classifie une source : client, partenaire ou concurrent"""
-    source_lower = source.lower()
-    url_cible = config.get("url_cible", "").lower()
-    urls_partenaires = [u.lower() for u in config.get("urls_partenaires", [])]
-    
-    if url_cible and url_cible in source_lower:
-        return "client"
-    for partenaire in urls_partenaires:
-        if partenaire and partenaire in source_lower:
-            return "partenaire"
-    return "concurrent"
+    """Classifie une source : client, partenaire ou concurrent (comparaison des domaines enregistrables)"""
+    return registry.matcher(config.get("nom", "")).classify(source)
 
 def analyze_all_sources(df, config):
     """Analyse complète de toutes les sources citées"""
-    all_sources_pplx = []
-    all_sources_gem = []
-    all_sources_combined = []
+    codes = engine_codes_from_columns(df.columns)
+    counts = {code: Counter() for code in codes}
+    count_combined = Counter()
     
     for _, row in df.iterrows():
-        parsed = parse_sources(row.get('Sources_Detectees', ''))
-        all_sources_pplx.extend(parsed["PPLX"])
-        all_sources_gem.extend(parsed["GEM"])
-        all_sources_combined.extend(parsed["PPLX"] + parsed["GEM"])
-    
-    count_pplx = Counter(all_sources_pplx)
-    count_gem = Counter(all_sources_gem)
-    count_combined = Counter(all_sources_combined)
+        parsed = parse_sources(row.get('Sources_Detectees', ''), codes)
+        for code in codes:
+            # Sous-domaines et variantes d'URL comptés sous le même domaine enregistrable
+            domains = [registrable_domain(src) or src.lower() for src in parsed[code]]
+            counts[code].update(domains)
+            count_combined.update(domains)
     
     sources_analysis = []
     for source, count in count_combined.most_common():
         classification = classify_source(source, config)
-        sources_analysis.append({
-            "source": source,
-            "total": count,
-            "pplx": count_pplx.get(source, 0),
-            "gem": count_gem.get(source, 0),
-            "type": classification
-        })
+        entry = {"source": source, "total": count}
+        for code in codes:
+            entry[code.lower()] = counts[code].get(source, 0)
+        entry["type"] = classification
+        sources_analysis.append(entry)
     
     return pd.DataFrame(sources_analysis)
 
 def calculate_visibility_metrics(df, config):
-    """Calcule les métriques de visibilité"""
+    """Calcule les métriques de visibilité (globales et par moteur)"""
+    codes = engine_codes_from_columns(df.columns)
     total_queries = len(df)
     if total_queries == 0:
-        return {"taux_citation": 0, "taux_pplx": 0, "taux_gem": 0, "part_voix": 0, "nb_requetes": 0, "nb_cite": 0}
+        return {"taux_citation": 0, "taux_moteurs": {code: 0 for code in codes}, "part_voix": 0, "nb_requetes": 0, "nb_cite": 0}
     
-    url_cible = config.get("url_cible", "").lower()
-    urls_partenaires = [u.lower() for u in config.get("urls_partenaires", [])]
-    all_friendly_urls = [url_cible] + urls_partenaires
+    cible, partenaires = get_friendly_domains(config)
+    friendly = ({cible} | partenaires) - {""}
     
-    cited_pplx = 0
-    cited_gem = 0
+    cited = {code: 0 for code in codes}
     cited_any = 0
     total_sources = 0
     client_sources = 0
     
     for _, row in df.iterrows():
-        parsed = parse_sources(row.get('Sources_Detectees', ''))
-        pplx_sources_lower = [s.lower() for s in parsed["PPLX"]]
-        gem_sources_lower = [s.lower() for s in parsed["GEM"]]
+        parsed = parse_sources(row.get('Sources_Detectees', ''), codes)
         
-        is_cited_pplx = any(url in " ".join(pplx_sources_lower) for url in all_friendly_urls if url)
-        is_cited_gem = any(url in " ".join(gem_sources_lower) for url in all_friendly_urls if url)
-        
-        if is_cited_pplx:
-            cited_pplx += 1
-        if is_cited_gem:
-            cited_gem += 1
-        if is_cited_pplx or is_cited_gem:
+        is_cited_any = False
+        for code in codes:
+            if any(registrable_domain(src) in friendly for src in parsed[code]):
+                cited[code] += 1
+                is_cited_any = True
+        if is_cited_any:
             cited_any += 1
         
-        all_sources = parsed["PPLX"] + parsed["GEM"]
+        all_sources = [src for code in codes for src in parsed[code]]
         total_sources += len(all_sources)
-        for src in all_sources:
-            if any(url in src.lower() for url in all_friendly_urls if url):
-                client_sources += 1
+        client_sources += sum(1 for src in all_sources if registrable_domain(src) in friendly)
     
     return {
         "taux_citation": (cited_any / total_queries) * 100,
-        "taux_pplx": (cited_pplx / total_queries) * 100,
-        "taux_gem": (cited_gem / total_queries) * 100,
+        "taux_moteurs": {code: (cited[code] / total_queries) * 100 for code in codes},
         "part_voix": (client_sources / total_sources) * 100 if total_sources > 0 else 0,
         "nb_requetes": total_queries,
         "nb_cite": cited_any
     }
 
+def explode_sources(df):
+    """
+    Format long de Sources_Detectees, en opérations vectorisées :
+    une ligne par (ligne du jeu, moteur, source) avec colonnes row, Client, code, source.
+    """
+    parts = df['Sources_Detectees'].fillna('').astype(str).str.split('|').explode().str.strip()
+    parts = parts[parts.str.contains(':', regex=False)]
+    if parts.empty:
+        return pd.DataFrame(columns=['row', 'Client', 'code', 'source'])
+    split = parts.str.split(':', n=1, expand=True)
+    long = pd.DataFrame({'row': split.index, 'code': split[0].str.strip(), 'source': split[1].str.split(',')})
+    long = long.explode('source')
+    long['source'] = long['source'].str.strip()
+    long = long[long['source'].notna() & (long['source'] != '') & (long['source'] != 'N/A')]
+    long['Client'] = df['Client'].reindex(long['row']).to_numpy()
+    return long.reset_index(drop=True)
+
+@st.cache_data
+def compute_portfolio(version, start_date, end_date, _df, registry_version=""):
+    """
+    Métriques de visibilité de tous les clients en une passe (groupby sur Client),
+    une seule fois par version des données, période et version du registre clients.
+    """
+    d = filter_by_date(_df, start_date, end_date)
+    if d.empty:
+        return pd.DataFrame()
+    codes = engine_codes_from_columns(d.columns)
+
+    # Sources "amies" (domaine cible ou partenaire du client de la ligne) : jointure sur le domaine enregistrable
+    long = explode_sources(d)
+    long['domaine'] = long['source'].map(registrable_domain)
+    pairs = []
+    for client_name in long['Client'].unique():
+        cible, partenaires = get_friendly_domains(get_client_config(client_name))
+        pairs.extend((client_name, dom) for dom in {cible} | partenaires if dom)
+    friendly = pd.DataFrame(pairs, columns=['Client', 'domaine']).assign(ami=True)
+    long = long.merge(friendly, on=['Client', 'domaine'], how='left')
+    long['ami'] = long['ami'].fillna(False).astype(bool)
+
+    # Citation par (ligne, moteur), puis par ligne
+    cited = long.groupby(['row', 'code'])['ami'].any().unstack(fill_value=False)
+    cited = cited.reindex(index=d.index, columns=codes, fill_value=False).astype(bool)
+    per_row = cited.assign(cite=cited.any(axis=1), Client=d['Client'], Timestamp=d['Timestamp'])
+
+    grouped = per_row.groupby('Client', observed=True)
+    portfolio = pd.DataFrame({
+        'nb_requetes': grouped.size(),
+        'taux_citation': grouped['cite'].mean() * 100,
+    })
+    for code in codes:
+        portfolio[f'taux_{code}'] = grouped[code].mean() * 100
+    voix = long.groupby('Client', observed=True)['ami'].agg(['sum', 'count'])
+    portfolio['part_voix'] = (voix['sum'] / voix['count'] * 100).reindex(portfolio.index).fillna(0)
+    portfolio['score_moyen'] = d.groupby('Client', observed=True)['Score_Global'].mean()
+
+    # Tendance : taux de citation des 7 derniers jours vs les 7 précédents
+    fin = d['Timestamp'].max()
+    recent = per_row[per_row['Timestamp'] > fin - timedelta(days=7)].groupby('Client', observed=True)['cite'].mean() * 100
+    before = per_row[(per_row['Timestamp'] <= fin - timedelta(days=7)) & (per_row['Timestamp'] > fin - timedelta(days=14))].groupby('Client', observed=True)['cite'].mean() * 100
+    portfolio['tendance'] = (recent - before).reindex(portfolio.index)
+    return portfolio.reset_index()
+
 def get_visibility_status(taux):
     """Retourne le status et l'interprétation selon le taux"""
     if taux >= 70:
@@ -535,12 +734,13 @@ def get_interpretation_text(metrics, sources_df, config):
         else:
             interpretations.append(f"📊 Part de voix faible ({part_voix:.1f}%). **{top_concurrent}** et d'autres captent l'essentiel des citations.")
     
-    # Différence Perplexity vs Gemini
-    diff = abs(metrics['taux_pplx'] - metrics['taux_gem'])
-    if diff > 20:
-        better = "Perplexity" if metrics['taux_pplx'] > metrics['taux_gem'] else "Gemini"
-        worse = "Gemini" if better == "Perplexity" else "Perplexity"
-        interpretations.append(f"💡 **Écart notable** : vous performez mieux sur {better} ({max(metrics['taux_pplx'], metrics['taux_gem']):.0f}%) que sur {worse} ({min(metrics['taux_pplx'], metrics['taux_gem']):.0f}%).")
+    # Écart entre le meilleur et le moins bon moteur
+    taux_moteurs = metrics.get('taux_moteurs', {})
+    if len(taux_moteurs) >= 2:
+        better = max(taux_moteurs, key=taux_moteurs.get)
+        worse = min(taux_moteurs, key=taux_moteurs.get)
+        if taux_moteurs[better] - taux_moteurs[worse] > 20:
+            interpretations.append(f"💡 **Écart notable** : vous performez mieux sur {get_engine_meta(better)['label']} ({taux_moteurs[better]:.0f}%) que sur {get_engine_meta(worse)['label']} ({taux_moteurs[worse]:.0f}%).")
     
     return interpretations
 
@@ -549,16 +749,59 @@ def filter_by_date(df, start_date, end_date):
     mask = (df['Timestamp'].dt.date >= start_date) & (df['Timestamp'].dt.date <= end_date)
     return df[mask]
 
-def resample_data(df, granularity):
-    """Agrège selon granularité"""
-    df_copy = df.copy()
-    if granularity == "Jour":
-        df_copy['Periode'] = df_copy['Timestamp'].dt.date
-    elif granularity == "Semaine":
-        df_copy['Periode'] = df_copy['Timestamp'].dt.to_period('W').apply(lambda x: x.start_time.date())
-    elif granularity == "Mois":
-        df_copy['Periode'] = df_copy['Timestamp'].dt.to_period('M').apply(lambda x: x.start_time.date())
-    return df_copy
+@st.cache_resource(max_entries=64)
+def get_keyword_topics(keywords):
+    """
+    Thème de chaque requête (topics.py). La clé est l'ensemble trié des requêtes du client :
+    les thèmes ne sont recalculés que lorsqu'une nouvelle requête apparaît, pas à chaque scan.
+    """
+    return topics.cluster_keywords(keywords)
+
+def client_keywords(query_index, client):
+    """Requêtes suivies d'un client (tout l'historique), triées : clé de get_keyword_topics()"""
+    return tuple(sorted(query for c, query in query_index if c == client))
+
+def topic_rollup(df, keyword_topics, codes):
+    """Visibilité par thème : nombre de requêtes, scores moyens et part des réponses à 50 % ou plus"""
+    if df.empty:
+        return pd.DataFrame()
+    score_cols = ['Score_Global'] + [f'Score_{code}' for code in codes if f'Score_{code}' in df.columns]
+    data = df[['Mot_Cle'] + score_cols].assign(
+        Theme=df['Mot_Cle'].astype(str).map(keyword_topics).fillna(topics.AUTRES).to_numpy(),
+        Visible=(df['Score_Global'] >= 50).to_numpy() * 100.0
+    )
+    grouped = data.groupby('Theme')
+    rollup = grouped[score_cols].mean()
+    rollup.insert(0, 'Requetes', grouped['Mot_Cle'].nunique())
+    rollup['Visible'] = grouped['Visible'].mean()
+    # "Autres" (requêtes sans thème) en dernier
+    rollup = rollup.reset_index().assign(autres=lambda r: r['Theme'] == topics.AUTRES)
+    return rollup.sort_values(['autres', 'Score_Global', 'Requetes'], ascending=[True, False, False]).drop(columns='autres')
+
+def compute_error_bands(df, periods, codes):
+    """
+    Demi-largeur de l'IC 95 % des scores moyens par période, à partir de la variance
+    d'échantillonnage stockée dans Stats_Echantillons (scans multi-échantillons).
+    """
+    stats_rows = df['Stats_Echantillons'].map(parse_stats)
+    variances = pd.DataFrame({'Periode': np.asarray(periods)})
+    variances['Score_Global'] = stats_rows.map(lambda s: mean_variance(s, codes)).values
+    for code in codes:
+        variances[f'Score_{code}'] = stats_rows.map(lambda s, c=code: mean_variance(s, [c])).values
+    grouped = variances.groupby('Periode')
+    return (grouped.sum() ** 0.5).div(grouped.size(), axis=0) * Z_95
+
+def hex_to_rgba(hex_color, alpha):
+    """Convertit une couleur #RRGGBB en rgba() transparente"""
+    h = hex_color.lstrip('#')
+    return f"rgba({int(h[0:2], 16)},{int(h[2:4], 16)},{int(h[4:6], 16)},{alpha})"
+
+def add_error_band(fig, x, y, half_width, color):
+    """Ajoute une bande d'erreur (y ± demi-largeur) sous une courbe"""
+    fig.add_trace(go.Scatter(x=x, y=(y + half_width).clip(upper=100), mode='lines', line=dict(width=0),
+                             showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=x, y=(y - half_width).clip(lower=0), mode='lines', line=dict(width=0),
+                             fill='tonexty', fillcolor=hex_to_rgba(color, 0.15), showlegend=False, hoverinfo='skip'))
 
 def highlight_text_advanced(text, config, all_sources=None):
     """Surlignage enrichi du texte"""
@@ -567,23 +810,9 @@ def highlight_text_advanced(text, config, all_sources=None):
     
     result = text
     
-    # URL cible (vert)
-    if config.get("url_cible"):
-        url = config["url_cible"]
-        pattern = re.compile(re.escape(url), re.IGNORECASE)
-        result = pattern.sub(f'<span class="highlight-client">{url}</span>', result)
-    
-    # URLs partenaires (vert)
-    for partner in config.get("urls_partenaires", []):
-        if partner:
-            pattern = re.compile(re.escape(partner), re.IGNORECASE)
-            result = pattern.sub(f'<span class="highlight-client">{partner}</span>', result)
-    
-    # Mots signatures (jaune)
-    for kw in config.get("mots_signatures", []):
-        if kw and kw.strip():
-            pattern = re.compile(re.escape(kw.strip()), re.IGNORECASE)
-            result = pattern.sub(f'<span class="highlight-keyword">{kw.strip()}</span>', result)
+    # URL cible et partenaires (vert), mots signatures (jaune) : motifs compilés par le registre
+    for pattern, label, css in registry.matcher(config.get("nom", "")).motifs:
+        result = pattern.sub(f'<span class="{css}">{label}</span>', result)
     
     # Concurrents (rouge)
     if all_sources:
@@ -620,19 +849,18 @@ def generate_recommendations(metrics, sources_df, config):
                 "content": f"Vos principaux concurrents ({top_conc}) sont plus cités. Étudiez leur contenu pour comprendre ce qui les rend plus visibles."
             })
     
-    # Recommandations selon l'écart Perplexity/Gemini
-    if metrics['taux_pplx'] > metrics['taux_gem'] + 20:
-        recommendations.append({
-            "icon": "♊",
-            "title": "Optimiser pour Gemini",
-            "content": "Vous performez moins bien sur Gemini. Ce moteur valorise les contenus bien structurés avec des données factuelles et des sources officielles."
-        })
-    elif metrics['taux_gem'] > metrics['taux_pplx'] + 20:
-        recommendations.append({
-            "icon": "⚡",
-            "title": "Optimiser pour Perplexity",
-            "content": "Vous performez moins bien sur Perplexity. Ce moteur privilégie les contenus récents, les FAQ détaillées et les articles de blog informatifs."
-        })
+    # Recommandations selon l'écart entre moteurs
+    taux_moteurs = metrics.get('taux_moteurs', {})
+    if len(taux_moteurs) >= 2:
+        best = max(taux_moteurs.values())
+        for code, taux_moteur in taux_moteurs.items():
+            if taux_moteur + 20 < best:
+                meta = get_engine_meta(code)
+                recommendations.append({
+                    "icon": meta['icone'],
+                    "title": f"Optimiser pour {meta['label']}",
+                    "content": f"Vous performez moins bien sur {meta['label']}. {meta['conseil']}"
+                })
     
     # Recommandation générale si tout va bien
     if taux >= 70 and part_voix >= 20:
@@ -670,14 +898,14 @@ def generate_pdf_report(df_client, client_name, config, visibility_metrics, sour
     
     # KPIs
     elements.append(Paragraph("🎯 Métriques de Visibilité", subtitle_style))
+    taux_moteurs = visibility_metrics.get('taux_moteurs', {})
     kpi_data = [
-        ["Taux de Citation", "Perplexity", "Gemini", "Part de Voix"],
-        [f"{visibility_metrics['taux_citation']:.1f}%", 
-         f"{visibility_metrics['taux_pplx']:.1f}%", 
-         f"{visibility_metrics['taux_gem']:.1f}%",
-         f"{visibility_metrics['part_voix']:.1f}%"]
+        ["Taux de Citation"] + [get_engine_meta(code)['label'] for code in taux_moteurs] + ["Part de Voix"],
+        [f"{visibility_metrics['taux_citation']:.1f}%"]
+        + [f"{taux:.1f}%" for taux in taux_moteurs.values()]
+        + [f"{visibility_metrics['part_voix']:.1f}%"]
     ]
-    kpi_table = Table(kpi_data, colWidths=[4*cm, 4*cm, 4*cm, 4*cm])
+    kpi_table = Table(kpi_data, colWidths=[16*cm / len(kpi_data[0])] * len(kpi_data[0]))
     kpi_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4F46E5')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -701,15 +929,17 @@ def generate_pdf_report(df_client, client_name, config, visibility_metrics, sour
     
     if len(sources_df) > 0:
         top_sources = sources_df.head(15)
-        src_data = [["Source", "Total", "PPLX", "GEM", "Type"]]
+        codes = list(taux_moteurs)
+        src_data = [["Source", "Total"] + codes + ["Type"]]
         for _, row in top_sources.iterrows():
             type_label = "Client" if row['type'] == 'client' else ("Partenaire" if row['type'] == 'partenaire' else "Concurrent")
-            src_data.append([
-                row['source'][:30] + "..." if len(row['source']) > 30 else row['source'],
-                str(row['total']), str(row['pplx']), str(row['gem']), type_label
-            ])
+            src_data.append(
+                [row['source'][:30] + "..." if len(row['source']) > 30 else row['source'], str(row['total'])]
+                + [str(row.get(code.lower(), 0)) for code in codes]
+                + [type_label]
+            )
         
-        src_table = Table(src_data, colWidths=[6*cm, 2*cm, 2*cm, 2*cm, 3*cm])
+        src_table = Table(src_data, colWidths=[5*cm, 2*cm] + [7*cm / max(1, len(codes))] * len(codes) + [3*cm])
         src_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10B981')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -735,6 +965,23 @@ except Exception as e:
     st.info("💡 Vérifiez que le secret `GOOGLE_JSON_KEY` est bien configuré dans les paramètres Streamlit.")
     st.stop()
 
+# Registre clients : reconstruit (matchers compris) seulement si clients.json ou CONFIG_CIBLES change
+registry = get_client_registry()
+
+# Moteurs IA présents dans les données (colonnes Score_<CODE>)
+MOTEURS = engine_codes_from_columns(df.columns)
+
+# Version du jeu partagé : clé de tous les caches dérivés (index client, périodes, portefeuille...)
+data_version = get_data_version(df)
+client_index = build_client_index(data_version, df)
+
+# Index local (recherche plein texte + diffs entre réponses successives) : nouvelles lignes seulement
+try:
+    sync_search_index(data_version, df, tuple(MOTEURS))
+    index_error = None
+except Exception as e:
+    index_error = e
+
 # =============================================================================
 # 5. SIDEBAR
 # =============================================================================
@@ -743,10 +990,13 @@ with st.sidebar:
     st.caption("Audit de Visibilité IA")
     
     st.markdown("---")
-    
+
+    # Vue
+    vue = st.radio("Vue", ["🎯 Client", "🗂️ Portefeuille"], horizontal=True, label_visibility="collapsed", key="vue")
+
     # Client
     st.markdown("##### 🎯 Sélection Client")
-    clients_disponibles = df['Client'].unique().tolist()
+    clients_disponibles = client_index["clients"]
     selected_client = st.selectbox("Client", clients_disponibles, label_visibility="collapsed")
     config = get_client_config(selected_client)
     
@@ -754,8 +1004,8 @@ with st.sidebar:
     
     # Période
     st.markdown("##### 📅 Période d'analyse")
-    min_date = df['Timestamp'].min().date()
-    max_date = df['Timestamp'].max().date()
+    min_date = client_index["min"].date()
+    max_date = client_index["max"].date()
     
     col_d1, col_d2 = st.columns(2)
     with col_d1:
@@ -796,14 +1046,70 @@ with st.sidebar:
         st.caption(", ".join(config.get('mots_signatures', [])[:5]) + "...")
     
     st.markdown("---")
-    st.caption("💡 Les données sont mises en cache 10 min")
+    st.caption("💡 Données rechargées dès qu'un scan publie une nouvelle version (METADONNEES, vérifiée toutes les 30 s)")
+
+# =============================================================================
+# VUE PORTEFEUILLE (tous les clients)
+# =============================================================================
+if vue == "🗂️ Portefeuille":
+    st.markdown("# 🗂️ Portefeuille clients")
+    st.caption(f"📅 {start_date.strftime('%d/%m/%Y')} → {end_date.strftime('%d/%m/%Y')} • {len(clients_disponibles)} clients")
+
+    portfolio = compute_portfolio(data_version, start_date, end_date, df, registry.version)
+    if len(portfolio) == 0:
+        st.warning("Aucune donnée disponible pour cette période")
+        st.stop()
+
+    kpi_cols = st.columns(3)
+    with kpi_cols[0]:
+        st.metric("Taux de citation moyen", f"{portfolio['taux_citation'].mean():.0f}%")
+    with kpi_cols[1]:
+        st.metric("Part de voix moyenne", f"{portfolio['part_voix'].mean():.1f}%")
+    with kpi_cols[2]:
+        st.metric("Requêtes analysées", int(portfolio['nb_requetes'].sum()))
+
+    fig_portfolio = go.Figure()
+    fig_portfolio.add_trace(go.Bar(name="Taux de citation", x=portfolio['Client'], y=portfolio['taux_citation'],
+                                   marker_color=[get_client_config(c)['couleur'] for c in portfolio['Client']]))
+    fig_portfolio.add_trace(go.Bar(name="Part de voix", x=portfolio['Client'], y=portfolio['part_voix'], marker_color='#94a3b8'))
+    fig_portfolio.update_layout(
+        barmode='group',
+        height=380,
+        yaxis_title="%",
+        margin=dict(l=20, r=20, t=10, b=40),
+        legend=dict(orientation="h", y=1.1),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#1e293b')
+    )
+    st.plotly_chart(fig_portfolio, use_container_width=True)
+
+    col_config = {
+        "Client": st.column_config.TextColumn("🎯 Client"),
+        "nb_requetes": st.column_config.NumberColumn("Requêtes", format="%d"),
+        "taux_citation": st.column_config.ProgressColumn("Taux de citation", min_value=0, max_value=100, format="%.0f%%"),
+        "part_voix": st.column_config.ProgressColumn("Part de voix", min_value=0, max_value=100, format="%.1f%%"),
+        "score_moyen": st.column_config.NumberColumn("Score moyen", format="%.0f"),
+        "tendance": st.column_config.NumberColumn("Tendance 7j", format="%+.0f pts", help="Taux de citation des 7 derniers jours vs les 7 précédents"),
+    }
+    for code in MOTEURS:
+        col_config[f"taux_{code}"] = st.column_config.ProgressColumn(f"{get_engine_meta(code)['icone']} {code}", min_value=0, max_value=100, format="%.0f%%")
+    st.dataframe(
+        portfolio.sort_values('taux_citation', ascending=False),
+        use_container_width=True,
+        hide_index=True,
+        column_config=col_config
+    )
+    st.stop()
 
 # =============================================================================
 # 6. FILTRAGE DES DONNÉES
 # =============================================================================
-df_client = df[df['Client'] == selected_client].copy()
-df_client = filter_by_date(df_client, start_date, end_date)
-df_resampled = resample_data(df_client, granularity)
+# Travail par session limité à une sélection de positions dans le jeu partagé :
+# index client et périodes sont calculés une fois par version des données
+client_positions = select_client_rows(client_index, selected_client, start_date, end_date)
+df_client = df.take(client_positions)
+periodes = pd.Series(get_periods(data_version, granularity, df)[client_positions], index=df_client.index, name='Periode')
 
 # Analyse
 sources_df = analyze_all_sources(df_client, config)
@@ -825,11 +1131,12 @@ with col_h2:
 # =============================================================================
 # 8. ONGLETS PRINCIPAUX
 # =============================================================================
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+tab1, tab2, tab3, tab4, tab_search, tab5 = st.tabs([
     "🏆 Sources & Visibilité", 
     "📈 Évolution", 
     "🥊 Concurrence", 
     "🔍 Preuves",
+    "🔎 Recherche",
     "📥 Export"
 ])
 
@@ -838,11 +1145,11 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
 # -----------------------------------------------------------------------------
 with tab1:
     # Box explicative
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-box">
         <div class="info-box-title">💡 Comment lire ce tableau de bord ?</div>
         <p style="margin:0; color: #1e40af;">
-        Ce dashboard analyse les <strong>sources citées par les IA</strong> (Perplexity, Gemini) quand un utilisateur pose une question liée à votre activité.
+        Ce dashboard analyse les <strong>sources citées par les IA</strong> ({", ".join(get_engine_meta(code)['label'] for code in MOTEURS)}) quand un utilisateur pose une question liée à votre activité.
         L'objectif : mesurer si <strong>votre site apparaît</strong> dans les réponses et quelle est votre <strong>part de voix</strong> face aux concurrents.
         </p>
     </div>
@@ -851,9 +1158,9 @@ with tab1:
     # KPIs avec explications
     st.markdown('<div class="section-header">🎯 Vos Indicateurs de Visibilité</div>', unsafe_allow_html=True)
     
-    col1, col2, col3, col4 = st.columns(4)
+    kpi_cols = st.columns(len(MOTEURS) + 2)
     
-    with col1:
+    with kpi_cols[0]:
         status_color = "#10b981" if visibility_metrics['taux_citation'] >= 50 else "#f59e0b" if visibility_metrics['taux_citation'] >= 30 else "#ef4444"
         st.markdown(f"""
         <div class="kpi-card">
@@ -863,25 +1170,18 @@ with tab1:
         </div>
         """, unsafe_allow_html=True)
     
-    with col2:
-        st.markdown(f"""
-        <div class="kpi-card">
-            <div class="kpi-value" style="color: #8b5cf6;">{visibility_metrics['taux_pplx']:.0f}%</div>
-            <div class="kpi-label">⚡ Perplexity</div>
-            <div class="metric-interpret">Taux sur ce moteur IA</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-        <div class="kpi-card">
-            <div class="kpi-value" style="color: #10b981;">{visibility_metrics['taux_gem']:.0f}%</div>
-            <div class="kpi-label">♊ Gemini</div>
-            <div class="metric-interpret">Taux sur ce moteur IA</div>
-        </div>
-        """, unsafe_allow_html=True)
+    for kpi_col, code in zip(kpi_cols[1:], MOTEURS):
+        meta = get_engine_meta(code)
+        with kpi_col:
+            st.markdown(f"""
+            <div class="kpi-card">
+                <div class="kpi-value" style="color: {meta['couleur']};">{visibility_metrics['taux_moteurs'].get(code, 0):.0f}%</div>
+                <div class="kpi-label">{meta['icone']} {meta['label']}</div>
+                <div class="metric-interpret">Taux sur ce moteur IA</div>
+            </div>
+            """, unsafe_allow_html=True)
     
-    with col4:
+    with kpi_cols[-1]:
         pv_color = "#10b981" if visibility_metrics['part_voix'] >= 15 else "#f59e0b" if visibility_metrics['part_voix'] >= 8 else "#ef4444"
         st.markdown(f"""
         <div class="kpi-card">
@@ -985,11 +1285,11 @@ with tab1:
     # Tableau complet des sources
     st.markdown('<div class="section-header">📋 Tableau Détaillé des Sources</div>', unsafe_allow_html=True)
     
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-box" style="background: linear-gradient(135deg, #f8fafc 0%, #f1f5f9 100%); border-left-color: #64748b;">
         <p style="margin:0; color: #475569; font-size: 13px;">
         <strong>Comment lire ce tableau :</strong> Chaque ligne représente un site web cité par les IA. 
-        "Total" = nombre total de citations, "PPLX" = citations par Perplexity, "GEM" = citations par Gemini.
+        "Total" = nombre total de citations, {", ".join(f'"{code}" = citations par {get_engine_meta(code)["label"]}' for code in MOTEURS)}.
         </p>
     </div>
     """, unsafe_allow_html=True)
@@ -1003,17 +1303,20 @@ with tab1:
         })
         
         max_total = int(display_df['total'].max()) if len(display_df) > 0 else 10
+        engine_cols = [code.lower() for code in MOTEURS if code.lower() in display_df.columns]
+        column_config = {
+            "source": st.column_config.TextColumn("🌐 Source", width="large"),
+            "total": st.column_config.ProgressColumn("📊 Total", min_value=0, max_value=max_total, format="%d"),
+            "Type": st.column_config.TextColumn("🏷️ Type")
+        }
+        for code in MOTEURS:
+            meta = get_engine_meta(code)
+            column_config[code.lower()] = st.column_config.NumberColumn(f"{meta['icone']} {code}", format="%d", help=f"Citations par {meta['label']}")
         st.dataframe(
-            display_df[['source', 'total', 'pplx', 'gem', 'Type']].head(20),
+            display_df[['source', 'total'] + engine_cols + ['Type']].head(20),
             use_container_width=True,
             hide_index=True,
-            column_config={
-                "source": st.column_config.TextColumn("🌐 Source", width="large"),
-                "total": st.column_config.ProgressColumn("📊 Total", min_value=0, max_value=max_total, format="%d"),
-                "pplx": st.column_config.NumberColumn("⚡ PPLX", format="%d", help="Citations par Perplexity"),
-                "gem": st.column_config.NumberColumn("♊ GEM", format="%d", help="Citations par Gemini"),
-                "Type": st.column_config.TextColumn("🏷️ Type")
-            }
+            column_config=column_config
         )
     
     # Recommandations
@@ -1044,59 +1347,54 @@ with tab2:
     """, unsafe_allow_html=True)
     
     # KPIs scores
-    col1, col2, col3, col4, col5 = st.columns(5)
+    score_cols = st.columns(len(MOTEURS) + 2)
 
     avg_score = df_client['Score_Global'].mean() if len(df_client) > 0 else 0
-    avg_pplx = df_client['Score_PPLX'].mean() if len(df_client) > 0 else 0
-    avg_gem = df_client['Score_GEM'].mean() if len(df_client) > 0 else 0
-    avg_gpt = df_client['Score_GPT'].mean() if len(df_client) > 0 and 'Score_GPT' in df_client.columns else 0
     avg_reco = pd.to_numeric(df_client['Note_Recommandation'], errors='coerce').mean() if len(df_client) > 0 and 'Note_Recommandation' in df_client.columns else 0
     avg_reco = avg_reco if pd.notna(avg_reco) else 0
 
-    with col1:
+    with score_cols[0]:
         st.metric("Score GEO Global", f"{avg_score:.0f}%", help="Moyenne des scores de visibilité sur toutes les requêtes")
-    with col2:
-        st.metric("Score Perplexity", f"{avg_pplx:.0f}%", help="Score moyen sur Perplexity")
-    with col3:
-        st.metric("Score Gemini", f"{avg_gem:.0f}%", help="Score moyen sur Gemini")
-    with col4:
-        st.metric("Score ChatGPT", f"{avg_gpt:.0f}%", help="Score moyen sur ChatGPT")
-    with col5:
+    for score_col, code in zip(score_cols[1:], MOTEURS):
+        label = get_engine_meta(code)['label']
+        avg_moteur = df_client[f'Score_{code}'].mean() if len(df_client) > 0 else 0
+        with score_col:
+            st.metric(f"Score {label}", f"{avg_moteur:.0f}%", help=f"Score moyen sur {label}")
+    with score_cols[-1]:
         stars = "⭐" * int(round(avg_reco))
         st.metric("Recommandation", stars if stars else "—", help="Note moyenne de recommandation (1-5)")
     
     st.markdown('<div class="section-header">📈 Évolution Temporelle</div>', unsafe_allow_html=True)
     
-    if len(df_resampled) > 0:
+    if len(df_client) > 0:
         # Colonnes d'agrégation disponibles
-        agg_cols = {'Score_Global': 'mean', 'Score_PPLX': 'mean', 'Score_GEM': 'mean'}
-        if 'Score_GPT' in df_resampled.columns:
-            agg_cols['Score_GPT'] = 'mean'
+        agg_cols = {'Score_Global': 'mean'}
+        agg_cols.update({f'Score_{code}': 'mean' for code in MOTEURS})
 
-        df_evolution = df_resampled.groupby('Periode').agg(agg_cols).reset_index()
+        df_evolution = df_client.groupby(periodes).agg(agg_cols).reset_index()
+
+        # Bandes d'erreur : disponibles si le monitor tourne en multi-échantillons (GEO_ECHANTILLONS > 1)
+        bands = None
+        if 'Stats_Echantillons' in df_client.columns and st.toggle("Afficher les intervalles de confiance (95 %)", value=True):
+            bands = compute_error_bands(df_client, periodes, MOTEURS).reindex(df_evolution['Periode']).fillna(0).reset_index(drop=True)
 
         fig = go.Figure()
+        if bands is not None:
+            add_error_band(fig, df_evolution['Periode'], df_evolution['Score_Global'], bands['Score_Global'], config.get('couleur', '#4F46E5'))
         fig.add_trace(go.Scatter(
             x=df_evolution['Periode'], y=df_evolution['Score_Global'],
             mode='lines+markers', name='Score Global',
             line=dict(color=config.get('couleur', '#4F46E5'), width=3),
             fill='tozeroy', fillcolor='rgba(79,70,229,0.1)'
         ))
-        fig.add_trace(go.Scatter(
-            x=df_evolution['Periode'], y=df_evolution['Score_PPLX'],
-            mode='lines+markers', name='⚡ Perplexity',
-            line=dict(color='#8B5CF6', width=2, dash='dot')
-        ))
-        fig.add_trace(go.Scatter(
-            x=df_evolution['Periode'], y=df_evolution['Score_GEM'],
-            mode='lines+markers', name='♊ Gemini',
-            line=dict(color='#10B981', width=2, dash='dot')
-        ))
-        if 'Score_GPT' in df_evolution.columns:
+        for code in MOTEURS:
+            meta = get_engine_meta(code)
+            if bands is not None:
+                add_error_band(fig, df_evolution['Periode'], df_evolution[f'Score_{code}'], bands[f'Score_{code}'], meta['couleur'])
             fig.add_trace(go.Scatter(
-                x=df_evolution['Periode'], y=df_evolution['Score_GPT'],
-                mode='lines+markers', name='🤖 ChatGPT',
-                line=dict(color='#F59E0B', width=2, dash='dot')
+                x=df_evolution['Periode'], y=df_evolution[f'Score_{code}'],
+                mode='lines+markers', name=f"{meta['icone']} {meta['label']}",
+                line=dict(color=meta['couleur'], width=2, dash='dot')
             ))
         fig.update_layout(
             template="plotly_white",
@@ -1111,7 +1409,8 @@ with tab2:
         )
         st.plotly_chart(fig, use_container_width=True)
         
-        st.caption("💡 La ligne pleine représente le score global, les lignes pointillées les scores par moteur IA.")
+        st.caption("💡 La ligne pleine représente le score global, les lignes pointillées les scores par moteur IA."
+                   + (" Les zones ombrées indiquent l'intervalle de confiance à 95 % lié à la variabilité des réponses." if bands is not None else ""))
     else:
         st.info("Pas assez de données pour afficher l'évolution")
     
@@ -1129,29 +1428,62 @@ with tab2:
     
     if len(df_client) > 0:
         # Colonnes disponibles pour l'affichage
-        display_cols = ['Mot_Cle', 'Score_Global', 'Score_PPLX', 'Score_GEM']
-        if 'Score_GPT' in df_client.columns:
-            display_cols.append('Score_GPT')
+        keyword_topics = get_keyword_topics(client_keywords(build_query_index(data_version, df), selected_client))
+        df_detail = df_client.assign(Theme=df_client['Mot_Cle'].astype(str).map(keyword_topics).fillna(topics.AUTRES).to_numpy())
+        display_cols = ['Mot_Cle', 'Theme', 'Score_Global'] + [f'Score_{code}' for code in MOTEURS]
+        if 'Stats_Echantillons' in df_client.columns:
+            # Probabilité de citation moyenne sur les moteurs (scans multi-échantillons)
+            p_citation = df_client['Stats_Echantillons'].map(parse_stats).map(
+                lambda s: sum(v['p_citation'] for v in s.values()) / len(s) if s else None
+            )
+            df_detail = df_detail.assign(Proba_Citation=p_citation)
+            display_cols.append('Proba_Citation')
         display_cols.extend(['Note_Recommandation', 'Concurrent_Principal'])
-        display_cols = [c for c in display_cols if c in df_client.columns]
+        display_cols = [c for c in display_cols if c in df_detail.columns]
 
         col_config = {
             "Mot_Cle": st.column_config.TextColumn("📝 Requête", width="large"),
+            "Theme": st.column_config.TextColumn("🧩 Thème"),
             "Score_Global": st.column_config.ProgressColumn("🎯 Score", min_value=0, max_value=100, format="%d%%"),
-            "Score_PPLX": st.column_config.ProgressColumn("⚡ PPLX", min_value=0, max_value=100, format="%d%%"),
-            "Score_GEM": st.column_config.ProgressColumn("♊ GEM", min_value=0, max_value=100, format="%d%%"),
-            "Score_GPT": st.column_config.ProgressColumn("🤖 GPT", min_value=0, max_value=100, format="%d%%"),
+            "Proba_Citation": st.column_config.ProgressColumn("🎲 P(citation)", min_value=0, max_value=1, format="%.2f", help="Probabilité d'être cité, estimée sur les K échantillons"),
             "Note_Recommandation": st.column_config.NumberColumn("⭐ Reco", format="%d"),
             "Concurrent_Principal": st.column_config.TextColumn("🥊 Concurrent")
         }
+        for code in MOTEURS:
+            col_config[f"Score_{code}"] = st.column_config.ProgressColumn(f"{get_engine_meta(code)['icone']} {code}", min_value=0, max_value=100, format="%d%%")
 
         st.dataframe(
-            df_client[display_cols].sort_values('Score_Global', ascending=False),
+            df_detail[display_cols].sort_values('Score_Global', ascending=False),
             use_container_width=True,
             hide_index=True,
             column_config=col_config
         )
 
+        # Visibilité par thème (requêtes regroupées par similarité, voir topics.py)
+        rollup = topic_rollup(df_client, keyword_topics, MOTEURS)
+        if rollup['Theme'].nunique() > 1:
+            st.markdown('<div class="section-header">🧩 Visibilité par Thème</div>', unsafe_allow_html=True)
+            fig_topics = px.bar(
+                rollup.head(15).iloc[::-1], x='Score_Global', y='Theme', orientation='h',
+                text=rollup.head(15).iloc[::-1]['Score_Global'].round(0).astype(int).astype(str) + '%',
+                color_discrete_sequence=[config['couleur']]
+            )
+            fig_topics.update_layout(
+                height=max(250, 32 * min(len(rollup), 15)), xaxis=dict(range=[0, 100], title="Score moyen (%)"),
+                yaxis_title="", plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', margin=dict(l=10, r=10, t=10, b=10)
+            )
+            st.plotly_chart(fig_topics, use_container_width=True)
+
+            topic_config = {
+                "Theme": st.column_config.TextColumn("🧩 Thème", width="large"),
+                "Requetes": st.column_config.NumberColumn("📝 Requêtes", format="%d"),
+                "Score_Global": st.column_config.ProgressColumn("🎯 Score moyen", min_value=0, max_value=100, format="%.0f%%"),
+                "Visible": st.column_config.ProgressColumn("👁️ Réponses ≥ 50 %", min_value=0, max_value=100, format="%.0f%%"),
+            }
+            for code in MOTEURS:
+                topic_config[f"Score_{code}"] = st.column_config.ProgressColumn(f"{get_engine_meta(code)['icone']} {code}", min_value=0, max_value=100, format="%.0f%%")
+            st.dataframe(rollup, use_container_width=True, hide_index=True, column_config=topic_config)
+
 # -----------------------------------------------------------------------------
 # ONGLET 3 : CONCURRENCE
 # -----------------------------------------------------------------------------
@@ -1198,22 +1530,20 @@ with tab3:
                 st.success("🎉 Aucun concurrent majeur détecté !")
         
         with col2:
-            st.markdown('<div class="section-header">⚡ vs ♊ Par Concurrent</div>', unsafe_allow_html=True)
+            st.markdown('<div class="section-header">🧠 Par Moteur IA</div>', unsafe_allow_html=True)
             
             if len(concurrents_df) > 0:
                 fig_compare = go.Figure()
-                fig_compare.add_trace(go.Bar(
-                    name='⚡ Perplexity',
-                    x=concurrents_df['source'],
-                    y=concurrents_df['pplx'],
-                    marker_color='#8B5CF6'
-                ))
-                fig_compare.add_trace(go.Bar(
-                    name='♊ Gemini',
-                    x=concurrents_df['source'],
-                    y=concurrents_df['gem'],
-                    marker_color='#10B981'
-                ))
+                for code in MOTEURS:
+                    if code.lower() not in concurrents_df.columns:
+                        continue
+                    meta = get_engine_meta(code)
+                    fig_compare.add_trace(go.Bar(
+                        name=f"{meta['icone']} {meta['label']}",
+                        x=concurrents_df['source'],
+                        y=concurrents_df[code.lower()],
+                        marker_color=meta['couleur']
+                    ))
                 fig_compare.update_layout(
                     barmode='group',
                     height=400,
@@ -1226,8 +1556,62 @@ with tab3:
                 )
                 st.plotly_chart(fig_compare, use_container_width=True)
                 
-                st.caption("💡 Comparez la présence de chaque concurrent sur les deux moteurs IA.")
+                st.caption("💡 Comparez la présence de chaque concurrent sur chaque moteur IA.")
     
+    # Graphe de co-citation
+    st.markdown('<div class="section-header">🕸️ Graphe de co-citation</div>', unsafe_allow_html=True)
+    st.caption("Deux domaines sont reliés quand une même réponse IA les cite ensemble. Couleur = groupe de sites souvent cités ensemble, taille = centralité.")
+
+    if index_error is None:
+        nodes_df, graph_edges = get_cocitation_graph(data_version, selected_client, start_date, end_date)
+    else:
+        nodes_df, graph_edges = pd.DataFrame(), []
+
+    if len(nodes_df) > 0:
+        positions = nodes_df.set_index('domaine')[['x', 'y']].to_dict('index')
+        max_w = max(w for _, _, w in graph_edges) if graph_edges else 1
+        fig_graph = go.Figure()
+        for a, b, w in graph_edges:
+            fig_graph.add_trace(go.Scatter(
+                x=[positions[a]['x'], positions[b]['x']], y=[positions[a]['y'], positions[b]['y']],
+                mode='lines', line=dict(width=0.5 + 4 * w / max_w, color='rgba(148,163,184,0.5)'),
+                hoverinfo='skip', showlegend=False
+            ))
+        palette = px.colors.qualitative.Set2
+        types = nodes_df['domaine'].map(lambda d: classify_source(d, config))
+        fig_graph.add_trace(go.Scatter(
+            x=nodes_df['x'], y=nodes_df['y'], mode='markers+text',
+            text=nodes_df['domaine'], textposition='top center', textfont=dict(size=10),
+            marker=dict(
+                size=10 + 40 * nodes_df['centralite'] / nodes_df['centralite'].max(),
+                color=[palette[c % len(palette)] for c in nodes_df['cluster']],
+                line=dict(width=[3 if t in ('client', 'partenaire') else 0 for t in types], color='#1e293b')
+            ),
+            customdata=nodes_df[['citations', 'cluster']],
+            hovertemplate="<b>%{text}</b><br>Citations : %{customdata[0]}<br>Groupe : %{customdata[1]}<extra></extra>",
+            showlegend=False
+        ))
+        fig_graph.update_layout(
+            height=550,
+            xaxis=dict(visible=False), yaxis=dict(visible=False),
+            margin=dict(l=10, r=10, t=10, b=10),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(fig_graph, use_container_width=True)
+
+        with st.expander("📋 Centralité et groupes"):
+            st.dataframe(
+                nodes_df.assign(type=types)[['domaine', 'type', 'citations', 'centralite', 'cluster']],
+                use_container_width=True, hide_index=True,
+                column_config={
+                    "centralite": st.column_config.NumberColumn("Centralité (PageRank)", format="%.3f"),
+                    "cluster": st.column_config.NumberColumn("Groupe", format="%d")
+                }
+            )
+    else:
+        st.info("Pas assez de co-citations sur la période pour construire le graphe.")
+
     # Tableau concurrents par requête
     st.markdown('<div class="section-header">🎯 Concurrent Principal par Requête</div>', unsafe_allow_html=True)
     
@@ -1281,30 +1665,44 @@ with tab4:
     </div>
     """, unsafe_allow_html=True)
     
-    if len(df_client) > 0:
+    query_index = build_query_index(data_version, df)
+    timestamps = df['Timestamp'].to_numpy()
+    requetes = [q for (c, q) in query_index if c == selected_client
+                and len(get_timeline(query_index, timestamps, c, q, start_date, end_date)) > 0]
+
+    if requetes:
         # Sélection de la requête
-        requetes = df_client['Mot_Cle'].unique().tolist()
         selected_query = st.selectbox("📝 Sélectionner une requête à analyser :", requetes)
-        
-        entry = df_client[df_client['Mot_Cle'] == selected_query].iloc[0]
-        parsed_sources = parse_sources(entry.get('Sources_Detectees', ''))
+        timeline = get_timeline(query_index, timestamps, selected_client, selected_query, start_date, end_date)
+
+        # Historique paginé : seules les colonnes numériques sont lues pour la liste,
+        # les textes ne sont décodés que pour la réponse affichée
+        par_page = 10
+        nb_pages = max(1, -(-len(timeline) // par_page))
+        col_p1, col_p2 = st.columns([1, 3])
+        with col_p1:
+            page = st.number_input(f"Page de l'historique (sur {nb_pages})", min_value=1, max_value=nb_pages, value=1, step=1, key="preuves_page")
+        page_positions = timeline[(page - 1) * par_page: page * par_page]
+        with col_p2:
+            pos = st.radio(
+                "📅 Réponse du :", page_positions.tolist(), horizontal=True,
+                format_func=lambda p: f"{df['Timestamp'].iat[p].strftime('%d/%m/%Y %H:%M')} ({int(df['Score_Global'].iat[p])}%)"
+            )
+
+        entry = df.iloc[pos]
+        parsed_sources = parse_sources(entry.get('Sources_Detectees', ''), MOTEURS)
         
         # Résumé de la requête
-        col_sum1, col_sum2, col_sum3, col_sum4, col_sum5 = st.columns(5)
-        with col_sum1:
+        sum_cols = st.columns(len(MOTEURS) + 2)
+        with sum_cols[0]:
             score_class = "high" if entry['Score_Global'] >= 50 else "medium" if entry['Score_Global'] >= 30 else "low"
             st.markdown(f"<div style='text-align:center;'><span class='badge badge-score-{score_class}' style='font-size:16px;'>{entry['Score_Global']}%</span><br><small>Score Global</small></div>", unsafe_allow_html=True)
-        with col_sum2:
-            is_pplx = entry['Score_PPLX'] >= 50
-            st.markdown(f"<div style='text-align:center;'><span class='{'citation-yes' if is_pplx else 'citation-no'}'>{'✅ Cité' if is_pplx else '❌ Non cité'}</span><br><small>Perplexity</small></div>", unsafe_allow_html=True)
-        with col_sum3:
-            is_gem = entry['Score_GEM'] >= 50
-            st.markdown(f"<div style='text-align:center;'><span class='{'citation-yes' if is_gem else 'citation-no'}'>{'✅ Cité' if is_gem else '❌ Non cité'}</span><br><small>Gemini</small></div>", unsafe_allow_html=True)
-        with col_sum4:
-            score_gpt = entry.get('Score_GPT', 0)
-            is_gpt = score_gpt >= 50 if pd.notna(score_gpt) else False
-            st.markdown(f"<div style='text-align:center;'><span class='{'citation-yes' if is_gpt else 'citation-no'}'>{'✅ Cité' if is_gpt else '❌ Non cité'}</span><br><small>ChatGPT</small></div>", unsafe_allow_html=True)
-        with col_sum5:
+        for sum_col, code in zip(sum_cols[1:], MOTEURS):
+            score_moteur = entry.get(f'Score_{code}', 0)
+            is_cited = score_moteur >= 50 if pd.notna(score_moteur) else False
+            with sum_col:
+                st.markdown(f"<div style='text-align:center;'><span class='{'citation-yes' if is_cited else 'citation-no'}'>{'✅ Cité' if is_cited else '❌ Non cité'}</span><br><small>{get_engine_meta(code)['label']}</small></div>", unsafe_allow_html=True)
+        with sum_cols[-1]:
             conc = entry.get('Concurrent_Principal', 'N/A')
             st.markdown(f"<div style='text-align:center;'><span class='badge badge-concurrent'>{conc if conc != 'N/A' else '—'}</span><br><small>Concurrent</small></div>", unsafe_allow_html=True)
         
@@ -1312,81 +1710,149 @@ with tab4:
         
         # Sources détectées
         st.markdown("##### 📋 Sources citées dans les réponses")
-        col_src1, col_src2, col_src3 = st.columns(3)
-
-        with col_src1:
-            st.markdown("**⚡ Perplexity**")
-            if parsed_sources['PPLX']:
-                for src in parsed_sources['PPLX']:
-                    src_type = classify_source(src, config)
-                    st.markdown(f"<span class='badge badge-{src_type}'>{src}</span>", unsafe_allow_html=True)
-            else:
-                st.caption("Aucune source détectée")
-
-        with col_src2:
-            st.markdown("**♊ Gemini**")
-            if parsed_sources['GEM']:
-                for src in parsed_sources['GEM']:
-                    src_type = classify_source(src, config)
-                    st.markdown(f"<span class='badge badge-{src_type}'>{src}</span>", unsafe_allow_html=True)
-            else:
-                st.caption("Aucune source détectée")
-
-        with col_src3:
-            st.markdown("**🤖 ChatGPT**")
-            if parsed_sources['GPT']:
-                for src in parsed_sources['GPT']:
-                    src_type = classify_source(src, config)
-                    st.markdown(f"<span class='badge badge-{src_type}'>{src}</span>", unsafe_allow_html=True)
-            else:
-                st.caption("Aucune source détectée")
+        src_cols = st.columns(len(MOTEURS))
+
+        for src_col, code in zip(src_cols, MOTEURS):
+            meta = get_engine_meta(code)
+            with src_col:
+                st.markdown(f"**{meta['icone']} {meta['label']}**")
+                if parsed_sources.get(code):
+                    for src in parsed_sources[code]:
+                        src_type = classify_source(src, config)
+                        st.markdown(f"<span class='badge badge-{src_type}'>{src}</span>", unsafe_allow_html=True)
+                else:
+                    st.caption("Aucune source détectée")
         
         st.markdown("---")
         
         # Réponses complètes
         st.markdown("##### 📄 Réponses complètes des IA")
 
-        all_sources = parsed_sources['PPLX'] + parsed_sources['GEM'] + parsed_sources['GPT']
+        all_sources = [src for code in MOTEURS for src in parsed_sources.get(code, [])]
 
-        col_pplx, col_gem, col_gpt = st.columns(3)
+        response_cols = st.columns(len(MOTEURS))
 
-        with col_pplx:
-            st.markdown(f"""
-            <div class="motor-header pplx">
-                <span>⚡ Perplexity</span>
-                <span>Score : {entry['Score_PPLX']}%</span>
-            </div>
-            """, unsafe_allow_html=True)
+        for response_col, code in zip(response_cols, MOTEURS):
+            meta = get_engine_meta(code)
+            score_val = entry.get(f'Score_{code}', 0)
+            score_display = int(score_val) if pd.notna(score_val) else 0
+            with response_col:
+                st.markdown(f"""
+                <div class="motor-header" style="background: linear-gradient(135deg, {meta['couleur']} 0%, {meta['couleur']}CC 100%); color: white;">
+                    <span>{meta['icone']} {meta['label']}</span>
+                    <span>Score : {score_display}%</span>
+                </div>
+                """, unsafe_allow_html=True)
 
-            text = highlight_text_advanced(entry.get('Texte_PPLX', ''), config, all_sources)
-            st.markdown(f'<div class="reponse-ia">{text if text else "<em>Aucune réponse disponible</em>"}</div>', unsafe_allow_html=True)
+                # Décompression à la demande : seules les réponses affichées sont décodées
+                text = highlight_text_advanced(decode_text(entry.get(f'Texte_{code}', '')), config, all_sources)
+                st.markdown(f'<div class="reponse-ia">{text if text else "<em>Aucune réponse disponible</em>"}</div>', unsafe_allow_html=True)
 
-        with col_gem:
-            st.markdown(f"""
-            <div class="motor-header gem">
-                <span>♊ Gemini</span>
-                <span>Score : {entry['Score_GEM']}%</span>
-            </div>
-            """, unsafe_allow_html=True)
+                # Diff pré-calculé à l'ingestion avec la réponse précédente du même moteur
+                changes = search_index.get_diff(pos + 2, code) if index_error is None else None
+                if changes:
+                    with st.expander(f"🔀 Changements depuis le {changes['date_precedente'][:10]} ({changes['similarite']:.0%} similaire)"):
+                        for src in changes['sources_ajoutees']:
+                            st.markdown(f"<span class='badge badge-client'>+ {src}</span>", unsafe_allow_html=True)
+                        for src in changes['sources_supprimees']:
+                            st.markdown(f"<span class='badge badge-concurrent'>− {src}</span>", unsafe_allow_html=True)
+                        for phrase in changes['ajouts']:
+                            st.markdown(f"<div style='background:#dcfce7;'>{html.escape(phrase)}</div>", unsafe_allow_html=True)
+                        for phrase in changes['suppressions']:
+                            st.markdown(f"<div style='background:#fee2e2; text-decoration: line-through;'>{html.escape(phrase)}</div>", unsafe_allow_html=True)
+                        if not any(changes[k] for k in ('ajouts', 'suppressions', 'sources_ajoutees', 'sources_supprimees')):
+                            st.caption("Réponse inchangée")
 
-            text_g = highlight_text_advanced(entry.get('Texte_GEM', ''), config, all_sources)
-            st.markdown(f'<div class="reponse-ia">{text_g if text_g else "<em>Aucune réponse disponible</em>"}</div>', unsafe_allow_html=True)
+        # Comparaison de deux dates
+        if len(timeline) >= 2:
+            st.markdown("---")
+            st.markdown("##### 🔀 Comparer deux dates")
+            date_label = lambda p: df['Timestamp'].iat[p].strftime('%d/%m/%Y %H:%M')
+            col_c1, col_c2, col_c3 = st.columns(3)
+            with col_c1:
+                pos_old = st.selectbox("Avant", timeline.tolist(), index=1, format_func=date_label, key="preuves_avant")
+            with col_c2:
+                pos_new = st.selectbox("Après", timeline.tolist(), index=0, format_func=date_label, key="preuves_apres")
+            with col_c3:
+                code_diff = st.selectbox("Moteur", MOTEURS, format_func=lambda c: get_engine_meta(c)['label'], key="preuves_moteur")
 
-        with col_gpt:
-            score_gpt_val = entry.get('Score_GPT', 0)
-            score_gpt_display = int(score_gpt_val) if pd.notna(score_gpt_val) else 0
-            st.markdown(f"""
-            <div class="motor-header" style="background: linear-gradient(135deg, #F59E0B 0%, #D97706 100%); color: white;">
-                <span>🤖 ChatGPT</span>
-                <span>Score : {score_gpt_display}%</span>
-            </div>
-            """, unsafe_allow_html=True)
+            old_sources = set(parse_sources(df['Sources_Detectees'].iat[pos_old], MOTEURS).get(code_diff, []))
+            new_sources = set(parse_sources(df['Sources_Detectees'].iat[pos_new], MOTEURS).get(code_diff, []))
+            badges = [f"<span class='badge badge-client'>+ {s}</span>" for s in sorted(new_sources - old_sources)]
+            badges += [f"<span class='badge badge-concurrent'>− {s}</span>" for s in sorted(old_sources - new_sources)]
+            st.markdown(" ".join(badges) if badges else "<small>Sources identiques</small>", unsafe_allow_html=True)
 
-            text_gpt = highlight_text_advanced(entry.get('Texte_GPT', ''), config, all_sources)
-            st.markdown(f'<div class="reponse-ia">{text_gpt if text_gpt else "<em>Aucune réponse disponible</em>"}</div>', unsafe_allow_html=True)
+            diff = sentence_diff(
+                decode_text(df[f'Texte_{code_diff}'].iat[pos_old]),
+                decode_text(df[f'Texte_{code_diff}'].iat[pos_new])
+            )
+            styles = {'+': "background:#dcfce7;", '-': "background:#fee2e2; text-decoration: line-through;", ' ': "color:#64748b;"}
+            lines = [f"<div style='{styles[status]}'>{html.escape(phrase)}</div>" for status, phrase in diff]
+            st.markdown(f'<div class="reponse-ia">{"".join(lines) or "<em>Aucune réponse disponible</em>"}</div>', unsafe_allow_html=True)
     else:
         st.warning("Aucune donnée disponible pour cette période")
 
+# -----------------------------------------------------------------------------
+# ONGLET RECHERCHE : INDEX PLEIN TEXTE
+# -----------------------------------------------------------------------------
+with tab_search:
+    st.markdown("""
+    <div class="info-box">
+        <div class="info-box-title">🔎 Recherche dans l'historique des réponses</div>
+        <p style="margin:0; color: #1e40af;">
+        Retrouvez toutes les réponses IA (tous clients, toutes dates) mentionnant un terme, une phrase exacte ou citant un domaine.
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    if index_error is not None:
+        st.error(f"❌ Index de recherche indisponible : {index_error}")
+    else:
+        col_s1, col_s2, col_s3 = st.columns(3)
+        with col_s1:
+            q_termes = st.text_input("Termes (tous requis)", placeholder="ex : kit gratuit")
+        with col_s2:
+            q_phrase = st.text_input("Phrase exacte", placeholder="ex : livraison gratuite")
+        with col_s3:
+            q_domaine = st.text_input("Domaine cité", placeholder="ex : ameli.fr")
+
+        col_s4, col_s5, col_s6, col_s7 = st.columns(4)
+        with col_s4:
+            q_moteur = st.selectbox("Moteur", ["Tous"] + MOTEURS, format_func=lambda c: c if c == "Tous" else get_engine_meta(c)['label'])
+        with col_s5:
+            q_client = st.selectbox("Client", ["Tous"] + clients_disponibles, key="recherche_client")
+        with col_s6:
+            q_du = st.date_input("Du", value=min_date, min_value=min_date, max_value=max_date, key="recherche_du")
+        with col_s7:
+            q_au = st.date_input("Au", value=max_date, min_value=min_date, max_value=max_date, key="recherche_au")
+
+        par_page = 20
+        q_page = st.number_input("Page", min_value=1, value=1, step=1, key="recherche_page")
+
+        t0 = datetime.now()
+        total, resultats = search_index.search(
+            termes=q_termes, phrase=q_phrase, domaine=q_domaine,
+            moteur=None if q_moteur == "Tous" else q_moteur,
+            client=None if q_client == "Tous" else q_client,
+            date_min=q_du, date_max=q_au,
+            page=int(q_page), par_page=par_page
+        )
+        duree_ms = (datetime.now() - t0).total_seconds() * 1000
+        nb_pages = max(1, -(-total // par_page))
+        # Comptage plafonné par l'index : au-delà, "10000+" réponses
+        total_txt = f"{total}+" if total >= search_index.MAX_RESULTATS else str(total)
+        st.caption(f"{total_txt} réponse(s) en {duree_ms:.0f} ms • page {int(q_page)}/{nb_pages}")
+
+        for _, res in resultats.iterrows():
+            meta = get_engine_meta(res['moteur'])
+            st.markdown(f"""
+            <div style="border-left: 4px solid {meta['couleur']}; padding: 8px 12px; margin-bottom: 10px; background: white; border-radius: 8px;">
+                <div style="font-size: 12px; color: #64748b;">{meta['icone']} {meta['label']} • {res['client']} • {res['date'][:16]} • Score {res['score']}</div>
+                <div style="font-weight: 600;">{res['mot_cle']}</div>
+                <div style="font-size: 13px;">{search_index.make_snippet(res['texte'], q_termes, q_phrase)}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
 # -----------------------------------------------------------------------------
 # ONGLET 5 : EXPORT
 # -----------------------------------------------------------------------------
@@ -1440,7 +1906,9 @@ with tab5:
         st.markdown("Téléchargez les données brutes pour analyse avancée :")
         
         if len(df_client) > 0:
-            csv_data = df_client.to_csv(index=False).encode('utf-8')
+            texte_cols = [c for c in df_client.columns if c.startswith('Texte_')]
+            df_export = df_client.assign(**{c: df_client[c].map(decode_text) for c in texte_cols})
+            csv_data = df_export.to_csv(index=False).encode('utf-8')
             st.download_button(
                 "📥 Données complètes",
                 data=csv_data,
@@ -1471,6 +1939,6 @@ with col_f2:
     st.markdown(f"""
     <div style="text-align: center; color: #94a3b8; font-size: 12px;">
         📡 <strong>GEO-Radar Pro</strong> — Audit de Visibilité IA<br>
-        Dernière MAJ : {df['Timestamp'].max().strftime('%d/%m/%Y %H:%M')}
+        Dernière MAJ : {client_index['max'].strftime('%d/%m/%Y %H:%M')}
     </div>
     """, unsafe_allow_html=True)
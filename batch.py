@@ -0,0 +1,201 @@
+"""
+Mode batch GEO-Radar : soumission du scan aux API batch des fournisseurs.
+
+- OpenAI : upload d'un fichier JSONL (/files), création du batch (/batches),
+  polling puis téléchargement du fichier de sortie.
+- Gemini : batchGenerateContent avec requêtes inline, polling de l'opération.
+
+Le moteur choisit son API via ENGINES[code]["batch"] (voir engines.py).
+
+Les résultats sont renvoyés sous la forme {custom_id: {"body": ..., "error": ...}}
+pour alimenter le même pipeline de scoring que le mode en ligne.
+"""
+import json
+import time
+
+import requests
+
+OPENAI_TERMINAL = {"completed", "failed", "expired", "cancelled"}
+GEMINI_SUCCESS = {"BATCH_STATE_SUCCEEDED", "JOB_STATE_SUCCEEDED"}
+GEMINI_FAILURE = {
+    "BATCH_STATE_FAILED", "BATCH_STATE_CANCELLED", "BATCH_STATE_EXPIRED",
+    "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED",
+}
+
+
+# --- 1. OPENAI ---
+def submit_openai(base_url, key, lines, endpoint="/v1/chat/completions"):
+    """Upload le JSONL et crée le batch OpenAI. Retourne le job à suivre."""
+    headers = {"Authorization": f"Bearer {key}"}
+    payload = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines).encode("utf-8")
+
+    r = requests.post(
+        f"{base_url}/files",
+        headers=headers,
+        data={"purpose": "batch"},
+        files={"file": ("geo-radar-batch.jsonl", payload, "application/jsonl")},
+        timeout=120
+    )
+    r.raise_for_status()
+    file_id = r.json()["id"]
+
+    r = requests.post(
+        f"{base_url}/batches",
+        headers=headers,
+        json={"input_file_id": file_id, "endpoint": endpoint, "completion_window": "24h"},
+        timeout=60
+    )
+    r.raise_for_status()
+    return {"provider": "openai", "base_url": base_url, "key": key, "id": r.json()["id"], "size": len(lines)}
+
+
+def _download_openai_file(job, file_id):
+    """Télécharge un fichier de sortie OpenAI et l'indexe par custom_id"""
+    r = requests.get(
+        f"{job['base_url']}/files/{file_id}/content",
+        headers={"Authorization": f"Bearer {job['key']}"},
+        timeout=300
+    )
+    r.raise_for_status()
+    results = {}
+    for raw in r.text.splitlines():
+        if not raw.strip():
+            continue
+        line = json.loads(raw)
+        response = line.get("response") or {}
+        error = line.get("error")
+        if not error and response.get("status_code", 200) >= 400:
+            error = response.get("body", {}).get("error", f"HTTP {response.get('status_code')}")
+        results[line["custom_id"]] = {
+            "body": None if error else response.get("body"),
+            "error": json.dumps(error, ensure_ascii=False) if isinstance(error, dict) else error
+        }
+    return results
+
+
+def poll_openai(job):
+    """Retourne (terminé, résultats). Les résultats sont vides tant que le batch tourne."""
+    r = requests.get(
+        f"{job['base_url']}/batches/{job['id']}",
+        headers={"Authorization": f"Bearer {job['key']}"},
+        timeout=60
+    )
+    r.raise_for_status()
+    info = r.json()
+    if info.get("status") not in OPENAI_TERMINAL:
+        return False, {}
+
+    results = {}
+    for field in ("error_file_id", "output_file_id"):
+        if info.get(field):
+            results.update(_download_openai_file(job, info[field]))
+    return True, results
+
+
+# --- 2. GEMINI ---
+def submit_gemini(base_url, key, model, requests_by_key):
+    """Crée un batch Gemini à partir de requêtes inline {clé: corps generateContent}"""
+    body = {
+        "batch": {
+            "display_name": "geo-radar",
+            "input_config": {
+                "requests": {
+                    "requests": [
+                        {"request": req, "metadata": {"key": custom_id}}
+                        for custom_id, req in requests_by_key.items()
+                    ]
+                }
+            }
+        }
+    }
+    r = requests.post(
+        f"{base_url}/models/{model}:batchGenerateContent",
+        params={"key": key},
+        json=body,
+        timeout=120
+    )
+    r.raise_for_status()
+    return {"provider": "gemini", "base_url": base_url, "key": key, "id": r.json()["name"], "size": len(requests_by_key)}
+
+
+def poll_gemini(job):
+    """Retourne (terminé, résultats) pour une opération batch Gemini"""
+    r = requests.get(f"{job['base_url']}/{job['id']}", params={"key": job["key"]}, timeout=60)
+    r.raise_for_status()
+    op = r.json()
+    state = op.get("metadata", {}).get("state", "")
+
+    if state in GEMINI_FAILURE:
+        return True, {}
+    if state not in GEMINI_SUCCESS and not op.get("done"):
+        return False, {}
+
+    output = op.get("response") or op.get("metadata", {}).get("output") or {}
+    inlined = output.get("inlinedResponses", [])
+    if isinstance(inlined, dict):
+        inlined = inlined.get("inlinedResponses", [])
+
+    results = {}
+    for item in inlined:
+        custom_id = item.get("metadata", {}).get("key")
+        if custom_id is None:
+            continue
+        error = item.get("error")
+        results[custom_id] = {
+            "body": None if error else item.get("response"),
+            "error": json.dumps(error, ensure_ascii=False) if error else None
+        }
+    return True, results
+
+
+# --- 3. SOUMISSION / ATTENTE ---
+POLLERS = {"openai": poll_openai, "gemini": poll_gemini}
+
+
+def submit(provider, base_url, key, model, bodies):
+    """Soumet des corps de requête {custom_id: corps} à l'API batch déclarée par le moteur"""
+    if provider == "openai":
+        lines = [
+            {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+            for custom_id, body in bodies.items()
+        ]
+        return submit_openai(base_url, key, lines)
+    if provider == "gemini":
+        return submit_gemini(base_url, key, model, bodies)
+    raise ValueError(f"API batch inconnue : {provider}")
+
+
+def wait_for_jobs(jobs, poll_interval=60, timeout=5 * 3600):
+    """
+    Attend la fin de tous les jobs et fusionne leurs résultats.
+    Les jobs non terminés au timeout sont abandonnés : leurs requêtes
+    n'apparaissent pas dans le résultat et repassent en mode en ligne.
+    """
+    results = {}
+    pending = list(jobs)
+    deadline = time.monotonic() + timeout
+
+    while pending:
+        still_pending = []
+        for job in pending:
+            try:
+                done, job_results = POLLERS[job["provider"]](job)
+            except Exception as e:
+                print(f"   ⚠️ Batch {job['id']} : erreur de polling ({e})")
+                done, job_results = False, {}
+            if done:
+                print(f"   📦 Batch {job['id']} terminé : {len(job_results)}/{job['size']} réponses")
+                results.update(job_results)
+            else:
+                still_pending.append(job)
+
+        pending = still_pending
+        if not pending:
+            break
+        if time.monotonic() >= deadline:
+            for job in pending:
+                print(f"   ⏱️ Batch {job['id']} non terminé avant le timeout")
+            break
+        time.sleep(poll_interval)
+
+    return results
@@ -0,0 +1,177 @@
+"""
+Gouverneur de coûts des scans GEO-Radar (actif dès qu'un plafond GEO_BUDGET_MAX_USD* est fixé).
+
+- Estimation : tokens d'entrée = taille du prompt / CARACTERES_PAR_TOKEN ; tokens de
+  sortie = moyenne exponentielle des réponses précédentes du moteur (historique de la
+  feuille BUDGET_MOTEURS), TOKENS_SORTIE_DEFAUT sans historique. Coût = tokens x prix
+  du registre (ENGINES[code]["prix_entree"] / ["prix_sortie"] en $ par million de tokens,
+  ["prix_requete"] par appel), remise batch pour les moteurs qui passent par une API batch.
+- Suivi : dépense cumulée par moteur et par client pendant le scan (le coût d'une
+  requête partagée est réparti entre ses clients). Chaque requête est réservée à son
+  coût estimé avant l'envoi, puis réglée au coût réel (longueur de la réponse reçue).
+- Plafonds : total, par moteur et par client. Une requête qui dépasserait un plafond
+  n'est pas envoyée ; passé SEUIL_RALENTI du plafond, les requêtes partent une par une
+  pour que l'écart entre estimation et coût réel ne fasse pas déborder le budget.
+- Les requêtes non envoyées sont reportées (feuille REPORTS) et passent en tête du
+  scan suivant : rien n'est perdu.
+"""
+import math
+
+from engines import ENGINES
+
+BUDGET_HEADERS = ["Moteur", "Tokens_Sortie_Moyens", "Appels"]
+REPORTS_HEADERS = ["Client", "Mot_Cle", "Date"]
+
+CARACTERES_PAR_TOKEN = 4
+TOKENS_SORTIE_DEFAUT = 800
+ALPHA = 0.2
+REMISE_BATCH = 0.5
+SEUIL_RALENTI = 0.8
+TOTAL = "TOTAL"
+
+
+def estimate_tokens(text):
+    """Nombre de tokens approché d'un texte (≈ 4 caractères par token)"""
+    return math.ceil(len(text or "") / CARACTERES_PAR_TOKEN)
+
+def parse_caps(value):
+    """
+    Plafonds en $ : "5" (même plafond pour chaque moteur ou client) ou "PPLX=2,GPT=1.5".
+    Renvoie {clé: plafond}, la clé "*" portant le plafond commun.
+    """
+    caps = {}
+    for part in str(value or "").split(","):
+        key, sep, amount = part.rpartition("=")
+        try:
+            caps[key.strip() if sep else "*"] = float(amount.replace(" ", ""))
+        except ValueError:
+            continue
+    return {key: cap for key, cap in caps.items() if cap > 0}
+
+
+# =============================================================================
+# 1. HISTORIQUE (feuille BUDGET_MOTEURS)
+# =============================================================================
+def load_history(values):
+    """{moteur: {"tokens": moyenne des tokens de sortie, "n": appels}} depuis la feuille"""
+    history = {}
+    for row in values[1:]:
+        row = row + [""] * (len(BUDGET_HEADERS) - len(row))
+        try:
+            history[row[0]] = {"tokens": float(row[1]), "n": int(row[2])}
+        except ValueError:
+            continue
+    return history
+
+def dump_history(history):
+    """Lignes de la feuille BUDGET_MOTEURS (sans en-têtes)"""
+    return [[code, round(h["tokens"], 1), h["n"]] for code, h in sorted(history.items())]
+
+
+# =============================================================================
+# 2. GOUVERNEUR
+# =============================================================================
+class BudgetGovernor:
+    """
+    Dépense d'un scan par moteur et par client, sous plafonds (en $).
+    total : plafond global (0 = aucun) ; engine_caps / client_caps : sortie de parse_caps().
+    """
+
+    def __init__(self, total=0, engine_caps=None, client_caps=None, history=None, batch_mode=False):
+        self.caps = {TOTAL: total} if total > 0 else {}
+        self.engine_caps = engine_caps or {}
+        self.client_caps = client_caps or {}
+        self.history = history if history is not None else {}
+        self.batch_mode = batch_mode
+        self.spent = {}      # (type, clé) -> $ réglés
+        self.reserved = {}   # (type, clé) -> $ réservés, pas encore réglés
+        self.tokens = {}     # moteur -> tokens (entrée + sortie) réglés
+
+    def _cap(self, kind, key):
+        caps = {"total": self.caps, "moteur": self.engine_caps, "client": self.client_caps}[kind]
+        return caps.get(key, caps.get("*", 0))
+
+    def output_tokens(self, code):
+        return self.history.get(code, {}).get("tokens", TOKENS_SORTIE_DEFAUT)
+
+    def cost(self, code, tokens_in, tokens_out):
+        """Coût en $ d'un appel (prix du registre, remise batch si le moteur passe par une API batch)"""
+        engine = ENGINES[code]
+        price = (tokens_in * engine.get("prix_entree", 0) + tokens_out * engine.get("prix_sortie", 0)) / 1e6
+        price += engine.get("prix_requete", 0)
+        if self.batch_mode and engine.get("batch"):
+            price *= REMISE_BATCH
+        return price
+
+    def estimate(self, calls):
+        """Coût estimé de [(moteur, prompt)] : {moteur: $}"""
+        costs = {}
+        for code, prompt in calls:
+            costs[code] = costs.get(code, 0.0) + self.cost(code, estimate_tokens(prompt), self.output_tokens(code))
+        return costs
+
+    def _charges(self, costs, clients):
+        """Montants imputés à chaque compteur : total, moteurs, clients (part égale)"""
+        amount = sum(costs.values())
+        charges = {("total", TOTAL): amount}
+        for code, cost in costs.items():
+            charges[("moteur", code)] = cost
+        for name in clients:
+            charges[("client", name)] = charges.get(("client", name), 0.0) + amount / len(clients)
+        return charges
+
+    def _level(self, counter):
+        return self.spent.get(counter, 0.0) + self.reserved.get(counter, 0.0)
+
+    def reserve(self, costs, clients):
+        """
+        Réserve le coût estimé d'une requête ({moteur: $}) pour ses clients.
+        Faux (rien n'est réservé) si un plafond serait dépassé : la requête est à reporter.
+        """
+        charges = self._charges(costs, clients)
+        for counter, amount in charges.items():
+            cap = self._cap(*counter)
+            if cap and self._level(counter) + amount > cap:
+                return False
+        for counter, amount in charges.items():
+            self.reserved[counter] = self.reserved.get(counter, 0.0) + amount
+        return True
+
+    def settle(self, costs, clients, calls):
+        """
+        Remplace la réservation d'une requête par son coût réel.
+        calls : [(moteur, prompt, texte de la réponse)] ; une réponse vide (erreur) ne coûte
+        que son prompt et ne modifie pas l'historique des tokens de sortie.
+        """
+        for counter, amount in self._charges(costs, clients).items():
+            self.reserved[counter] = self.reserved.get(counter, 0.0) - amount
+        actual = {}
+        for code, prompt, text in calls:
+            tokens_in, tokens_out = estimate_tokens(prompt), estimate_tokens(text)
+            actual[code] = actual.get(code, 0.0) + self.cost(code, tokens_in, tokens_out)
+            self.tokens[code] = self.tokens.get(code, 0) + tokens_in + tokens_out
+            if text:
+                h = self.history.setdefault(code, {"tokens": tokens_out, "n": 0})
+                h["tokens"] = ALPHA * tokens_out + (1 - ALPHA) * h["tokens"]
+                h["n"] += 1
+        for counter, amount in self._charges(actual, clients).items():
+            self.spent[counter] = self.spent.get(counter, 0.0) + amount
+        return actual
+
+    def throttled(self):
+        """Vrai quand une dépense (réglée + réservée) atteint SEUIL_RALENTI de son plafond"""
+        counters = set(self.spent) | set(self.reserved)
+        return any(self._cap(*c) and self._level(c) >= SEUIL_RALENTI * self._cap(*c) for c in counters)
+
+    def report(self):
+        """Lignes de synthèse : dépense par moteur et par client, plafond éventuel"""
+        lines = []
+        for kind in ("total", "moteur", "client"):
+            for (k, key), amount in sorted(self.spent.items()):
+                if k != kind:
+                    continue
+                cap = self._cap(kind, key)
+                tokens = f" ({self.tokens.get(key, 0)} tokens)" if kind == "moteur" else ""
+                label = "total" if kind == "total" else f"{kind} {key}"
+                lines.append(f"{label} : {amount:.4f} $" + (f" / {cap:g} $" if cap else "") + tokens)
+        return lines
@@ -0,0 +1,173 @@
+"""
+Registre des clients GEO-Radar, partagé par monitor.py et app.py.
+
+Deux sources, fusionnées :
+- clients.json (ou GEO_CLIENTS_PATH) : fiche versionnée par client (URL cible,
+  partenaires, mots signatures, couleur d'affichage),
+- la feuille CONFIG_CIBLES : URL cible, partenaires et mots signatures de chaque
+  ligne suivie par le monitor (prioritaire pour l'URL cible, listes fusionnées).
+
+Chaque registre porte un tampon de version (empreinte des deux sources) ; tant
+qu'il ne change pas, get_registry() renvoie le même objet et les matchers compilés
+par client (domaines amis, motifs de surlignage) sont réutilisés. Ajouter un client
+= une ligne dans CONFIG_CIBLES ou une entrée dans clients.json, sans déploiement.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+
+from domains import registrable_domain
+
+CLIENTS_PATH = os.environ.get(
+    "GEO_CLIENTS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "clients.json")
+)
+DEFAULT_COLOR = "#6366f1"
+
+
+# =============================================================================
+# 1. SOURCES
+# =============================================================================
+def read_clients_file(path=CLIENTS_PATH):
+    """Contenu de clients.json ({"version": ..., "clients": {...}}), vide si absent ou illisible"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data.get("clients"), dict) else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def _split(cell):
+    return [v.strip() for v in str(cell or "").split(",") if v.strip()]
+
+def _merge_unique(*lists):
+    """Concatène des listes sans doublon (insensible à la casse), ordre conservé"""
+    seen, merged = set(), []
+    for values in lists:
+        for value in values:
+            if value.lower() not in seen:
+                seen.add(value.lower())
+                merged.append(value)
+    return merged
+
+def clients_from_sheet(all_values):
+    """Fiches client déduites des lignes de CONFIG_CIBLES (URL cible la plus fréquente, listes fusionnées)"""
+    if not all_values or len(all_values) < 2:
+        return {}
+    headers = all_values[0]
+    if "URL_Cible" not in headers:
+        return {}
+    col = {h: headers.index(h) for h in ("Client", "URL_Cible", "URLs_Partenaires", "Mots_Signatures") if h in headers}
+
+    def cell(row, name):
+        i = col.get(name)
+        return row[i] if i is not None and len(row) > i else ""
+
+    targets, partners, keywords = {}, {}, {}
+    for row in all_values[1:]:
+        target = cell(row, "URL_Cible").strip()
+        if not target:
+            continue
+        name = cell(row, "Client").strip() or "Default"
+        targets.setdefault(name, Counter())[target] += 1
+        partners[name] = _merge_unique(partners.get(name, []), _split(cell(row, "URLs_Partenaires")))
+        keywords[name] = _merge_unique(keywords.get(name, []), _split(cell(row, "Mots_Signatures")))
+
+    return {
+        name: {
+            "url_cible": counts.most_common(1)[0][0],
+            "urls_partenaires": partners[name],
+            "mots_signatures": keywords[name],
+        }
+        for name, counts in targets.items()
+    }
+
+def registry_version(file_data, sheet_values):
+    """Tampon de version : empreinte courte du fichier et des lignes de la feuille"""
+    payload = json.dumps([file_data, sheet_values or []], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# =============================================================================
+# 2. REGISTRE ET MATCHERS
+# =============================================================================
+def default_config(name=""):
+    return {"nom": name, "url_cible": "", "urls_partenaires": [], "mots_signatures": [], "couleur": DEFAULT_COLOR}
+
+class ClientMatcher:
+    """Domaines amis et motifs de surlignage d'un client, compilés une fois par version du registre"""
+
+    def __init__(self, config):
+        self.cible = registrable_domain(config.get("url_cible", ""))
+        self.partenaires = {registrable_domain(u) for u in config.get("urls_partenaires", [])} - {"", self.cible}
+        self.amis = ({self.cible} | self.partenaires) - {""}
+        # (motif, libellé, classe CSS), dans l'ordre de surlignage : cible, partenaires, mots signatures
+        friendly = [config.get("url_cible", "")] + list(config.get("urls_partenaires", []))
+        self.motifs = [
+            (re.compile(re.escape(value), re.IGNORECASE), value, "highlight-client") for value in friendly if value
+        ] + [
+            (re.compile(re.escape(kw.strip()), re.IGNORECASE), kw.strip(), "highlight-keyword")
+            for kw in config.get("mots_signatures", []) if kw and kw.strip()
+        ]
+
+    def classify(self, source):
+        """client, partenaire ou concurrent (comparaison des domaines enregistrables)"""
+        domain = registrable_domain(source) or str(source).lower()
+        if self.cible and domain == self.cible:
+            return "client"
+        if domain in self.partenaires:
+            return "partenaire"
+        return "concurrent"
+
+class ClientRegistry:
+    """Fiches client fusionnées ({nom: config}) et leur tampon de version"""
+
+    def __init__(self, clients, version):
+        self.clients = clients
+        self.version = version
+        self._matchers = {}
+
+    def names(self):
+        return list(self.clients)
+
+    def get(self, name):
+        """Fiche d'un client (valeurs par défaut s'il est inconnu)"""
+        return self.clients.get(name) or default_config(name)
+
+    def matcher(self, name):
+        if name not in self._matchers:
+            self._matchers[name] = ClientMatcher(self.get(name))
+        return self._matchers[name]
+
+def build_registry(file_data, sheet_values):
+    """Fusionne clients.json et CONFIG_CIBLES (URL cible de la feuille prioritaire, listes réunies)"""
+    clients = {}
+    sheet = clients_from_sheet(sheet_values)
+    for name in list(file_data.get("clients", {})) + [n for n in sheet if n not in file_data.get("clients", {})]:
+        base = file_data.get("clients", {}).get(name, {})
+        row = sheet.get(name, {})
+        config = default_config(name)
+        config.update({
+            "url_cible": row.get("url_cible") or base.get("url_cible", ""),
+            "urls_partenaires": _merge_unique(base.get("urls_partenaires", []), row.get("urls_partenaires", [])),
+            "mots_signatures": _merge_unique(base.get("mots_signatures", []), row.get("mots_signatures", [])),
+            "couleur": base.get("couleur") or DEFAULT_COLOR,
+        })
+        clients[name] = config
+    return ClientRegistry(clients, registry_version(file_data, sheet_values))
+
+_CURRENT = {}
+
+def get_registry(sheet_values=None, path=CLIENTS_PATH):
+    """
+    Registre courant. Reconstruit (matchers compris) seulement si le tampon de version
+    change, c'est-à-dire si clients.json ou les lignes de CONFIG_CIBLES ont été modifiés.
+    """
+    file_data = read_clients_file(path)
+    version = registry_version(file_data, sheet_values)
+    registry = _CURRENT.get("registre")
+    if registry is None or registry.version != version:
+        registry = build_registry(file_data, sheet_values)
+        _CURRENT["registre"] = registry
+    return registry
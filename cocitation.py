@@ -0,0 +1,121 @@
+"""
+Graphe de co-citation des domaines cités par les IA.
+
+Nœuds = domaines, arêtes pondérées par le nombre de réponses qui citent les deux
+domaines ensemble. Les paires sont extraites à l'ingestion (search_index.py) et
+agrégées par client et période ; le graphe reste une liste d'adjacence creuse
+({domaine: {voisin: poids}}), jamais une matrice dense.
+
+- pagerank() : centralité (itérations de puissance sur l'adjacence creuse)
+- label_propagation() : communautés de domaines co-cités
+- spring_layout() : positions pour l'affichage, calculées sur les nœuds affichés seulement
+"""
+from collections import defaultdict
+from itertools import combinations
+
+import numpy as np
+
+
+def citation_pairs(sources):
+    """Paires de domaines (triées, sans doublon) citées dans une même réponse"""
+    return list(combinations(sorted({s.strip().lower() for s in sources if s and s.strip()}), 2))
+
+
+def build_graph(edges):
+    """Adjacence creuse à partir de (a, b, poids)"""
+    adj = defaultdict(dict)
+    for a, b, w in edges:
+        adj[a][b] = adj[a].get(b, 0) + w
+        adj[b][a] = adj[b].get(a, 0) + w
+    return dict(adj)
+
+
+def weighted_degree(adj):
+    return {node: sum(nbrs.values()) for node, nbrs in adj.items()}
+
+
+def _edge_arrays(adj):
+    """Nœuds et arêtes orientées (source, cible, poids) sous forme de tableaux numpy"""
+    nodes = list(adj)
+    idx = {node: i for i, node in enumerate(nodes)}
+    src = np.fromiter((idx[a] for a, nbrs in adj.items() for _ in nbrs), dtype=np.int64)
+    dst = np.fromiter((idx[b] for nbrs in adj.values() for b in nbrs), dtype=np.int64)
+    weight = np.fromiter((w for nbrs in adj.values() for w in nbrs.values()), dtype=float)
+    return nodes, src, dst, weight
+
+
+def pagerank(adj, damping=0.85, iterations=50, tol=1e-8):
+    """PageRank pondéré sur graphe non orienté (itérations vectorisées sur les arêtes)"""
+    if not adj:
+        return {}
+    nodes, src, dst, weight = _edge_arrays(adj)
+    n = len(nodes)
+    degree = np.bincount(src, weights=weight, minlength=n)
+    degree[degree == 0] = 1
+    share = weight / degree[src]
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        new = (1 - damping) / n + damping * np.bincount(dst, weights=rank[src] * share, minlength=n)
+        delta = np.abs(new - rank).sum()
+        rank = new
+        if delta < tol:
+            break
+    return dict(zip(nodes, rank.tolist()))
+
+
+def label_propagation(adj, iterations=20):
+    """
+    Communautés par propagation d'étiquettes pondérée (synchrone, déterministe).
+    Retourne {domaine: n° de cluster}, les clusters numérotés par taille décroissante.
+    """
+    if not adj:
+        return {}
+    nodes, src, dst, weight = _edge_arrays(adj)
+    n = len(nodes)
+    labels = np.arange(n)
+    for _ in range(iterations):
+        # Poids total de chaque étiquette voisine, par nœud ; l'étiquette la plus lourde l'emporte
+        keys, inverse = np.unique(src * n + labels[dst], return_inverse=True)
+        totals = np.bincount(inverse, weights=weight)
+        key_node, key_label = keys // n, keys % n
+        order = np.lexsort((key_label, totals, key_node))
+        last = np.r_[key_node[order][1:] != key_node[order][:-1], True]
+        new = labels.copy()
+        new[key_node[order][last]] = key_label[order][last]
+        if np.array_equal(new, labels):
+            break
+        labels = new
+
+    uniques, counts = np.unique(labels, return_counts=True)
+    numbering = {label: i for i, label in enumerate(uniques[np.lexsort((uniques, -counts))].tolist())}
+    return {node: numbering[label] for node, label in zip(nodes, labels.tolist())}
+
+
+def spring_layout(adj, nodes, iterations=100, seed=42):
+    """Positions (Fruchterman-Reingold) des nœuds affichés : {domaine: (x, y)}"""
+    nodes = list(nodes)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    idx = {node: i for i, node in enumerate(nodes)}
+    weights = np.zeros((n, n))
+    for node in nodes:
+        for nbr, w in adj.get(node, {}).items():
+            if nbr in idx:
+                weights[idx[node], idx[nbr]] = w
+    if weights.max() > 0:
+        weights /= weights.max()
+
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2))
+    k = 1 / np.sqrt(n)
+    temperature = 0.1
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist = np.maximum(np.linalg.norm(delta, axis=-1), 0.01)
+        force = (k * k / dist ** 2 - weights * dist / k)
+        displacement = (delta * force[:, :, None]).sum(axis=1)
+        length = np.maximum(np.linalg.norm(displacement, axis=-1), 0.01)
+        pos += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= 0.95
+    return {node: tuple(pos[idx[node]]) for node in nodes}
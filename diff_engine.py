@@ -0,0 +1,57 @@
+"""
+Diff entre réponses IA successives d'un même (client, requête, moteur).
+
+Le diff est calculé phrase par phrase (difflib sur les listes de phrases, pas
+caractère par caractère) et complété par les sources ajoutées / supprimées.
+search_index.py le calcule une seule fois, à l'ingestion, entre chaque réponse
+et la précédente, et le conserve dans l'index local.
+"""
+import difflib
+import re
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text):
+    """Découpe une réponse en phrases (ou lignes de liste)"""
+    return [p.strip() for p in _SENTENCE_SPLIT.split(text or "") if p.strip()]
+
+
+def sentence_diff(old_text, new_text):
+    """Diff complet phrase par phrase : liste de (statut, phrase) avec statut '+', '-' ou ' '"""
+    old, new = split_sentences(old_text), split_sentences(new_text)
+    diff = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag == "equal":
+            diff.extend((" ", s) for s in old[i1:i2])
+            continue
+        diff.extend(("-", s) for s in old[i1:i2])
+        diff.extend(("+", s) for s in new[j1:j2])
+    return diff
+
+
+def diff_answers(old_text, new_text, old_sources=(), new_sources=()):
+    """
+    Résumé compact des changements entre deux réponses :
+    phrases ajoutées / supprimées, similarité (0-1), sources ajoutées / supprimées.
+    """
+    added, removed, similarity = [], [], 1.0
+    # Réponse inchangée (cas courant avec le stockage delta) : pas de découpage ni de difflib
+    if old_text != new_text:
+        old, new = split_sentences(old_text), split_sentences(new_text)
+        matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != "equal":
+                removed.extend(old[i1:i2])
+                added.extend(new[j1:j2])
+        similarity = round(matcher.ratio(), 3)
+
+    old_sources = {s.lower() for s in old_sources}
+    new_sources = {s.lower() for s in new_sources}
+    return {
+        "similarite": similarity,
+        "ajouts": added,
+        "suppressions": removed,
+        "sources_ajoutees": sorted(new_sources - old_sources),
+        "sources_supprimees": sorted(old_sources - new_sources),
+    }
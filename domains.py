@@ -0,0 +1,226 @@
+"""
+Normalisation des domaines cités (partagée par monitor.py et app.py).
+
+Toute URL, nom d'hôte ou entrée de la ligne SOURCES est ramenée à son domaine
+enregistrable (eTLD+1) selon les règles de la Public Suffix List :
+"https://www.ameli.fr/assure" -> "ameli.fr", "fr.wikipedia.org" -> "wikipedia.org",
+"sante.gouv.fr" -> "sante.gouv.fr" (gouv.fr est un suffixe public),
+"ameli.fr.evil.com" -> "evil.com".
+
+Un sous-ensemble des règles est intégré ; si le fichier officiel
+public_suffix_list.dat (https://publicsuffix.org/list/) est présent à côté de ce
+module, il est utilisé à la place. Les résultats sont mis en cache (LRU).
+
+Dans un texte libre (find_domains), un nom d'hôte nu n'est retenu que si son TLD est
+connu (TLD des règles chargées ou de BUILTIN_TLDS) : "rapport.pdf" ou "site.ensuite"
+(phrases collées) ne sont pas des domaines. Les URLs avec schéma sont toujours retenues.
+"""
+import ipaddress
+import os
+import re
+from functools import lru_cache
+
+# Sous-ensemble intégré de la Public Suffix List (format officiel : une règle par ligne,
+# "*." = joker, "!" = exception). Les TLD simples non listés sont couverts par la règle "*".
+BUILTIN_RULES = """
+com
+fr
+org
+net
+eu
+be
+ch
+ca
+de
+es
+it
+io
+co
+info
+biz
+gouv.fr
+asso.fr
+com.fr
+nom.fr
+presse.fr
+tm.fr
+notaires.fr
+avocat.fr
+co.uk
+org.uk
+gov.uk
+ac.uk
+me.uk
+ltd.uk
+plc.uk
+com.au
+net.au
+org.au
+gov.au
+edu.au
+co.nz
+co.jp
+ne.jp
+or.jp
+com.br
+com.mx
+com.ar
+com.cn
+com.tr
+co.in
+co.za
+gc.ca
+qc.ca
+admin.ch
+gv.at
+co.at
+com.es
+gob.es
+gov.it
+gouv.qc.ca
+*.ck
+!www.ck
+github.io
+gitlab.io
+blogspot.com
+blogspot.fr
+herokuapp.com
+netlify.app
+vercel.app
+pages.dev
+azurewebsites.net
+cloudfront.net
+appspot.com
+wordpress.com
+wixsite.com
+"""
+
+# TLD reconnus pour les noms d'hôte nus d'un texte libre, en plus des TLD des règles :
+# codes pays et gTLD courants (le fichier officiel, s'il est présent, les couvre tous)
+BUILTIN_TLDS = """
+ac ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo br bs bt bw by bz
+ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw cx cy cz de dj dk dm do dz ec ee eg er es et eu fi fj fk
+fm fo fr ga gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy hk hm hn hr ht hu id ie il im in io iq ir
+is it je jm jo jp ke kg kh ki km kn kp kr kw ky kz la lb lc li lk lr ls lt lu lv ly ma mc md me mg mh mk
+ml mm mn mo mp mq mr ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph pk pl
+pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg sh si sk sl sm sn so sr ss st su sv sx sy sz tc
+td tf tg th tj tk tl tm tn to tr tt tv tw tz ua ug uk us uy uz va vc ve vg vi vn vu wf ws ye yt za zm zw
+com org net edu gov mil int info biz name pro mobi aero asia cat coop jobs museum tel travel post
+app dev page blog shop store online site website web tech cloud digital agency media news live life world
+today global group company solutions services systems network email link click top xyz club vip fun
+space art design studio photo gallery music film video games bet casino fashion beauty health care
+clinic doctor dental hospital pharmacy fitness sport golf bike auto car cars immo immobilier realty
+house homes estate finance financial bank insurance money capital fund investments credit loans tax
+legal law lawyer attorney avocat consulting expert academy school university education training
+courses institute science eco green energy solar bio organic farm garden restaurant food cafe bar
+pizza wine beer recipes kitchen coffee hotel tours holiday voyage vacations flights taxi paris bzh
+alsace corsica eus gal berlin london nyc tokyo quebec brussels amsterdam barcelona swiss bayern wien
+ovh sncf leclerc orange axa bnpparibas mma total google amazon apple microsoft youtube
+"""
+
+PSL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_suffix_list.dat")
+
+_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://")
+_HOST = re.compile(r"^(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+(?:[a-z]{2,}|xn--[a-z0-9-]+)$")
+# Ponctuation entourant un nom d'hôte dans un texte ("(ameli.fr)", "[a.fr,", "but.fr.")
+_TOKEN_PUNCT = "\"'()[]{}<>,;:!?*.«»“”"
+# Délimiteurs internes à un mot : liens markdown "[IKEA](https://www.ikea.com/fr/)", "<url>", "(url)"
+_TOKEN_SPLIT = re.compile(r"[\[\](){}<>|\"']")
+
+
+def load_rules(path=PSL_PATH):
+    """Règles (normales, jokers, exceptions) : fichier officiel si présent, sinon sous-ensemble intégré"""
+    text = BUILTIN_RULES
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+
+    rules, wildcards, exceptions = set(), set(), set()
+    for line in text.splitlines():
+        line = line.strip().lower()
+        if not line or line.startswith("//"):
+            continue
+        rule = line.split()[0]
+        if rule.startswith("!"):
+            exceptions.add(rule[1:])
+        elif rule.startswith("*."):
+            wildcards.add(rule[2:])
+        else:
+            rules.add(rule)
+    return rules, wildcards, exceptions
+
+RULES, WILDCARDS, EXCEPTIONS = load_rules()
+TLDS = set(BUILTIN_TLDS.split()) | {rule.rsplit(".", 1)[-1] for rule in RULES | WILDCARDS | EXCEPTIONS}
+
+
+def normalize_host(value):
+    """Nom d'hôte en minuscules d'une URL ou d'un domaine (sans schéma, port, chemin ni point final)"""
+    host = str(value or "").strip().strip("\"'<>()[]").lower()
+    host = _SCHEME.sub("", host)
+    host = re.split(r"[/?#\s]", host, maxsplit=1)[0]
+    host = host.rsplit("@", 1)[-1].split(":")[0].strip(".")
+    return host
+
+def public_suffix_length(labels):
+    """Nombre de labels du suffixe public le plus long qui s'applique (règle par défaut "*" : 1)"""
+    best = 1
+    for i in range(len(labels)):
+        candidate = ".".join(labels[i:])
+        if candidate in EXCEPTIONS:
+            return len(labels) - i - 1
+        parent = ".".join(labels[i + 1:])
+        if candidate in RULES or (parent and parent in WILDCARDS):
+            best = max(best, len(labels) - i)
+    return best
+
+@lru_cache(maxsize=65536)
+def registrable_domain(value):
+    """
+    Domaine enregistrable (eTLD+1) d'une URL ou d'un nom d'hôte.
+    Renvoie "" si la valeur n'est pas un nom d'hôte ; une adresse IP est renvoyée telle quelle.
+    """
+    host = normalize_host(value)
+    if not host:
+        return ""
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    if not _HOST.match(host):
+        return ""
+    labels = host.split(".")
+    suffix = public_suffix_length(labels)
+    if suffix >= len(labels):
+        return host
+    return ".".join(labels[-(suffix + 1):])
+
+def has_known_tld(host):
+    """Vrai si le dernier label du nom d'hôte est un TLD connu (ou un TLD internationalisé xn--)"""
+    tld = host.rsplit(".", 1)[-1]
+    return tld in TLDS or tld.startswith("xn--")
+
+def is_same_site(a, b):
+    """Vrai si deux URLs/domaines ont le même domaine enregistrable"""
+    domain = registrable_domain(a)
+    return bool(domain) and domain == registrable_domain(b)
+
+@lru_cache(maxsize=4096)
+def find_domains(text):
+    """Domaines enregistrables mentionnés dans un texte (URLs ou noms d'hôte nus), ordre d'apparition"""
+    found = []
+    # Seuls les mots contenant un point peuvent être des noms d'hôte : pas de regex sur tout le texte
+    for token in (text or "").split():
+        if "." not in token:
+            continue
+        for part in _TOKEN_SPLIT.split(token):
+            if "." not in part:
+                continue
+            part = part.strip(_TOKEN_PUNCT)
+            # Nom d'hôte nu : TLD connu exigé (fichiers "rapport.pdf", phrases collées "site.ensuite")
+            if not _SCHEME.match(part.lower()) and not has_known_tld(normalize_host(part)):
+                continue
+            domain = registrable_domain(part)
+            if domain and domain not in found:
+                found.append(domain)
+    return tuple(found)
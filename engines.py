@@ -0,0 +1,189 @@
+"""
+Registre des moteurs IA interrogés par GEO-Radar.
+
+Chaque moteur déclare :
+- son format d'appel (constructeur de requête + parseur de réponse),
+- ses limites de débit (intervalle minimal entre deux appels, appels simultanés),
+- son API batch éventuelle,
+- son mode de sortie structurée (JSON conforme à un schéma), None si non supporté,
+- son parseur d'événements de streaming (voir streaming.py),
+- ses tarifs ($ par million de tokens d'entrée / de sortie, $ par appel) pour budget.py,
+- ses métadonnées d'affichage pour le tableau de bord (libellé, icône, couleur, conseil).
+
+Le code du moteur (clé du dict) sert de suffixe aux colonnes Score_<CODE> et
+Texte_<CODE> et de préfixe dans Sources_Detectees ("CODE:a.fr,b.com|...").
+Ajouter un moteur ou une variante de modèle = ajouter une entrée ici.
+"""
+import os
+
+
+# =============================================================================
+# 1. FORMATS D'API
+# =============================================================================
+def build_chat_request(engine, prompt, key, schema=None, stream=False, max_tokens=None):
+    """
+    Requête au format chat/completions (Perplexity, OpenAI, Mistral...).
+    schema : sortie JSON contrainte ; stream : Server-Sent Events ; max_tokens : plafond de génération.
+    """
+    body = {"model": engine["model"], "messages": [{"role": "user", "content": prompt}]}
+    if stream:
+        body["stream"] = True
+    if max_tokens:
+        body["max_tokens"] = max_tokens
+    if schema and engine.get("structured") == "openai":
+        body["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "geo_radar", "strict": True, "schema": schema},
+        }
+    elif schema and engine.get("structured") == "perplexity":
+        body["response_format"] = {"type": "json_schema", "json_schema": {"schema": schema}}
+    return {
+        "url": f"{engine['base_url']}/chat/completions",
+        "headers": {"Authorization": f"Bearer {key}"},
+        "json": body,
+    }
+
+def parse_chat_response(data):
+    """Extrait le texte d'une réponse chat/completions"""
+    return data['choices'][0]['message']['content']
+
+def parse_chat_stream_event(event):
+    """Fragment de texte d'un événement SSE chat/completions ("" si aucun)"""
+    choices = event.get('choices') or [{}]
+    return (choices[0].get('delta') or {}).get('content') or ""
+
+def to_gemini_schema(schema):
+    """Schéma JSON -> sous-ensemble OpenAPI accepté par responseSchema (sans additionalProperties)"""
+    if isinstance(schema, dict):
+        return {k: to_gemini_schema(v) for k, v in schema.items() if k != "additionalProperties"}
+    if isinstance(schema, list):
+        return [to_gemini_schema(v) for v in schema]
+    return schema
+
+def build_gemini_request(engine, prompt, key, schema=None, stream=False, max_tokens=None):
+    """
+    Requête au format generateContent (Gemini).
+    schema : sortie JSON contrainte ; stream : streamGenerateContent (SSE) ; max_tokens : plafond de génération.
+    """
+    body = {"contents": [{"parts": [{"text": prompt}]}]}
+    config = {}
+    if schema and engine.get("structured") == "gemini":
+        config["responseMimeType"] = "application/json"
+        config["responseSchema"] = to_gemini_schema(schema)
+    if max_tokens:
+        config["maxOutputTokens"] = max_tokens
+    if config:
+        body["generationConfig"] = config
+    method = "streamGenerateContent" if stream else "generateContent"
+    params = {"key": key, "alt": "sse"} if stream else {"key": key}
+    return {
+        "url": f"{engine['base_url']}/models/{engine['model']}:{method}",
+        "params": params,
+        "json": body,
+    }
+
+def parse_gemini_response(data):
+    """Extrait le texte d'une réponse generateContent"""
+    return data['candidates'][0]['content']['parts'][0]['text']
+
+def parse_gemini_stream_event(event):
+    """Fragment de texte d'un événement streamGenerateContent ("" si aucun)"""
+    candidates = event.get('candidates') or [{}]
+    parts = (candidates[0].get('content') or {}).get('parts') or []
+    return "".join(part.get('text', "") for part in parts)
+
+
+# =============================================================================
+# 2. REGISTRE
+# =============================================================================
+ENGINES = {
+    "PPLX": {
+        "label": "Perplexity",
+        "icone": "⚡",
+        "couleur": "#8B5CF6",
+        "conseil": "Ce moteur privilégie les contenus récents, les FAQ détaillées et les articles de blog informatifs.",
+        "secret": "PERPLEXITY_API_KEY",
+        "base_url": os.environ.get("PERPLEXITY_BASE_URL", "https://api.perplexity.ai"),
+        "model": "sonar",
+        "prix_entree": 1.0,
+        "prix_sortie": 1.0,
+        "prix_requete": 0.005,
+        "build_request": build_chat_request,
+        "parse_response": parse_chat_response,
+        "parse_stream": parse_chat_stream_event,
+        "intervalle_min": 2.0,
+        "max_simultanes": 2,
+        "batch": None,
+        "structured": "perplexity",
+    },
+    "GEM": {
+        "label": "Gemini",
+        "icone": "♊",
+        "couleur": "#10B981",
+        "conseil": "Ce moteur valorise les contenus bien structurés avec des données factuelles et des sources officielles.",
+        "secret": "GEMINI_API_KEY",
+        "base_url": os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta"),
+        "model": "gemini-1.5-flash",
+        "prix_entree": 0.075,
+        "prix_sortie": 0.30,
+        "build_request": build_gemini_request,
+        "parse_response": parse_gemini_response,
+        "parse_stream": parse_gemini_stream_event,
+        "intervalle_min": 2.0,
+        "max_simultanes": 2,
+        "batch": "gemini",
+        "structured": "gemini",
+    },
+    "GPT": {
+        "label": "ChatGPT",
+        "icone": "🤖",
+        "couleur": "#F59E0B",
+        "conseil": "Ce moteur s'appuie sur des contenus de référence, pédagogiques et largement repris par d'autres sites.",
+        "secret": "OPENAI_API_KEY",
+        "base_url": os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+        "model": "gpt-4o-mini",
+        "prix_entree": 0.15,
+        "prix_sortie": 0.60,
+        "build_request": build_chat_request,
+        "parse_response": parse_chat_response,
+        "parse_stream": parse_chat_stream_event,
+        "intervalle_min": 2.0,
+        "max_simultanes": 2,
+        "batch": "openai",
+        "structured": "openai",
+    },
+}
+
+DEFAULT_ENGINE = {
+    "icone": "🧠",
+    "couleur": "#64748B",
+    "conseil": "Analysez les sources que ce moteur cite le plus pour adapter vos contenus.",
+}
+
+
+def get_active_engines():
+    """Codes des moteurs à interroger (variable GEO_MOTEURS="PPLX,GEM", sinon tous)"""
+    wanted = [c.strip().upper() for c in os.environ.get("GEO_MOTEURS", "").split(",") if c.strip()]
+    if not wanted:
+        return list(ENGINES)
+    return [code for code in wanted if code in ENGINES]
+
+def supports_structured(code):
+    """Vrai si le moteur sait renvoyer une sortie JSON contrainte par un schéma"""
+    return bool(ENGINES.get(code, {}).get("structured"))
+
+def get_engine_meta(code):
+    """Métadonnées d'affichage d'un moteur (valeurs par défaut si inconnu du registre)"""
+    engine = ENGINES.get(code, {})
+    return {
+        "code": code,
+        "label": engine.get("label", code),
+        "icone": engine.get("icone", DEFAULT_ENGINE["icone"]),
+        "couleur": engine.get("couleur", DEFAULT_ENGINE["couleur"]),
+        "conseil": engine.get("conseil", DEFAULT_ENGINE["conseil"]),
+    }
+
+def engine_codes_from_columns(columns):
+    """Moteurs présents dans un jeu de données (colonnes Score_<CODE>), ordre du registre d'abord"""
+    found = [c[len("Score_"):] for c in columns if c.startswith("Score_") and c != "Score_Global"]
+    return [code for code in ENGINES if code in found] + sorted(code for code in found if code not in ENGINES)
@@ -0,0 +1,106 @@
+"""
+Banc d'essai de débit du scan complet, hors ligne et sans coût : monitor.main() tourne
+contre mock_server.py (API IA simulées : latence, erreurs, 429) et un classeur en
+mémoire (mock_sheets.py) rempli de lignes CONFIG_CIBLES synthétiques.
+
+Mesures : durée du scan, appels API et lignes écrites par seconde, appels refusés ou
+en erreur, latences simulées, appels à l'API Sheets. Les limiteurs de débit du registre
+(intervalle_min, max_simultanes) s'appliquent sauf --intervalle / --simultanes ; les
+réglages GEO_* de l'environnement (GEO_STREAM, GEO_ECHANTILLONS, GEO_BATCH_MODE,
+GEO_PLANIFICATION, GEO_BUDGET_MAX_USD...) sont pris en compte comme en production.
+
+Exemple :
+    python loadtest.py --requetes 300 --latence lognormale --latence-ms 800 --taux-429 0.02 --intervalle 0 --simultanes 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+
+import mock_server
+from mock_sheets import FakeClient
+from topics import synthetic_keywords
+
+CLASSEUR = "GEO-Radar_DATA"
+CONFIG_HEADERS = ["Client", "Mot_Cle", "URL_Cible", "URLs_Partenaires", "Mots_Signatures"]
+
+
+def synthetic_config(count, clients, shared=0.2, seed=42):
+    """
+    Lignes CONFIG_CIBLES synthétiques : count requêtes réparties entre clients, dont une
+    part "shared" reprise par un second client (requête partagée, un seul appel par moteur)
+    """
+    rng = random.Random(seed)
+    rows = [CONFIG_HEADERS]
+    for i, keyword in enumerate(synthetic_keywords(count, seed)):
+        owners = [i % clients]
+        if clients > 1 and rng.random() < shared:
+            owners.append((i + 1 + rng.randrange(clients - 1)) % clients)
+        for c in owners:
+            rows.append([f"Client {c}", keyword, f"client{c}.fr", "", "livraison,garantie"])
+    return rows
+
+def point_engines_to(base_url):
+    """URLs et clés des moteurs vers le serveur simulé (avant l'import d'engines.py)"""
+    os.environ["PERPLEXITY_BASE_URL"] = base_url
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["GEMINI_BASE_URL"] = f"{base_url}/v1beta"
+    for secret in ("PERPLEXITY_API_KEY", "OPENAI_API_KEY", "GEMINI_API_KEY"):
+        os.environ[secret] = "mock"
+    os.environ.setdefault("GEO_BATCH_POLL_SECONDS", "0")
+
+def run(args):
+    server, base_url = mock_server.start_mock_server(config=mock_server.simulation_config(args))
+    point_engines_to(base_url)
+    import monitor
+
+    for code, engine in monitor.ENGINES.items():
+        interval = engine["intervalle_min"] if args.intervalle is None else args.intervalle
+        concurrent = engine["max_simultanes"] if args.simultanes is None else args.simultanes
+        # Registre modifié pour ce processus seulement : run_online() y lit la taille du pool
+        engine["intervalle_min"], engine["max_simultanes"] = interval, concurrent
+        monitor.LIMITEURS[code] = monitor.RateLimiter(interval, concurrent)
+    if args.simultanes is not None:
+        os.environ.setdefault("GEO_MAX_WORKERS", str(args.simultanes * len(monitor.ENGINES)))
+
+    config = synthetic_config(args.requetes, args.clients, args.partage)
+    client = FakeClient({CLASSEUR: {"CONFIG_CIBLES": config, "LOGS_RESULTATS": []}}, latence_ms=args.latence_sheets_ms)
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        monitor.main(client)
+    duree = time.perf_counter() - start
+    server.shutdown()
+
+    log = output.getvalue()
+    if args.verbeux:
+        print(log)
+    for line in log.splitlines():
+        if "❌" in line:
+            print(line)
+
+    logs = client.workbooks[CLASSEUR].sheets["LOGS_RESULTATS"].rows
+    stats = server.state.stats()
+    refused = stats["par_statut"].get(429, 0)
+    failed = sum(n for status, n in stats["par_statut"].items() if status >= 500)
+    print(f"🏁 {len(config) - 1} lignes CONFIG_CIBLES, {max(0, len(logs) - 1)} lignes écrites en {duree:.1f} s")
+    print(f"   {stats['appels']} appels API : {stats['appels'] / duree:.1f} appels/s, {max(0, len(logs) - 1) / duree:.1f} lignes/s")
+    print(f"   Refusés (429) : {refused}, erreurs 5xx : {failed} ({(refused + failed) / max(1, stats['appels']):.1%})")
+    print(f"   Latence simulée : médiane {stats['latence_mediane'] * 1000:.0f} ms, p95 {stats['latence_p95'] * 1000:.0f} ms")
+    print(f"   API Sheets : {sum(client.calls.values())} appels ({', '.join(f'{m} {n}' for m, n in sorted(client.calls.items()))})")
+    return client, stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai de débit du scan GEO-Radar (hors ligne)")
+    parser.add_argument("--requetes", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--partage", type=float, default=0.2, help="Part des requêtes suivies par deux clients")
+    parser.add_argument("--intervalle", type=float, default=None, help="Intervalle min entre appels d'un moteur (défaut : registre)")
+    parser.add_argument("--simultanes", type=int, default=None, help="Appels simultanés par moteur (défaut : registre)")
+    parser.add_argument("--latence-sheets-ms", type=float, default=0)
+    parser.add_argument("--verbeux", action="store_true", help="Affiche la sortie du monitor")
+    mock_server.add_simulation_arguments(parser)
+    run(parser.parse_args())
@@ -0,0 +1,502 @@
+"""
+Serveur local simulant les API des fournisseurs IA (sans appel payant).
+
+Endpoints simulés :
+- Perplexity : POST /chat/completions
+- OpenAI     : POST /v1/chat/completions, /v1/files, /v1/batches,
+               GET /v1/batches/{id}, /v1/files/{id}/content
+- Gemini     : POST /v1beta/models/{modele}:generateContent, :streamGenerateContent,
+               /v1beta/models/{modele}:batchGenerateContent, GET /v1beta/batches/{id}
+
+Avec "stream": true (chat) ou streamGenerateContent (Gemini), la réponse est envoyée
+en Server-Sent Events, par fragments ; max_tokens / maxOutputTokens tronque le texte.
+
+Si la requête demande une sortie structurée (response_format / generationConfig),
+la réponse est un objet JSON conforme au schéma de GEO-Radar.
+
+Tests de charge : SIMULATION_DEFAUT règle la latence des appels de génération
+(fixe, uniforme, lognormale ou exponentielle), les taux d'erreurs 5xx et de 429
+(avec Retry-After) et le type de réponses : "fixe" (CANNED_ANSWER) ou "variees"
+(sources, cible, note et concurrent tirés de façon reproductible par requête et
+par modèle, corps rallongé à taille_reponse caractères). En streaming, le premier
+fragment arrive après PART_TTFT de la latence, le reste est réparti entre les
+fragments. MockState.stats() résume les appels servis (voir loadtest.py).
+
+Utilisation :
+    python mock_server.py --port 8765 --latence lognormale --latence-ms 800 --taux-429 0.02
+    PERPLEXITY_BASE_URL=http://127.0.0.1:8765 \
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 \
+    GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta python monitor.py
+"""
+import argparse
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANSWER = """Voici une réponse simulée pour « {query} ».
+
+Plusieurs sites font référence sur ce sujet, notamment https://www.exemple-reference.fr
+et https://www.comparateur-demo.com qui proposent des guides détaillés.
+
+SOURCES: [exemple-reference.fr, comparateur-demo.com, wikipedia.org]
+RECOMMANDATION: [4]
+CONCURRENT: [comparateur-demo.com]"""
+
+# Nombre de polls avant qu'un batch passe à l'état terminé
+BATCH_POLLS_BEFORE_DONE = 1
+# Taille des fragments envoyés en streaming (caractères) ; ~4 caractères par token
+STREAM_CHUNK_CHARS = 40
+CHARS_PER_TOKEN = 4
+
+SIMULATION_DEFAUT = {
+    "latence": "fixe",          # fixe, uniforme, lognormale, exponentielle
+    "latence_ms": 0,            # valeur fixe, médiane (lognormale) ou moyenne (autres)
+    "dispersion": 0.5,          # demi-largeur relative (uniforme) ou sigma (lognormale)
+    "taux_erreur": 0.0,         # part des appels en erreur 500/503
+    "taux_429": 0.0,            # part des appels refusés pour dépassement de débit
+    "retry_after": 1,           # secondes annoncées dans l'en-tête Retry-After
+    "reponses": "fixe",         # fixe (CANNED_ANSWER) ou variees
+    "taille_reponse": 1500,     # caractères du corps des réponses variées
+    "graine": 42,
+}
+# Part de la latence écoulée avant le premier fragment d'un flux
+PART_TTFT = 0.25
+
+DOMAINES_SIMULES = [
+    "exemple-reference.fr", "comparateur-demo.com", "wikipedia.org", "guide-achat.fr", "avis-conso.fr",
+    "magazine-maison.fr", "forum-pratique.com", "lesnumeriques.com", "quechoisir.org", "service-public.fr",
+    "blog-deco.fr", "test-produits.com",
+]
+PHRASES_SIMULEES = [
+    "Les critères principaux sont le prix, la qualité des matériaux et la durabilité.",
+    "Plusieurs comparatifs récents citent {source} parmi les références du secteur.",
+    "Il est conseillé de lire les avis clients avant de se décider.",
+    "Selon {source}, les offres évoluent fortement selon la saison.",
+    "La livraison et le service après-vente font souvent la différence.",
+    "On trouve des guides détaillés sur {source} pour comparer les modèles.",
+]
+
+
+def extract_query(prompt):
+    """Retrouve la question dans le prompt GEO-Radar"""
+    match = re.search(r"Question:\s*(.+)", prompt or "")
+    return match.group(1).strip() if match else "requête"
+
+
+def canned_text(prompt, max_tokens=None):
+    """Réponse texte simulée ; bloc de métadonnées en tête si le prompt le demande (streaming)"""
+    text = CANNED_ANSWER.format(query=extract_query(prompt))
+    if "Commence ta réponse par" in prompt:
+        body, _, trailer = text.partition("\n\nSOURCES")
+        text = f"SOURCES{trailer}\n\n{body}"
+    return text[:max_tokens * CHARS_PER_TOKEN] if max_tokens else text
+
+
+def extract_target(prompt):
+    """Domaine cible du prompt ciblé (None pour le prompt partagé)"""
+    match = re.search(r"pertinence de (\S+) pour cette requête", prompt or "")
+    return match.group(1).lower() if match else None
+
+
+def varied_text(prompt, model, config):
+    """
+    Réponse simulée variée mais reproductible pour un (prompt, modèle) : sources tirées
+    dans DOMAINES_SIMULES, domaine cible cité une fois sur deux à un rang aléatoire,
+    corps de taille_reponse caractères, bloc SOURCES/RECOMMANDATION/CONCURRENT.
+    """
+    query, target = extract_query(prompt), extract_target(prompt)
+    rng = random.Random(zlib.crc32(f"{config['graine']}|{model}|{prompt}".encode("utf-8")))
+    sources = rng.sample(DOMAINES_SIMULES, rng.randint(2, 5))
+    if target and rng.random() < 0.5:
+        sources.insert(rng.randrange(len(sources) + 1), target)
+    competitor = next((d for d in sources if d != target), "N/A")
+    if target:
+        reco = str(rng.randint(1, 5))
+    else:
+        reco = ", ".join(f"{d}={rng.randint(1, 5)}" for d in sources[:3])
+
+    lines = [f"Voici une synthèse pour « {query} »."]
+    while sum(len(line) + 1 for line in lines) < config["taille_reponse"]:
+        lines.append(rng.choice(PHRASES_SIMULEES).format(source=f"https://www.{rng.choice(sources)}"))
+    trailer = f"SOURCES: [{', '.join(sources)}]\nRECOMMANDATION: [{reco}]\nCONCURRENT: [{competitor}]"
+    if "Commence ta réponse par" in prompt:
+        return f"{trailer}\n\n{' '.join(lines)}"
+    return f"{' '.join(lines)}\n\n{trailer}"
+
+
+def answer_text(prompt, model, max_tokens=None, config=None):
+    """Réponse texte selon la simulation (fixe ou variée), tronquée à max_tokens"""
+    if not config or config["reponses"] != "variees":
+        return canned_text(prompt, max_tokens)
+    text = varied_text(prompt, model, config)
+    return text[:max_tokens * CHARS_PER_TOKEN] if max_tokens else text
+
+
+def chunks(text, size=STREAM_CHUNK_CHARS):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def structured_answer(query, schema):
+    """Réponse JSON conforme au schéma demandé (notes par domaine si prompt partagé)"""
+    data = {
+        "reponse": CANNED_ANSWER.format(query=query).split("\n\nSOURCES")[0],
+        "sources": ["exemple-reference.fr", "comparateur-demo.com", "wikipedia.org"],
+        "concurrent": "comparateur-demo.com",
+    }
+    if "notes" in (schema or {}).get("properties", {}):
+        data["notes"] = [{"domaine": "exemple-reference.fr", "note": 4}, {"domaine": "comparateur-demo.com", "note": 3}]
+    else:
+        data["recommandation"] = 4
+    return json.dumps(data, ensure_ascii=False)
+
+
+def chat_completion(body, config=None):
+    """Réponse au format chat/completions"""
+    prompt = body.get("messages", [{}])[-1].get("content", "")
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        content = structured_answer(extract_query(prompt), response_format["json_schema"].get("schema"))
+    else:
+        content = answer_text(prompt, body.get("model", "mock"), body.get("max_tokens"), config)
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }]
+    }
+
+
+def gemini_completion(body, simulation=None, model="gemini"):
+    """Réponse au format generateContent"""
+    prompt = body.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+    config = body.get("generationConfig") or {}
+    if config.get("responseMimeType") == "application/json":
+        text = structured_answer(extract_query(prompt), config.get("responseSchema"))
+    else:
+        text = answer_text(prompt, model, config.get("maxOutputTokens"), simulation)
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP"
+        }]
+    }
+
+
+def chat_stream_events(body, config=None):
+    """Événements SSE chat/completions (fragments "delta", puis [DONE])"""
+    content = chat_completion(body, config)["choices"][0]["message"]["content"]
+    events = [
+        {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": part}}]}
+        for part in chunks(content)
+    ]
+    events.append({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    return events + ["[DONE]"]
+
+
+def gemini_stream_events(body, config=None, model="gemini"):
+    """Événements SSE streamGenerateContent"""
+    text = gemini_completion(body, config, model)["candidates"][0]["content"]["parts"][0]["text"]
+    return [{"candidates": [{"content": {"role": "model", "parts": [{"text": part}]}}]} for part in chunks(text)]
+
+
+def parse_multipart(body, content_type):
+    """Extrait les champs d'un formulaire multipart/form-data (fichiers inclus)"""
+    boundary = content_type.split("boundary=")[-1].strip('"').encode()
+    fields = {}
+    for part in body.split(b"--" + boundary):
+        if b"\r\n\r\n" not in part:
+            continue
+        head, _, content = part.partition(b"\r\n\r\n")
+        name = re.search(rb'name="([^"]+)"', head)
+        if name:
+            fields[name.group(1).decode()] = content.rstrip(b"\r\n")
+    return fields
+
+
+class MockState:
+    """État partagé du serveur : fichiers et batchs en cours, simulation et statistiques"""
+    def __init__(self, config=None):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.files = {}
+        self.batches = {}
+        self.config = {**SIMULATION_DEFAUT, **(config or {})}
+        self.rng = random.Random(self.config["graine"])
+        self.counts = {}
+        self.latencies = []
+
+    def new_id(self, prefix):
+        with self.lock:
+            return f"{prefix}{next(self.ids)}"
+
+    def draw(self):
+        """Tire (statut HTTP, latence en secondes) d'un appel de génération"""
+        config = self.config
+        mean = config["latence_ms"] / 1000
+        with self.lock:
+            roll = self.rng.random()
+            if config["latence"] == "uniforme":
+                latency = self.rng.uniform(mean * (1 - config["dispersion"]), mean * (1 + config["dispersion"]))
+            elif config["latence"] == "lognormale":
+                latency = self.rng.lognormvariate(math.log(mean), config["dispersion"]) if mean > 0 else 0.0
+            elif config["latence"] == "exponentielle":
+                latency = self.rng.expovariate(1 / mean) if mean > 0 else 0.0
+            else:
+                latency = mean
+        if roll < config["taux_429"]:
+            status = 429
+        elif roll < config["taux_429"] + config["taux_erreur"]:
+            # Moitié 503 (surcharge), moitié 500
+            status = 503 if roll < config["taux_429"] + config["taux_erreur"] / 2 else 500
+        else:
+            status = 200
+        return status, max(0.0, latency)
+
+    def record(self, route, status, latency=None, count=1):
+        """Compte des appels servis ; latence None pour les réponses batch (hors percentiles)"""
+        with self.lock:
+            key = (route, status)
+            self.counts[key] = self.counts.get(key, 0) + count
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def stats(self):
+        """Appels servis par route et statut, latences simulées (médiane, p95)"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            counts = dict(self.counts)
+        pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+        return {
+            "appels": sum(counts.values()),
+            "par_statut": {status: sum(n for (_, s), n in counts.items() if s == status) for _, status in counts},
+            "par_route": {route: sum(n for (r, _), n in counts.items() if r == route) for route, _ in counts},
+            "latence_mediane": pick(0.5),
+            "latence_p95": pick(0.95),
+        }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload, status=200, content_type="application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_sse(self, events, latency=0.0):
+        """
+        Flux Server-Sent Events (connexion fermée à la fin ou si le client coupe) ;
+        latence simulée : PART_TTFT avant le premier fragment, le reste entre les fragments
+        """
+        time.sleep(latency * PART_TTFT)
+        gap = latency * (1 - PART_TTFT) / max(1, len(events) - 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for i, event in enumerate(events):
+                if i and gap:
+                    time.sleep(gap)
+                data = event if isinstance(event, str) else json.dumps(event, ensure_ascii=False)
+                self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _simulate(self, route):
+        """
+        Latence et erreurs simulées d'un appel de génération. Renvoie la latence restant à
+        appliquer (flux), ou None si une erreur a déjà été envoyée.
+        """
+        status, latency = self.state.draw()
+        self.state.record(route, status, latency)
+        if status == 200:
+            return latency
+        time.sleep(latency * PART_TTFT)
+        if status == 429:
+            data = json.dumps({"error": {"message": "Rate limit exceeded", "type": "rate_limit_error", "code": 429}}).encode()
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.state.config["retry_after"]))
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send({"error": {"message": "Erreur simulée du fournisseur", "code": status}}, status=status)
+        return None
+
+    # --- POST ---
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        raw = self._body()
+        config = self.state.config
+
+        if path in ("/chat/completions", "/v1/chat/completions"):
+            body = json.loads(raw)
+            latency = self._simulate("chat")
+            if latency is None:
+                return
+            if body.get("stream"):
+                return self._send_sse(chat_stream_events(body, config), latency)
+            time.sleep(latency)
+            return self._send(chat_completion(body, config))
+
+        match = re.fullmatch(r"/v1beta/models/([^/:]+):(stream)?[gG]enerateContent", path)
+        if match:
+            latency = self._simulate("gemini")
+            if latency is None:
+                return
+            if match.group(2):
+                return self._send_sse(gemini_stream_events(json.loads(raw), config, match.group(1)), latency)
+            time.sleep(latency)
+            return self._send(gemini_completion(json.loads(raw), config, match.group(1)))
+
+        if path == "/v1/files":
+            fields = parse_multipart(raw, self.headers.get("Content-Type", ""))
+            file_id = self.state.new_id("file-")
+            self.state.files[file_id] = fields.get("file", b"")
+            return self._send({"id": file_id, "object": "file", "purpose": fields.get("purpose", b"").decode()})
+
+        if path == "/v1/batches":
+            body = json.loads(raw)
+            batch_id = self.state.new_id("batch_")
+            self.state.batches[batch_id] = {"provider": "openai", "input": body["input_file_id"], "polls": 0}
+            return self._send({"id": batch_id, "object": "batch", "status": "validating"})
+
+        if re.fullmatch(r"/v1beta/models/[^/:]+:batchGenerateContent", path):
+            body = json.loads(raw)
+            batch_id = self.state.new_id("batches/")
+            requests_list = body["batch"]["input_config"]["requests"]["requests"]
+            self.state.batches[batch_id] = {"provider": "gemini", "requests": requests_list, "polls": 0}
+            return self._send({"name": batch_id, "metadata": {"state": "BATCH_STATE_PENDING"}})
+
+        self._send({"error": {"message": f"Route inconnue : {path}"}}, status=404)
+
+    # --- GET ---
+    def do_GET(self):
+        path = self.path.split("?")[0]
+
+        match = re.fullmatch(r"/v1/batches/([^/]+)", path)
+        if match and match.group(1) in self.state.batches:
+            return self._send(self._openai_batch_status(match.group(1)))
+
+        match = re.fullmatch(r"/v1/files/([^/]+)/content", path)
+        if match and match.group(1) in self.state.files:
+            return self._send(self.state.files[match.group(1)], content_type="application/jsonl")
+
+        match = re.fullmatch(r"/v1beta/(batches/[^/]+)", path)
+        if match and match.group(1) in self.state.batches:
+            return self._send(self._gemini_batch_status(match.group(1)))
+
+        self._send({"error": {"message": f"Route inconnue : {path}"}}, status=404)
+
+    def _openai_batch_status(self, batch_id):
+        job = self.state.batches[batch_id]
+        job["polls"] += 1
+        if job["polls"] <= BATCH_POLLS_BEFORE_DONE:
+            return {"id": batch_id, "status": "in_progress"}
+
+        if "output" not in job:
+            lines = []
+            for raw in self.state.files[job["input"]].decode("utf-8").splitlines():
+                if not raw.strip():
+                    continue
+                req = json.loads(raw)
+                lines.append(json.dumps({
+                    "id": f"resp-{req['custom_id']}",
+                    "custom_id": req["custom_id"],
+                    "response": {"status_code": 200, "body": chat_completion(req["body"], self.state.config)},
+                    "error": None
+                }, ensure_ascii=False))
+            self.state.record("batch", 200, count=len(lines))
+            job["output"] = self.state.new_id("file-")
+            self.state.files[job["output"]] = "\n".join(lines).encode("utf-8")
+        return {"id": batch_id, "status": "completed", "output_file_id": job["output"]}
+
+    def _gemini_batch_status(self, batch_id):
+        job = self.state.batches[batch_id]
+        job["polls"] += 1
+        if job["polls"] <= BATCH_POLLS_BEFORE_DONE:
+            return {"name": batch_id, "metadata": {"state": "BATCH_STATE_RUNNING"}}
+
+        if "output" not in job:
+            job["output"] = [
+                {"response": gemini_completion(req["request"], self.state.config), "metadata": req.get("metadata", {})}
+                for req in job["requests"]
+            ]
+            self.state.record("batch", 200, count=len(job["output"]))
+        inlined = job["output"]
+        return {
+            "name": batch_id,
+            "done": True,
+            "metadata": {"state": "BATCH_STATE_SUCCEEDED"},
+            "response": {"inlinedResponses": {"inlinedResponses": inlined}}
+        }
+
+
+def start_mock_server(host="127.0.0.1", port=0, config=None):
+    """
+    Démarre le serveur dans un thread. Retourne (serveur, url de base) ;
+    server.state donne accès à la simulation et aux statistiques.
+    """
+    state = MockState(config)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_simulation_arguments(parser):
+    """Options de simulation communes à ce serveur et à loadtest.py"""
+    parser.add_argument("--latence", choices=["fixe", "uniforme", "lognormale", "exponentielle"], default=SIMULATION_DEFAUT["latence"])
+    parser.add_argument("--latence-ms", type=float, default=SIMULATION_DEFAUT["latence_ms"])
+    parser.add_argument("--dispersion", type=float, default=SIMULATION_DEFAUT["dispersion"])
+    parser.add_argument("--taux-erreur", type=float, default=SIMULATION_DEFAUT["taux_erreur"])
+    parser.add_argument("--taux-429", type=float, default=SIMULATION_DEFAUT["taux_429"])
+    parser.add_argument("--reponses", choices=["fixe", "variees"], default=SIMULATION_DEFAUT["reponses"])
+    parser.add_argument("--taille-reponse", type=int, default=SIMULATION_DEFAUT["taille_reponse"])
+
+
+def simulation_config(args):
+    """Options de la ligne de commande -> dict de simulation"""
+    return {
+        "latence": args.latence, "latence_ms": args.latence_ms, "dispersion": args.dispersion,
+        "taux_erreur": args.taux_erreur, "taux_429": args.taux_429,
+        "reponses": args.reponses, "taille_reponse": args.taille_reponse,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local simulant les API IA de GEO-Radar")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_simulation_arguments(parser)
+    args = parser.parse_args()
+
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(simulation_config(args))})
+    print(f"🧪 Serveur simulé sur http://{args.host}:{args.port}")
+    ThreadingHTTPServer((args.host, args.port), handler).serve_forever()
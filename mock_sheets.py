@@ -0,0 +1,187 @@
+"""
+Classeur Google Sheets simulé en mémoire, pour faire tourner monitor.py hors ligne
+(tests de charge avec mock_server.py, voir loadtest.py).
+
+Reprend le sous-ensemble de l'API gspread utilisé par GEO-Radar :
+- client : open(nom),
+- classeur : worksheet(titre) (WorksheetNotFound si absente), add_worksheet(), worksheets(),
+- feuille : get_all_values(), get(plage A1), row_values(), col_values(), append_rows()
+  (réponse avec "updates.updatedRange" comme l'API), update('A1', valeurs), clear(),
+  add_rows(), add_cols(), row_count, col_count.
+
+Les cellules sont stockées en chaînes, comme les renvoie l'API. latence_ms simule la
+durée d'un appel à l'API Sheets ; calls compte les appels par méthode.
+"""
+import re
+import threading
+import time
+
+try:
+    from gspread.exceptions import WorksheetNotFound
+except ImportError:
+    class WorksheetNotFound(Exception):
+        """Feuille absente du classeur (gspread non installé)"""
+
+_CELL = re.compile(r"([A-Z]+)(\d+)")
+
+
+def column_number(letters):
+    """Lettres de colonne -> numéro (A -> 1, AA -> 27)"""
+    number = 0
+    for ch in letters:
+        number = number * 26 + ord(ch) - ord("A") + 1
+    return number
+
+def column_letters(number):
+    """Numéro de colonne -> lettres (1 -> A, 27 -> AA)"""
+    letters = ""
+    while number:
+        number, rest = divmod(number - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+def parse_cell(a1):
+    """Cellule A1 -> (ligne, colonne) : B12 -> (12, 2)"""
+    match = _CELL.fullmatch(a1.split("!")[-1].upper())
+    if not match:
+        raise ValueError(f"Cellule A1 invalide : {a1}")
+    return int(match.group(2)), column_number(match.group(1))
+
+def to_cell(value):
+    """Valeur telle que relue depuis l'API (chaîne, entiers sans ".0")"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class FakeWorksheet:
+    """Feuille en mémoire (lignes de chaînes, sans cellules vides de fin)"""
+
+    def __init__(self, spreadsheet, title, rows=1000, cols=26, values=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self.rows = [[to_cell(v) for v in row] for row in values or []]
+        self.row_count = max(self.row_count, len(self.rows))
+
+    def _call(self, method):
+        self.spreadsheet.client.tick(method)
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        width = max((len(row) for row in self.rows), default=0)
+        return [row + [""] * (width - len(row)) for row in self.rows]
+
+    def get(self, a1_range):
+        """Valeurs d'une plage "A2:N40" (lignes vides de fin retirées)"""
+        self._call("get")
+        start, _, end = a1_range.partition(":")
+        (r0, c0), (r1, c1) = parse_cell(start), parse_cell(end or start)
+        values = [row[c0 - 1:c1] for row in self.rows[r0 - 1:r1]]
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+    def row_values(self, row):
+        self._call("row_values")
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._call("col_values")
+        values = [row[col - 1] if len(row) >= col else "" for row in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def append_rows(self, rows, value_input_option="RAW", **kwargs):
+        self._call("append_rows")
+        first = len(self.rows) + 1
+        self.rows.extend([to_cell(v) for v in row] for row in rows)
+        self.row_count = max(self.row_count, len(self.rows))
+        width = max((len(row) for row in rows), default=1)
+        return {"updates": {
+            "updatedRange": f"{self.title}!A{first}:{column_letters(width)}{len(self.rows)}",
+            "updatedRows": len(rows),
+        }}
+
+    def append_row(self, values, value_input_option="RAW", **kwargs):
+        return self.append_rows([values], value_input_option)
+
+    def update(self, a1, values, **kwargs):
+        self._call("update")
+        r0, c0 = parse_cell(a1)
+        for i, values_row in enumerate(values):
+            while len(self.rows) < r0 + i:
+                self.rows.append([])
+            row = self.rows[r0 + i - 1]
+            if len(row) < c0 - 1 + len(values_row):
+                row.extend([""] * (c0 - 1 + len(values_row) - len(row)))
+            row[c0 - 1:c0 - 1 + len(values_row)] = [to_cell(v) for v in values_row]
+        self.row_count = max(self.row_count, len(self.rows))
+        return {"updatedRange": f"{self.title}!{a1}"}
+
+    def clear(self):
+        self._call("clear")
+        self.rows = []
+
+    def add_rows(self, count):
+        self._call("add_rows")
+        self.row_count += count
+
+    def add_cols(self, count):
+        self._call("add_cols")
+        self.col_count += count
+
+
+class FakeSpreadsheet:
+    """Classeur en mémoire : {titre: FakeWorksheet}"""
+
+    def __init__(self, client, title, sheets=None):
+        self.client = client
+        self.title = title
+        self.sheets = {}
+        for name, values in (sheets or {}).items():
+            self.sheets[name] = FakeWorksheet(self, name, values=values)
+
+    def worksheet(self, title):
+        self.client.tick("worksheet")
+        if title not in self.sheets:
+            raise WorksheetNotFound(title)
+        return self.sheets[title]
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self.client.tick("add_worksheet")
+        self.sheets[title] = FakeWorksheet(self, title, rows, cols)
+        return self.sheets[title]
+
+    def worksheets(self):
+        self.client.tick("worksheets")
+        return list(self.sheets.values())
+
+
+class FakeClient:
+    """
+    Client gspread simulé : classeurs créés à la volée, appels comptés par méthode,
+    latence_ms par appel (l'API Sheets répond typiquement en 100 à 500 ms).
+    """
+
+    def __init__(self, workbooks=None, latence_ms=0):
+        self.latence = latence_ms / 1000
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.workbooks = {name: FakeSpreadsheet(self, name, sheets) for name, sheets in (workbooks or {}).items()}
+
+    def tick(self, method):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latence:
+            time.sleep(self.latence)
+
+    def open(self, title):
+        self.tick("open")
+        if title not in self.workbooks:
+            self.workbooks[title] = FakeSpreadsheet(self, title)
+        return self.workbooks[title]
@@ -2,11 +2,26 @@ import gspread
 import json
 import os
 import time
-import re
+import threading
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from oauth2client.service_account import ServiceAccountCredentials
 import requests
 
+import alerts
+import batch
+import budget
+import clients
+import scheduler
+import streaming
+from prominence import ProminenceScorer
+from domains import registrable_domain
+from response_parser import EMPTY, parse_response, parse_structured, structured_schema
+from stats import summarize_samples
+from storage import REF_PREFIX, encode_text, fingerprint, is_same_answer, make_ref
+from engines import ENGINES, get_active_engines, supports_structured
+
 # --- 1. GESTION DES SECRETS (Compatible GitHub & Streamlit) ---
 def get_secret(key):
     """Récupère un secret depuis les variables d'environnement ou Streamlit"""
@@ -43,127 +58,177 @@ def connect_sheets():
     scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
     return gspread.authorize(ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope))
 
-# --- 3. FONCTIONS IA ---
-def ask_perplexity(query, target):
-    """Interroge l'API Perplexity"""
-    key = get_secret('PERPLEXITY_API_KEY')
-    if not key:
-        return {"error": "Clé PERPLEXITY_API_KEY manquante", "text": "", "sources": []}
-
-    prompt = f"""Tu es un expert SEO. Réponds à la question suivante de manière détaillée et cite tes sources.
-
-Question: {query}
+def get_or_create_worksheet(sh, title, headers):
+    """Ouvre une feuille du classeur, la crée avec ses en-têtes si elle n'existe pas"""
+    try:
+        return sh.worksheet(title)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = sh.add_worksheet(title=title, rows=1000, cols=len(headers))
+        ws.update('A1', [headers])
+        return ws
+
+def rewrite_worksheet(ws, headers, rows):
+    """Réécrit entièrement une petite feuille d'état (en-têtes + lignes)"""
+    if len(rows) + 1 > ws.row_count:
+        ws.add_rows(len(rows) + 1 - ws.row_count)
+    ws.clear()
+    ws.update('A1', [headers] + rows)
+
+METADONNEES_HEADERS = ["Cle", "Valeur"]
+
+def count_data_rows(ws, append_response=None):
+    """
+    Nombre de lignes de données de la feuille : lu dans la réponse d'append_rows
+    ("updatedRange": "LOGS_RESULTATS!A2:O4" -> 3) sinon en relisant la colonne A.
+    """
+    try:
+        end = append_response["updates"]["updatedRange"].split("!")[-1].split(":")[-1]
+        return int("".join(c for c in end if c.isdigit())) - 1
+    except (TypeError, KeyError, ValueError):
+        return len(ws.col_values(1)) - 1
 
-À la fin de ta réponse, ajoute une ligne avec le format suivant:
-SOURCES: [liste des domaines sources séparés par des virgules]
-RECOMMANDATION: [note de 1 à 5 sur la pertinence de {target} pour cette requête]
-CONCURRENT: [domaine du concurrent principal mentionné]"""
+def publish_data_version(sh, rows_count, last_date, columns):
+    """
+    Publie le marqueur de version des données (feuille METADONNEES) : le tableau de bord
+    ne relit que ce marqueur et ne recharge LOGS_RESULTATS que lorsqu'il change.
+    """
+    ws = get_or_create_worksheet(sh, "METADONNEES", METADONNEES_HEADERS)
+    rewrite_worksheet(ws, METADONNEES_HEADERS, [
+        ["version", f"{rows_count}|{last_date}|{columns}"],
+        ["lignes", rows_count],
+        ["derniere_date", last_date],
+        ["colonnes", columns],
+        ["scan", datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
+    ])
 
-    try:
-        r = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            json={"model": "sonar", "messages": [{"role": "user", "content": prompt}]},
-            headers={"Authorization": f"Bearer {key}"},
-            timeout=60
-        )
-        r.raise_for_status()
-        text = r.json()['choices'][0]['message']['content']
-        sources = extract_sources(text)
-        return {"text": text, "sources": sources, "error": None}
-    except Exception as e:
-        return {"error": str(e), "text": "", "sources": []}
+# --- 3. FONCTIONS IA ---
+def build_prompt(query, target=None, structured=False, stream=False):
+    """
+    Construit le prompt commun à tous les moteurs.
+    Sans cible (requête partagée par plusieurs clients), la note de recommandation
+    est demandée pour chaque site recommandé au format domaine=note.
+    En mode structuré, les métadonnées sont demandées comme champs JSON (schéma
+    imposé par l'API) au lieu des lignes de fin de réponse. En streaming, elles sont
+    demandées en tête pour survivre à la coupure au budget de caractères.
+    """
+    if structured:
+        if target:
+            reco_field = f'"recommandation": note de 1 à 5 sur la pertinence de {target} pour cette requête'
+        else:
+            reco_field = '"notes": pour chaque site recommandé, {"domaine": ..., "note": de 1 à 5}'
+        return f"""Tu es un expert SEO. Réponds à la question suivante de manière détaillée et cite tes sources.
 
-def ask_gemini(query, target):
-    """Interroge l'API Google Gemini"""
-    key = get_secret('GEMINI_API_KEY')
-    if not key:
-        return {"error": "Clé GEMINI_API_KEY manquante", "text": "", "sources": []}
+Question: {query}
 
-    prompt = f"""Tu es un expert SEO. Réponds à la question suivante de manière détaillée et cite tes sources.
+Réponds en JSON avec les champs :
+"reponse": ta réponse complète,
+"sources": liste des domaines sources,
+{reco_field},
+"concurrent": domaine du concurrent principal mentionné ("N/A" si aucun)"""
+    if target:
+        reco_line = f"RECOMMANDATION: [note de 1 à 5 sur la pertinence de {target} pour cette requête]"
+    else:
+        reco_line = "RECOMMANDATION: [pour chaque site recommandé, domaine=note de 1 à 5, séparés par des virgules]"
+    placement = "Commence ta réponse par" if stream else "À la fin de ta réponse, ajoute"
+    return f"""Tu es un expert SEO. Réponds à la question suivante de manière détaillée et cite tes sources.
 
 Question: {query}
 
-À la fin de ta réponse, ajoute une ligne avec le format suivant:
+{placement} les lignes au format suivant:
 SOURCES: [liste des domaines sources séparés par des virgules]
-RECOMMANDATION: [note de 1 à 5 sur la pertinence de {target} pour cette requête]
+{reco_line}
 CONCURRENT: [domaine du concurrent principal mentionné]"""
 
-    try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={key}"
-        r = requests.post(
-            url,
-            json={"contents": [{"parts": [{"text": prompt}]}]},
-            timeout=60
-        )
-        r.raise_for_status()
-        text = r.json()['candidates'][0]['content']['parts'][0]['text']
-        sources = extract_sources(text)
-        return {"text": text, "sources": sources, "error": None}
-    except Exception as e:
-        return {"error": str(e), "text": "", "sources": []}
-
-def ask_chatgpt(query, target):
-    """Interroge l'API OpenAI ChatGPT"""
-    key = get_secret('OPENAI_API_KEY')
-    if not key:
-        return {"error": "Clé OPENAI_API_KEY manquante", "text": "", "sources": []}
+def make_result(text="", error=None, structured=False, shared=False):
+    """
+    Format de résultat commun à tous les moteurs.
+    Sortie structurée : le JSON validé est réécrit en texte + bloc final canonique ;
+    s'il est invalide, repli sur l'analyse regex du texte brut.
+    """
+    if error:
+        return {"error": error, "text": "", "sources": [], "parsed": EMPTY}
+    if structured:
+        text, parsed = parse_structured(text, shared)
+    else:
+        parsed = parse_response(text)
+    return {"text": text, "sources": list(parsed.sources), "error": None, "parsed": parsed}
 
-    prompt = f"""Tu es un expert SEO. Réponds à la question suivante de manière détaillée et cite tes sources.
+def use_structured(code):
+    """Sortie structurée demandée (GEO_STRUCTURED=1) et supportée par le moteur"""
+    return is_enabled("GEO_STRUCTURED") and supports_structured(code)
 
-Question: {query}
+def use_stream(code):
+    """
+    Streaming demandé (GEO_STREAM=1) et supporté par le moteur.
+    La sortie structurée est prioritaire : un JSON coupé au budget serait invalide.
+    """
+    return is_enabled("GEO_STREAM") and bool(ENGINES[code].get("parse_stream")) and not use_structured(code)
 
-À la fin de ta réponse, ajoute une ligne avec le format suivant:
-SOURCES: [liste des domaines sources séparés par des virgules]
-RECOMMANDATION: [note de 1 à 5 sur la pertinence de {target} pour cette requête]
-CONCURRENT: [domaine du concurrent principal mentionné]"""
+def build_engine_request(code, query, target, key, stream=False):
+    """
+    Requête HTTP d'un moteur pour une requête (schéma JSON joint en mode structuré,
+    plafond GEO_STREAM_MAX_TOKENS en streaming)
+    """
+    engine = ENGINES[code]
+    structured = use_structured(code)
+    schema = structured_schema(shared=not target) if structured else None
+    max_tokens = get_int_setting("GEO_STREAM_MAX_TOKENS", 1200) if stream else None
+    return engine["build_request"](
+        engine, build_prompt(query, target, structured, stream), key,
+        schema=schema, stream=stream, max_tokens=max_tokens
+    )
+
+def ask_engine_stream(code, query, target, key):
+    """
+    Interroge un moteur en streaming : la lecture s'arrête au budget GEO_STREAM_MAX_CHARS
+    (défaut 5 000, la taille stockée). Ajoute au résultat TTFT, durée et indicateur de coupure.
+    """
+    engine = ENGINES[code]
+    collector = streaming.stream_completion(
+        build_engine_request(code, query, target, key, stream=True),
+        engine["parse_stream"],
+        max_chars=get_int_setting("GEO_STREAM_MAX_CHARS", 5000),
+    )
+    if not collector.text:
+        return make_result(error="Flux vide")
+    result = make_result(streaming.move_header_to_end(collector.text))
+    result["latence"] = {"ttft": round(collector.ttft, 3), "duree": round(collector.duree, 3), "tronque": collector.tronque}
+    return result
+
+def ask_engine(code, query, target):
+    """Interroge un moteur du registre (engines.ENGINES)"""
+    engine = ENGINES[code]
+    key = get_secret(engine["secret"])
+    if not key:
+        return make_result(error=f"Clé {engine['secret']} manquante")
 
     try:
-        r = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            json={"model": "gpt-4o-mini", "messages": [{"role": "user", "content": prompt}]},
-            headers={"Authorization": f"Bearer {key}"},
-            timeout=60
-        )
+        if use_stream(code):
+            return ask_engine_stream(code, query, target, key)
+        r = requests.post(timeout=60, **build_engine_request(code, query, target, key))
         r.raise_for_status()
-        text = r.json()['choices'][0]['message']['content']
-        sources = extract_sources(text)
-        return {"text": text, "sources": sources, "error": None}
+        return make_result(engine["parse_response"](r.json()), structured=use_structured(code), shared=not target)
     except Exception as e:
-        return {"error": str(e), "text": "", "sources": []}
+        return make_result(error=str(e))
 
 # --- 4. EXTRACTION ET CALCUL ---
+# L'analyse des réponses est faite en une passe par response_parser.parse_response() ;
+# ces fonctions en exposent chacune un champ.
 def extract_sources(text):
-    """Extrait les sources mentionnées dans la réponse"""
-    sources = []
-    # Cherche les URLs
-    url_pattern = r'https?://(?:www\.)?([a-zA-Z0-9-]+(?:\.[a-zA-Z]{2,})+)'
-    urls = re.findall(url_pattern, text)
-    sources.extend(urls)
-
-    # Cherche la ligne SOURCES:
-    sources_match = re.search(r'SOURCES?:\s*\[?([^\]\n]+)\]?', text, re.IGNORECASE)
-    if sources_match:
-        raw_sources = sources_match.group(1)
-        for src in raw_sources.split(','):
-            src = src.strip().strip('"\'')
-            if src and src not in sources:
-                sources.append(src)
-
-    return list(set(sources))[:10]  # Max 10 sources uniques
-
-def extract_recommendation(text):
-    """Extrait la note de recommandation (1-5)"""
-    match = re.search(r'RECOMMANDATION:\s*(\d)', text, re.IGNORECASE)
-    if match:
-        return min(5, max(1, int(match.group(1))))
-    return 3  # Valeur par défaut
+    """Extrait les sources mentionnées dans la réponse (domaines enregistrables, ordre d'apparition)"""
+    return list(parse_response(text).sources)
+
+def extract_recommendation(text, target=None):
+    """
+    Extrait la note de recommandation (1-5).
+    Réponse à un prompt partagé ("RECOMMANDATION: a.fr=4, b.com=2") : note du domaine cible,
+    1 si la cible n'est pas recommandée.
+    """
+    return parse_response(text).recommendation_for(get_target_domain(target) if target else None)
 
 def extract_competitor(text):
     """Extrait le concurrent principal mentionné"""
-    match = re.search(r'CONCURRENT:\s*\[?([^\]\n,]+)', text, re.IGNORECASE)
-    if match:
-        return match.group(1).strip().strip('"\'')
-    return "N/A"
+    return parse_response(text).concurrent
 
 def calculate_geo_score(text, target, partners=None, keywords=None):
     """
@@ -176,18 +241,17 @@ def calculate_geo_score(text, target, partners=None, keywords=None):
         return 0
 
     text_lower = text.lower()
+    parsed = parse_response(text)
     score = 0
 
     # Score pour mention du site cible
-    target_domain = target.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].lower()
-    if target_domain in text_lower:
+    if parsed.mentions(get_target_domain(target)):
         score += 50
 
     # Score pour partenaires
     if partners:
         for partner in partners:
-            partner_clean = partner.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].lower()
-            if partner_clean in text_lower:
+            if parsed.mentions(registrable_domain(partner)):
                 score += 10
                 break  # Max 20 pts pour partenaires (on pourrait additionner)
 
@@ -201,13 +265,500 @@ def calculate_geo_score(text, target, partners=None, keywords=None):
 
     return min(100, score)
 
-# --- 5. MAIN ---
-def main():
-    print("🚀 DÉMARRAGE GEO-RADAR MONITOR (V4 - Multi-moteurs)...")
+# Mentions détaillées (GEO_PROMINENCE=1) : une ligne par cible, partenaire, mot signature ou source repéré
+MENTIONS_HEADERS = ["Date", "Client", "Mot_Cle", "Moteur", "Type", "Valeur", "Position", "Rang", "Poids"]
+
+def make_scorer(target, partners=None, keywords=None):
+    """
+    Fonction de score d'une ligne de configuration : (texte, ParsedResponse) -> (score, mentions).
+    Barème de présence historique par défaut ; pondéré par la proéminence avec GEO_PROMINENCE=1.
+    """
+    if is_enabled("GEO_PROMINENCE"):
+        return ProminenceScorer(target, partners, keywords).score
+    return lambda text, parsed: (calculate_geo_score(text, target, partners, keywords), [])
+
+# --- 5. EXÉCUTION DU SCAN (EN LIGNE / BATCH) ---
+class RateLimiter:
+    """Limites de débit d'un moteur : intervalle minimal entre appels et appels simultanés (thread-safe)"""
+    def __init__(self, min_interval, max_concurrent=1):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            slot = max(time.monotonic(), self.next_slot)
+            self.next_slot = slot + self.min_interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def __enter__(self):
+        self.slots.acquire()
+        self.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self.slots.release()
+
+LIMITEURS = {
+    code: RateLimiter(engine["intervalle_min"], engine["max_simultanes"])
+    for code, engine in ENGINES.items()
+}
+
+def get_int_setting(key, default):
+    """Lit un réglage numérique (variable d'environnement ou secret Streamlit)"""
+    value = get_secret(key)
+    try:
+        return int(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+def get_float_setting(key, default):
+    """Lit un réglage décimal (variable d'environnement ou secret Streamlit)"""
+    value = get_secret(key)
+    try:
+        return float(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+def is_enabled(key):
+    """Lit un interrupteur booléen ("1", "true", "oui"...)"""
+    return str(get_secret(key) or "").strip().lower() in ("1", "true", "yes", "oui", "on")
+
+def task_id(task):
+    """Identifiant texte d'une tâche (idx requête, moteur, n° d'échantillon), utilisé comme custom_id batch"""
+    return "|".join(str(part) for part in task)
+
+def plan_scan(items):
+    """
+    Regroupe les lignes de CONFIG_CIBLES par requête (casse et espaces normalisés) :
+    une seule génération par (requête, moteur), scorée ensuite localement pour chaque client.
+    Une requête suivie par une seule cible garde le prompt ciblé ; partagée entre
+    plusieurs cibles, elle passe au prompt neutre (sans {target}).
+    """
+    groups = {}
+    for idx, item in enumerate(items):
+        key = " ".join(item["query"].lower().split())
+        group = groups.setdefault(key, {"query": item["query"], "targets": [], "members": []})
+        group["members"].append(idx)
+        if item["target"].lower() not in group["targets"]:
+            group["targets"].append(item["target"].lower())
+
+    queries = []
+    for group in groups.values():
+        target = items[group["members"][0]]["target"] if len(group["targets"]) == 1 else None
+        queries.append({"query": group["query"], "target": target, "members": group["members"]})
+    return queries
+
+def run_online(items, tasks):
+    """Exécute les appels en parallèle, chaque moteur restant sous son limiteur de débit"""
+    def run(task):
+        idx, code = task[0], task[1]
+        item = items[idx]
+        with LIMITEURS[code]:
+            return task, ask_engine(code, item["query"], item["target"])
+
+    results = {}
+    if not tasks:
+        return results
+    max_workers = sum(ENGINES[code]["max_simultanes"] for code in {task[1] for task in tasks})
+    with ThreadPoolExecutor(max_workers=min(max_workers, get_int_setting("GEO_MAX_WORKERS", 16))) as pool:
+        for task, res in pool.map(run, tasks):
+            results[task] = res
+    return results
+
+def submit_batches(items, tasks):
+    """
+    Soumet aux API batch les tâches des moteurs qui en déclarent une (ENGINES[code]["batch"]).
+    Retourne (jobs, tâches restantes pour le mode en ligne).
+    """
+    jobs = []
+    remaining = []
+    by_engine = {}
+    for task in tasks:
+        by_engine.setdefault(task[1], []).append(task)
+
+    for code, engine_tasks in by_engine.items():
+        engine = ENGINES[code]
+        key = get_secret(engine["secret"])
+        if not engine["batch"] or not key:
+            remaining.extend(engine_tasks)
+            continue
+        try:
+            bodies = {
+                task_id(task): build_engine_request(code, items[task[0]]["query"], items[task[0]]["target"], key)["json"]
+                for task in engine_tasks
+            }
+            jobs.append(batch.submit(engine["batch"], engine["base_url"], key, engine["model"], bodies))
+            print(f"   📦 Batch {code} soumis ({len(engine_tasks)} requêtes)")
+        except Exception as e:
+            print(f"   ⚠️ Batch {code} impossible ({e}) → mode en ligne")
+            remaining.extend(engine_tasks)
+
+    return jobs, remaining
+
+def run_batch(items, tasks):
+    """
+    Mode batch : les moteurs compatibles passent par les API batch,
+    les autres (et les requêtes en échec côté batch) par le mode en ligne.
+    """
+    jobs, remaining = submit_batches(items, tasks)
+
+    # Les moteurs sans API batch tournent pendant que les batchs sont traités
+    results = run_online(items, remaining)
+
+    raw = batch.wait_for_jobs(
+        jobs,
+        poll_interval=get_int_setting("GEO_BATCH_POLL_SECONDS", 60),
+        timeout=get_int_setting("GEO_BATCH_TIMEOUT", 5 * 3600)
+    )
+
+    retry = []
+    for task in tasks:
+        if task in results:
+            continue
+        entry = raw.get(task_id(task))
+        if not entry or entry["error"]:
+            retry.append(task)
+            continue
+        try:
+            results[task] = make_result(
+                ENGINES[task[1]]["parse_response"](entry["body"]),
+                structured=use_structured(task[1]), shared=not items[task[0]]["target"]
+            )
+        except (KeyError, IndexError, TypeError) as e:
+            results[task] = make_result(error=f"Réponse batch invalide : {e}")
+
+    if retry:
+        print(f"   🔁 {len(retry)} requêtes batch manquantes → mode en ligne")
+        results.update(run_online(items, retry))
+    return results
+
+def load_targets(all_values, registry=None):
+    """
+    Transforme les lignes de CONFIG_CIBLES en liste de requêtes à analyser.
+    Avec un registre (GEO_REGISTRE_COMPLETE=1), partenaires et mots signatures laissés
+    vides sur une ligne sont repris de la fiche du client (clients.py).
+    """
+    headers = all_values[0]
+    idx_kw = headers.index("Mot_Cle")
+    idx_url = headers.index("URL_Cible")
+
+    # Colonnes optionnelles
+    idx_partners = headers.index("URLs_Partenaires") if "URLs_Partenaires" in headers else None
+    idx_keywords = headers.index("Mots_Signatures") if "Mots_Signatures" in headers else None
+    idx_client = headers.index("Client") if "Client" in headers else None
+    idx_frequency = headers.index("Frequence") if "Frequence" in headers else None
+
+    items = []
+    for row in all_values[1:]:
+        if len(row) <= idx_url:
+            continue
+
+        query = row[idx_kw].strip()
+        target = row[idx_url].strip()
+
+        if not query or not target:
+            continue
+
+        # Données optionnelles
+        client_name = row[idx_client].strip() if idx_client is not None and len(row) > idx_client else "Default"
+        partners = row[idx_partners].split(',') if idx_partners is not None and len(row) > idx_partners else []
+        keywords = row[idx_keywords].split(',') if idx_keywords is not None and len(row) > idx_keywords else []
+        frequency = row[idx_frequency] if idx_frequency is not None and len(row) > idx_frequency else ""
+
+        partners = [p.strip() for p in partners if p.strip()]
+        keywords = [k.strip() for k in keywords if k.strip()]
+        if registry is not None:
+            config = registry.get(client_name)
+            partners = partners or list(config["urls_partenaires"])
+            keywords = keywords or list(config["mots_signatures"])
+
+        items.append({
+            "client": client_name,
+            "query": query,
+            "target": target,
+            "partners": partners,
+            "keywords": keywords,
+            "frequence": scheduler.parse_frequency(frequency),
+        })
+    return items
+
+def get_log_headers(codes, samples=1, stream=False):
+    """Colonnes de LOGS_RESULTATS pour les moteurs donnés"""
+    headers = (
+        ["Date", "Client", "Mot_Cle", "URL_Cible", "Score_Global"]
+        + [f"Score_{code}" for code in codes]
+        + [f"Texte_{code}" for code in codes]
+        + ["Sources_Detectees", "Note_Recommandation", "Concurrent_Principal"]
+    )
+    if samples > 1:
+        headers.append("Stats_Echantillons")
+    if stream:
+        headers.append("Latences_Streaming")
+    return headers
+
+def ensure_headers(ws, wanted):
+    """
+    Complète la ligne d'en-têtes sans jamais déplacer les colonnes existantes :
+    les nouvelles colonnes (nouveau moteur...) sont ajoutées à la fin.
+    """
+    existing = ws.row_values(1) if ws.row_count > 0 else []
+    headers = existing + [h for h in wanted if h not in existing]
+    if headers != existing:
+        print("📝 Mise à jour des en-têtes LOGS_RESULTATS...")
+        if len(headers) > ws.col_count:
+            ws.add_cols(len(headers) - ws.col_count)
+        ws.update('A1', [headers])
+    return headers
+
+def pick_representative(samples, scores, mean):
+    """Échantillon valide dont le score est le plus proche de la moyenne (réponse conservée comme preuve)"""
+    valid = [(abs(score - mean), i) for i, score in enumerate(scores) if not samples[i]['error']]
+    return samples[min(valid)[1]] if valid else samples[0]
+
+def get_target_domain(target):
+    """Domaine enregistrable de l'URL cible"""
+    return registrable_domain(target)
+
+def build_log_row(item, res, mentions=None):
+    """
+    Calcule les scores et métadonnées d'une requête. Retourne {colonne: valeur}.
+    res = {moteur: [échantillons]} : avec K > 1 échantillons, Score_<CODE> est la moyenne
+    et Stats_Echantillons détaille variance, probabilité de citation et intervalles de confiance.
+    mentions : liste complétée avec les lignes MENTIONS des réponses conservées (GEO_PROMINENCE=1).
+    """
+    target, partners, keywords = item["target"], item["partners"], item["keywords"]
+    target_domain = get_target_domain(target)
+    scorer = make_scorer(target, partners, keywords)
+
+    scores = {}
+    stats = {}
+    kept = {}
+    kept_mentions = {}
+    for code, samples in res.items():
+        scored = [scorer(r['text'], r['parsed']) for r in samples]
+        sample_scores = [score for score, _ in scored]
+        valid = [i for i, r in enumerate(samples) if not r['error']]
+        stats[code] = summarize_samples(
+            [sample_scores[i] for i in valid],
+            [samples[i]['parsed'].mentions(target_domain) for i in valid]
+        )
+        scores[code] = round(stats[code]["moyenne"])
+        kept[code] = pick_representative(samples, sample_scores, stats[code]["moyenne"])
+        kept_mentions[code] = next(found for r, (_, found) in zip(samples, scored) if r is kept[code])
+
+    score_global = round(sum(scores.values()) / len(scores)) if scores else 0
+
+    # Extraction des métadonnées (réponse représentative de chaque moteur)
+    sources_str = "|".join(f"{code}:{','.join(r['sources'][:5])}" for code, r in kept.items())
+
+    # Note de recommandation (moyenne des moteurs et des échantillons)
+    recos = [r['parsed'].recommendation_for(target_domain) for samples in res.values() for r in samples if not r['error']]
+    avg_reco = round(sum(recos) / len(recos)) if recos else 3
+
+    # Concurrent principal : premier moteur qui en cite un
+    competitors = [r['parsed'].concurrent for r in kept.values()]
+    competitor = next((c for c in competitors if c != "N/A"), "N/A")
+
+    print(f"   📊 {item['query']} : " + " | ".join(f"{code}={s}%" for code, s in scores.items()) + f" | Global={score_global}%")
+
+    row = {
+        "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "Client": item["client"],
+        "Mot_Cle": item["query"],
+        "URL_Cible": target,
+        "Score_Global": score_global,
+        "Sources_Detectees": sources_str,
+        "Note_Recommandation": avg_reco,
+        "Concurrent_Principal": competitor,
+        "Stats_Echantillons": json.dumps(stats, ensure_ascii=False),
+    }
+    latencies = {code: r["latence"] for code, r in kept.items() if r.get("latence")}
+    if latencies:
+        row["Latences_Streaming"] = json.dumps(latencies)
+    for code, r in kept.items():
+        row[f"Score_{code}"] = scores[code]
+        row[f"Texte_{code}"] = r['text'] if r['text'] else (r.get('error') or '')
+    if mentions is not None:
+        mentions.extend(
+            [row["Date"], item["client"], item["query"], code, m.type, m.valeur, m.position, m.rang, round(m.poids, 3)]
+            for code, found in kept_mentions.items() for m in found
+        )
+    return row
+
+# --- 6. STOCKAGE DELTA ---
+EMPREINTES_HEADERS = ["Client", "Mot_Cle", "Moteur", "Hash", "Simhash", "Sources", "Ligne_Texte", "Date"]
+
+def load_fingerprints(ws):
+    """Dernière empreinte stockée par (client, requête, moteur) depuis la feuille EMPREINTES"""
+    state = {}
+    for row in ws.get_all_values()[1:]:
+        row = row + [""] * (len(EMPREINTES_HEADERS) - len(row))
+        client_name, query, code, h, sim, sources, line, date = row[:8]
+        state[(client_name, query, code)] = {"hash": h, "simhash": sim, "sources": sources, "ligne": line, "date": date}
+    return state
+
+def save_fingerprints(ws, state):
+    rows = [
+        [key[0], key[1], key[2], fp["hash"], fp["simhash"], fp["sources"], fp["ligne"], fp["date"]]
+        for key, fp in sorted(state.items())
+    ]
+    rewrite_worksheet(ws, EMPREINTES_HEADERS, rows)
+
+def apply_delta_storage(row, codes, state, row_number):
+    """
+    Remplace par une référence les textes qui n'ont pas changé sensiblement depuis
+    la dernière réponse stockée pour (client, requête, moteur). Met à jour l'état :
+    nouvelle empreinte pour un texte écrit, seulement la date pour une référence.
+    Retourne le nombre de textes remplacés.
+    """
+    replaced = 0
+    for code in codes:
+        text = row.get(f"Texte_{code}") or ""
+        if not text:
+            continue
+        key = (row["Client"], row["Mot_Cle"], code)
+        fp = fingerprint(text, extract_sources(text))
+        previous = state.get(key)
+        if previous and previous.get("ligne") and is_same_answer(fp, previous):
+            # L'empreinte reste celle du texte réellement stocké : de petites dérives
+            # successives ne doivent pas s'additionner sans jamais être écrites
+            row[f"Texte_{code}"] = make_ref(previous["ligne"])
+            replaced += 1
+            previous["date"] = row["Date"]
+            continue
+        fp["ligne"] = row_number
+        fp["date"] = row["Date"]
+        state[key] = fp
+    return replaced
+
+def encode_texts(row, codes, compress):
+    """
+    Encode les textes pour la feuille : compression du texte complet (GEO_COMPRESSION=1)
+    ou troncature historique à 5 000 caractères. Les références delta restent en clair.
+    """
+    for code in codes:
+        text = row.get(f"Texte_{code}") or ""
+        if not text or text.startswith(REF_PREFIX):
+            continue
+        row[f"Texte_{code}"] = encode_text(text) if compress else text[:5000]
+
+# --- 7. QUALITÉ DU PARSING ---
+QUALITE_HEADERS = ["Date", "Moteur", "Mode", "Reponses", "JSON_Valides", "Replis_Regex", "Sans_Metadonnees", "Taux_Echec"]
+
+def parsing_report(results, codes):
+    """
+    Taux d'échec d'analyse par moteur : réponses dont le JSON structuré était invalide
+    (repli regex) et réponses sans bloc de métadonnées exploitable (valeurs par défaut).
+    """
+    date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for code in codes:
+        parsed = [r["parsed"] for task, r in results.items() if task[1] == code and not r["error"]]
+        if not parsed:
+            continue
+        valid_json = sum(p.structure == "json" for p in parsed)
+        fallbacks = sum(p.structure == "json_invalide" for p in parsed)
+        missing = sum(not p.format_ok for p in parsed)
+        failures = fallbacks if use_structured(code) else missing
+        rows.append([
+            date, code, "json" if use_structured(code) else "texte", len(parsed),
+            valid_json, fallbacks, missing, round(failures / len(parsed), 3),
+        ])
+    return rows
+
+def latency_report(results, codes):
+    """TTFT et durée médianes par moteur (appels en streaming) : {code: (n, ttft, durée, coupés)}"""
+    report = {}
+    for code in codes:
+        lat = [r["latence"] for task, r in results.items() if task[1] == code and r.get("latence")]
+        if lat:
+            report[code] = (
+                len(lat), median(l["ttft"] for l in lat), median(l["duree"] for l in lat), sum(l["tronque"] for l in lat)
+            )
+    return report
+
+# --- 8. ALERTES ---
+def build_detector(state):
+    """Détecteur d'anomalies paramétré par les réglages GEO_ALERTES_*"""
+    return alerts.AnomalyDetector(
+        state,
+        alpha=get_float_setting("GEO_ALERTES_ALPHA", 0.3),
+        z_seuil=get_float_setting("GEO_ALERTES_Z", 3.0),
+        baisse_min=get_float_setting("GEO_ALERTES_BAISSE", 15),
+        historique_min=get_int_setting("GEO_ALERTES_HISTORIQUE", 3),
+    )
+
+def get_alert_sinks():
+    """Sinks d'alertes demandés (GEO_ALERTES_SINKS="console,fichier,webhook", défaut console)"""
+    names = [n.strip().lower() for n in (get_secret("GEO_ALERTES_SINKS") or "console").split(",") if n.strip()]
+    settings = {"fichier": get_secret("GEO_ALERTES_FICHIER"), "webhook": get_secret("GEO_ALERTES_WEBHOOK")}
+    return names, settings
+
+# --- 9. BUDGET ---
+def get_budget_caps():
+    """Plafonds de dépense en $ : total, par moteur, par client (aucun = gouverneur inactif)"""
+    total = get_float_setting("GEO_BUDGET_MAX_USD", 0)
+    engine_caps = budget.parse_caps(get_secret("GEO_BUDGET_MAX_USD_MOTEUR"))
+    client_caps = budget.parse_caps(get_secret("GEO_BUDGET_MAX_USD_CLIENT"))
+    if total <= 0 and not engine_caps and not client_caps:
+        return None
+    return total, engine_caps, client_caps
+
+def deferred_first(items, values):
+    """Requêtes reportées par le scan précédent (feuille REPORTS) placées en tête"""
+    deferred = {(row[0], row[1]) for row in values[1:] if len(row) >= 2}
+    return sorted(items, key=lambda item: (item["client"], item["query"]) not in deferred)
+
+def query_prompts(query, qidx, codes, samples, batch_mode):
+    """Prompt de chaque tâche d'une requête : {(qidx, moteur, échantillon): prompt}"""
+    prompts = {}
+    for code in codes:
+        prompt = build_prompt(query["query"], query["target"], use_structured(code), use_stream(code) and not batch_mode)
+        prompts.update({(qidx, code, k): prompt for k in range(samples)})
+    return prompts
+
+def run_governed(items, queries, codes, samples, governor, batch_mode):
+    """
+    Scan sous plafonds de dépense : chaque requête est réservée à son coût estimé, puis
+    envoyée par vagues (GEO_MAX_WORKERS requêtes, une seule près d'un plafond, tout d'un
+    coup en mode batch) et réglée au coût réel après sa vague.
+    Renvoie (résultats, indices des requêtes reportées).
+    """
+    wave_size = max(1, get_int_setting("GEO_MAX_WORKERS", 16))
+    results, deferred = {}, []
+    pending = list(range(len(queries)))
+    while pending:
+        size = len(pending) if batch_mode else (1 if governor.throttled() else wave_size)
+        wave = {}
+        while pending and len(wave) < size:
+            qidx = pending.pop(0)
+            prompts = query_prompts(queries[qidx], qidx, codes, samples, batch_mode)
+            costs = governor.estimate([(task[1], prompt) for task, prompt in prompts.items()])
+            members = [items[idx]["client"] for idx in queries[qidx]["members"]]
+            if governor.reserve(costs, members):
+                wave[qidx] = (costs, members, prompts)
+            else:
+                deferred.append(qidx)
+        if not wave:
+            break
+        tasks = [task for _, _, prompts in wave.values() for task in prompts]
+        results.update(run_batch(queries, tasks) if batch_mode else run_online(queries, tasks))
+        for costs, members, prompts in wave.values():
+            governor.settle(costs, members, [(task[1], prompt, results[task]["text"]) for task, prompt in prompts.items()])
+    return results, deferred
+
+# --- 10. MAIN ---
+def main(client=None):
+    """Scan complet ; client : client gspread déjà connecté (classeur simulé de mock_sheets.py par exemple)"""
+    print("🚀 DÉMARRAGE GEO-RADAR MONITOR (V5 - Multi-moteurs, parallèle/batch)...")
     print(f"📅 Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     try:
-        client = connect_sheets()
+        client = client or connect_sheets()
         sh = client.open("GEO-Radar_DATA")
         print("✅ Connexion Google Sheets OK")
 
@@ -219,120 +770,166 @@ def main():
             print("⚠️ Feuille CONFIG_CIBLES vide ou sans données.")
             return
 
-        headers = all_values[0]
+        # Complément depuis le registre seulement sur demande : il change Score_Global des lignes concernées
+        registry = None
+        if is_enabled("GEO_REGISTRE_COMPLETE"):
+            registry = clients.get_registry(all_values)
+            print(f"✅ Registre clients v{registry.version} : {len(registry.names())} clients")
 
-        # Mapping des colonnes
         try:
-            idx_kw = headers.index("Mot_Cle")
-            idx_url = headers.index("URL_Cible")
+            items = load_targets(all_values, registry)
         except ValueError:
             print("❌ ERREUR : Colonnes 'Mot_Cle' ou 'URL_Cible' introuvables.")
             return
 
-        # Colonnes optionnelles
-        idx_partners = headers.index("URLs_Partenaires") if "URLs_Partenaires" in headers else None
-        idx_keywords = headers.index("Mots_Signatures") if "Mots_Signatures" in headers else None
-        idx_client = headers.index("Client") if "Client" in headers else None
+        print(f"✅ Configuration chargée. {len(items)} requêtes à analyser.")
 
-        print(f"✅ Configuration chargée. {len(all_values)-1} requêtes à analyser.")
+        # Gouverneur de coûts : requêtes reportées par le scan précédent en tête
+        caps = get_budget_caps()
+        if caps:
+            ws_reports = get_or_create_worksheet(sh, "REPORTS", budget.REPORTS_HEADERS)
+            items = deferred_first(items, ws_reports.get_all_values())
 
         # Feuille de résultats
         ws_logs = sh.worksheet("LOGS_RESULTATS")
 
-        # Vérification/création des en-têtes
-        expected_headers = [
-            "Date", "Client", "Mot_Cle", "URL_Cible",
-            "Score_Global", "Score_PPLX", "Score_GEM", "Score_GPT",
-            "Texte_PPLX", "Texte_GEM", "Texte_GPT",
-            "Sources_Detectees", "Note_Recommandation", "Concurrent_Principal"
-        ]
-
-        existing_headers = ws_logs.row_values(1) if ws_logs.row_count > 0 else []
-        if not existing_headers or existing_headers != expected_headers:
-            print("📝 Mise à jour des en-têtes LOGS_RESULTATS...")
-            ws_logs.update('A1', [expected_headers])
-
-        # Boucle sur les requêtes
-        for row in all_values[1:]:
-            if len(row) <= idx_url:
-                continue
-
-            query = row[idx_kw].strip()
-            target = row[idx_url].strip()
-
-            if not query or not target:
+        # Vérification/création des en-têtes (une colonne Score_/Texte_ par moteur actif)
+        codes = get_active_engines()
+        samples = max(1, get_int_setting("GEO_ECHANTILLONS", 1))
+        stream = any(use_stream(code) for code in codes)
+        headers = ensure_headers(ws_logs, get_log_headers(codes, samples, stream))
+
+        # Planification : seules les requêtes dues (palier de fréquence) dans le budget du jour
+        planning = is_enabled("GEO_PLANIFICATION")
+        if planning:
+            ws_plan = get_or_create_worksheet(sh, "PLANIFICATION", scheduler.PLANIFICATION_HEADERS)
+            plan_state = scheduler.load_state(ws_plan.get_all_values())
+            items, report = scheduler.build_queue(
+                items, plan_state, datetime.now(), len(codes) * samples, get_int_setting("GEO_BUDGET_APPELS_JOUR", 0))
+            if caps:
+                items = deferred_first(items, ws_reports.get_all_values())
+            budget_left = "" if report["budget"] is None else f", budget restant {report['budget']} appels"
+            print(f"🗓️ Planification : {report['dues']} requêtes dues, {report['retenues']} retenues, "
+                  f"{report['reportees']} reportées au prochain scan{budget_left}")
+            if not items:
+                print("\n✅ SCAN TERMINÉ (aucune requête due)")
+                return
+
+        # Regroupement : une génération par requête distincte, partagée entre clients
+        queries = plan_scan(items)
+        if len(queries) < len(items):
+            print(f"🧩 {len(items)} lignes → {len(queries)} requêtes distinctes (÷{len(items) / len(queries):.1f} appels API)")
+
+        # Interrogation des moteurs IA : une tâche par (requête, moteur, échantillon)
+        tasks = [(qidx, code, k) for qidx in range(len(queries)) for code in codes for k in range(samples)]
+        batch_mode = is_enabled("GEO_BATCH_MODE")
+        if batch_mode:
+            print(f"\n📦 Mode batch : {len(tasks)} appels à traiter ({', '.join(codes)})")
+        else:
+            print(f"\n⚡ Mode en ligne : {len(tasks)} appels à traiter ({', '.join(codes)})")
+        deferred = []
+        if caps:
+            ws_budget = get_or_create_worksheet(sh, "BUDGET_MOTEURS", budget.BUDGET_HEADERS)
+            governor = budget.BudgetGovernor(*caps, history=budget.load_history(ws_budget.get_all_values()),
+                                             batch_mode=batch_mode)
+            results, deferred = run_governed(items, queries, codes, samples, governor, batch_mode)
+            print("\n💰 Dépense du scan (estimée d'après la taille des prompts et des réponses) :")
+            for line in governor.report():
+                print(f"   {line}")
+            if deferred:
+                print(f"   ⏸️ Plafond atteint : {len(deferred)}/{len(queries)} requêtes reportées au prochain scan")
+            try:
+                rewrite_worksheet(ws_budget, budget.BUDGET_HEADERS, budget.dump_history(governor.history))
+                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                rewrite_worksheet(ws_reports, budget.REPORTS_HEADERS, [
+                    [items[idx]["client"], items[idx]["query"], now] for qidx in deferred for idx in queries[qidx]["members"]
+                ])
+            except Exception as e:
+                print(f"   ⚠️ Écriture BUDGET_MOTEURS / REPORTS impossible : {e}")
+        elif batch_mode:
+            results = run_batch(queries, tasks)
+        else:
+            results = run_online(queries, tasks)
+
+        # Qualité du parsing par moteur (console + feuille QUALITE_PARSING)
+        quality = parsing_report(results, codes)
+        print("\n🧾 Parsing des réponses :")
+        for _, code, mode, total, valid_json, fallbacks, missing, rate in quality:
+            print(f"   {code} [{mode}] : {total} réponses, {valid_json} JSON valides, "
+                  f"{fallbacks} replis regex, {missing} sans métadonnées → échec {rate:.0%}")
+        try:
+            if quality:
+                get_or_create_worksheet(sh, "QUALITE_PARSING", QUALITE_HEADERS).append_rows(quality)
+        except Exception as e:
+            print(f"   ⚠️ Écriture QUALITE_PARSING impossible : {e}")
+        for code, (n, ttft, duration, cut) in latency_report(results, codes).items():
+            print(f"   ⏱️ {code} streaming : TTFT médian {ttft:.2f}s, durée médiane {duration:.2f}s, {cut}/{n} coupées au budget")
+
+        # Stockage delta : les réponses inchangées deviennent des références
+        delta = is_enabled("GEO_DELTA_STORAGE")
+        compress = is_enabled("GEO_COMPRESSION")
+        if delta:
+            ws_fp = get_or_create_worksheet(sh, "EMPREINTES", EMPREINTES_HEADERS)
+            fp_state = load_fingerprints(ws_fp)
+            next_row = len(ws_logs.col_values(1)) + 1
+            replaced = 0
+
+        # Alertes : état glissant par (client, requête, moteur), mis à jour ligne par ligne
+        alerting = is_enabled("GEO_ALERTES")
+        if alerting:
+            ws_alert_state = get_or_create_worksheet(sh, "ALERTES_ETAT", alerts.ETAT_HEADERS)
+            detector = build_detector(alerts.load_state(ws_alert_state.get_all_values()))
+            found_alerts = []
+
+        # Calcul des scores par client et écriture dans les logs (ordre des colonnes de la feuille)
+        rows = []
+        mentions = [] if is_enabled("GEO_PROMINENCE") else None
+        skipped = set(deferred)
+        for qidx, query in enumerate(queries):
+            if qidx in skipped:
                 continue
+            res = {code: [results[(qidx, code, k)] for k in range(samples)] for code in codes}
+            for idx in query["members"]:
+                row = build_log_row(items[idx], res, mentions)
+                if planning:
+                    scheduler.record(plan_state, items[idx], row["Score_Global"],
+                                     datetime.strptime(row["Date"], scheduler.DATE_FORMAT))
+                if alerting:
+                    found_alerts.extend(detector.observe(row, codes, get_target_domain(items[idx]["target"])))
+                if delta:
+                    replaced += apply_delta_storage(row, codes, fp_state, next_row + len(rows))
+                encode_texts(row, codes, compress)
+                rows.append([row.get(h, "") for h in headers])
 
-            # Données optionnelles
-            client_name = row[idx_client].strip() if idx_client and len(row) > idx_client else "Default"
-            partners = row[idx_partners].split(',') if idx_partners and len(row) > idx_partners else []
-            partners = [p.strip() for p in partners if p.strip()]
-            keywords = row[idx_keywords].split(',') if idx_keywords and len(row) > idx_keywords else []
-            keywords = [k.strip() for k in keywords if k.strip()]
-
-            print(f"\n🔎 Analyse: {query}")
-            print(f"   Client: {client_name} | Cible: {target}")
-
-            # Interrogation des 3 moteurs IA
-            print("   ⚡ Interrogation Perplexity...")
-            res_pplx = ask_perplexity(query, target)
-            time.sleep(2)
-
-            print("   ♊ Interrogation Gemini...")
-            res_gem = ask_gemini(query, target)
-            time.sleep(2)
-
-            print("   🤖 Interrogation ChatGPT...")
-            res_gpt = ask_chatgpt(query, target)
-            time.sleep(2)
-
-            # Calcul des scores
-            score_pplx = calculate_geo_score(res_pplx['text'], target, partners, keywords)
-            score_gem = calculate_geo_score(res_gem['text'], target, partners, keywords)
-            score_gpt = calculate_geo_score(res_gpt['text'], target, partners, keywords)
-            score_global = round((score_pplx + score_gem + score_gpt) / 3)
-
-            # Extraction des métadonnées
-            all_sources = res_pplx['sources'] + res_gem['sources'] + res_gpt['sources']
-            sources_str = f"PPLX:{','.join(res_pplx['sources'][:5])}|GEM:{','.join(res_gem['sources'][:5])}|GPT:{','.join(res_gpt['sources'][:5])}"
-
-            # Note de recommandation (moyenne des 3)
-            reco_pplx = extract_recommendation(res_pplx['text'])
-            reco_gem = extract_recommendation(res_gem['text'])
-            reco_gpt = extract_recommendation(res_gpt['text'])
-            avg_reco = round((reco_pplx + reco_gem + reco_gpt) / 3)
-
-            # Concurrent principal
-            competitor = extract_competitor(res_pplx['text']) or extract_competitor(res_gem['text']) or extract_competitor(res_gpt['text'])
-
-            print(f"   📊 Scores: PPLX={score_pplx}% | GEM={score_gem}% | GPT={score_gpt}% | Global={score_global}%")
-
-            # Écriture dans les logs
-            row_data = [
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                client_name,
-                query,
-                target,
-                score_global,
-                score_pplx,
-                score_gem,
-                score_gpt,
-                res_pplx['text'][:5000] if res_pplx['text'] else (res_pplx.get('error', '')),
-                res_gem['text'][:5000] if res_gem['text'] else (res_gem.get('error', '')),
-                res_gpt['text'][:5000] if res_gpt['text'] else (res_gpt.get('error', '')),
-                sources_str,
-                avg_reco,
-                competitor
-            ]
-
+        try:
+            if rows:
+                response = ws_logs.append_rows(rows, value_input_option='USER_ENTERED')
+                last_date = rows[-1][headers.index("Date")] if "Date" in headers else ""
+                publish_data_version(sh, count_data_rows(ws_logs, response), last_date, len(headers))
+            print(f"   ✅ {len(rows)} résultats sauvegardés")
+            if delta:
+                save_fingerprints(ws_fp, fp_state)
+                print(f"   💾 Stockage delta : {replaced}/{len(rows) * len(codes)} réponses inchangées stockées en référence")
+            if planning:
+                rewrite_worksheet(ws_plan, scheduler.PLANIFICATION_HEADERS, scheduler.dump_state(plan_state))
+        except Exception as e:
+            print(f"   ❌ Erreur écriture: {e}")
+
+        if mentions:
             try:
-                ws_logs.append_row(row_data, value_input_option='USER_ENTERED')
-                print("   ✅ Résultats sauvegardés")
+                get_or_create_worksheet(sh, "MENTIONS", MENTIONS_HEADERS).append_rows(mentions)
+                print(f"   📍 {len(mentions)} mentions enregistrées (position, rang, poids)")
             except Exception as e:
-                print(f"   ❌ Erreur écriture: {e}")
+                print(f"   ⚠️ Écriture MENTIONS impossible : {e}")
 
-            # Pause entre les requêtes
-            time.sleep(3)
+        if alerting:
+            print(f"\n🔔 {len(found_alerts)} alerte(s) détectée(s)")
+            sink_names, sink_settings = get_alert_sinks()
+            alerts.dispatch(found_alerts, sink_names, sink_settings)
+            try:
+                rewrite_worksheet(ws_alert_state, alerts.ETAT_HEADERS, alerts.dump_state(detector.state))
+            except Exception as e:
+                print(f"   ❌ Erreur sauvegarde état des alertes: {e}")
 
         print("\n✅ SCAN TERMINÉ")
 
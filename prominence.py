@@ -0,0 +1,116 @@
+"""
+Score GEO pondéré par la proéminence des mentions (GEO_PROMINENCE=1).
+
+Le score historique (monitor.calculate_geo_score) ne teste que la présence : être
+cité en premier ou en note de bas de page rapporte autant. Ici, chaque mention est
+pondérée par sa position dans la réponse et par le rang de la source :
+
+- position : poids 1 au début du texte, 0,5 à la fin (décroissance linéaire),
+- rang dans les sources citées : 1 pour la première, -0,1 par rang, minimum 0,5,
+- cible : 50 pts x meilleur poids (position de la 1re mention ou rang de source),
+  partenaires : 10 pts x meilleur poids, mots signatures : 10 pts x poids chacun,
+  plafonnés à 30 comme dans le score historique.
+
+Une mention au tout début donne donc le même score que le barème de présence ;
+une mention en fin de réponse en donne la moitié.
+
+Coût : chaque terme suivi (domaines cible et partenaires, mots signatures) est cherché
+une fois avec str.find, exactement le travail du score de présence ("mot in texte"),
+qui fournit en plus la position. Une alternative regex unique en un seul parcours a été
+mesurée 2 à 7 fois plus lente en CPython que ces recherches de sous-chaîne en C.
+Chaque mention est conservée (type, valeur, position, rang, poids). Le rang est celui
+de la ligne SOURCES (ordre donné par le moteur), à défaut l'ordre des sources extraites.
+"""
+from typing import NamedTuple
+
+from domains import registrable_domain
+
+POINTS_CIBLE = 50
+POINTS_PARTENAIRE = 10
+POINTS_MOT = 10
+PLAFOND_MOTS = 30
+POIDS_MIN = 0.5
+PAS_RANG = 0.1
+
+
+class Mention(NamedTuple):
+    """Mention d'un terme suivi dans une réponse"""
+    type: str           # "cible", "partenaire", "mot_signature" ou "source"
+    valeur: str
+    position: int       # décalage (caractères) de la 1re occurrence, -1 si seulement dans les sources
+    rang: int           # rang parmi les sources citées (1 = première), 0 si non citée en source
+    poids: float
+
+
+def position_weight(offset, length):
+    """1 au début du texte, POIDS_MIN à la fin"""
+    if offset < 0 or length <= 0:
+        return 0.0
+    return 1 - (1 - POIDS_MIN) * min(offset, length) / length
+
+def rank_weight(rank):
+    """1 pour la première source citée, puis -PAS_RANG par rang (minimum POIDS_MIN)"""
+    return max(POIDS_MIN, 1 - PAS_RANG * (rank - 1)) if rank > 0 else 0.0
+
+
+class ProminenceScorer:
+    """Termes d'une ligne de configuration (cible, partenaires, mots signatures), normalisés une fois"""
+
+    def __init__(self, target, partners=None, keywords=None):
+        self.cible = registrable_domain(target)
+        self.partenaires = [d for d in dict.fromkeys(registrable_domain(p) for p in partners or []) if d and d != self.cible]
+        self.mots = [k for k in dict.fromkeys(kw.strip().lower() for kw in keywords or []) if k]
+        self.domaines = {d for d in [self.cible] + self.partenaires if d}
+
+    def _find(self, text_lower, term):
+        """Position de la 1re occurrence (un domaine doit commencer un nom d'hôte : pas "xconforama.fr")"""
+        offset = text_lower.find(term)
+        if term in self.domaines:
+            while offset > 0 and (text_lower[offset - 1].isalnum() or text_lower[offset - 1] in "-_"):
+                offset = text_lower.find(term, offset + 1)
+        return offset
+
+    def score(self, text, parsed):
+        """(score 0-100, [Mention]) d'une réponse ; parsed = ParsedResponse de cette réponse"""
+        if not text:
+            return 0, []
+        text_lower = text.lower()
+        length = len(text_lower)
+        ranks = {source: i + 1 for i, source in enumerate(parsed.classement or parsed.sources)}
+
+        mentions = []
+
+        def domain_mention(kind, domain):
+            # Présence déjà connue par l'analyse de la réponse : le texte n'est parcouru que pour
+            # les domaines effectivement mentionnés (position de la 1re occurrence)
+            if not (parsed.mentions(domain) or domain in ranks):
+                return 0.0
+            offset = self._find(text_lower, domain)
+            rank = ranks.get(domain, 0)
+            weight = max(position_weight(offset, length), rank_weight(rank), POIDS_MIN)
+            mentions.append(Mention(kind, domain, offset, rank, weight))
+            return weight
+
+        score = 0.0
+        if self.cible:
+            score += POINTS_CIBLE * domain_mention("cible", self.cible)
+        partner_weights = [domain_mention("partenaire", d) for d in self.partenaires]
+        score += POINTS_PARTENAIRE * max(partner_weights, default=0.0)
+
+        keyword_points = 0.0
+        for kw in self.mots:
+            offset = text_lower.find(kw)
+            if offset >= 0:
+                weight = position_weight(offset, length)
+                mentions.append(Mention("mot_signature", kw, offset, 0, weight))
+                keyword_points += POINTS_MOT * weight
+        score += min(PLAFOND_MOTS, keyword_points)
+
+        # Sources citées (hors cible et partenaires, déjà enregistrés) : rang et position
+        # (domaines déjà en minuscules ; seul un nom de source qui n'est pas un domaine peut différer)
+        for source, rank in ranks.items():
+            if source not in self.domaines:
+                offset = text_lower.find(source if source.islower() else source.lower())
+                mentions.append(Mention("source", source, offset, rank, rank_weight(rank)))
+
+        return min(100, round(score)), mentions
@@ -0,0 +1,203 @@
+"""
+Analyse des réponses IA en une seule passe.
+
+Les motifs sont compilés une fois au chargement du module. Le bloc final
+(SOURCES / RECOMMANDATION / CONCURRENT) est repéré en un seul parcours de la fin
+du texte, les URLs en ligne en un seul findall. Le résultat est un
+ParsedResponse immuable, calculé une fois par réponse (monitor.make_result)
+puis réutilisé par le scoring, le stockage delta et les métadonnées.
+
+Mode structuré (GEO_STRUCTURED=1) : le moteur renvoie un objet JSON conforme à
+structured_schema(). parse_structured() le valide et le réécrit en texte avec le
+bloc final canonique, pour que le stockage et le tableau de bord restent identiques ;
+en cas d'échec de validation, on retombe sur l'analyse du texte brut.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+from domains import find_domains, registrable_domain
+
+# Taille de la fin de réponse où chercher le bloc final (repli sur le texte entier)
+TAIL_CHARS = 2000
+MAX_SOURCES = 10
+DEFAULT_RECOMMENDATION = 3
+
+_TRAILER = re.compile(
+    r"\b(SOURCES?|RECOMMANDATION|CONCURRENT)[\s*_]*:\s*(.*?)(?=\s*\b(?:SOURCES?|RECOMMANDATION|CONCURRENT)[\s*_]*:|$)",
+    re.IGNORECASE | re.MULTILINE
+)
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+_DIGIT = re.compile(r"^\[?\s*(\d)")
+_NOTE = re.compile(r"([^,=\s\[\]]+)\s*=\s*(\d)")
+
+
+class ParsedResponse(NamedTuple):
+    """Métadonnées extraites d'une réponse"""
+    sources: tuple = ()            # domaines cités (URLs puis ligne SOURCES), max 10
+    recommandation: int = None     # note unique 1-5 (prompt avec cible), None si absente
+    notes: tuple = ()              # ((domaine, note), ...) pour un prompt partagé
+    concurrent: str = "N/A"
+    domaines: tuple = ()           # tous les domaines mentionnés dans le texte (scoring)
+    format_ok: bool = False        # bloc final trouvé (sinon valeurs par défaut)
+    structure: str = "texte"       # "texte", "json" (sortie structurée valide) ou "json_invalide" (repli)
+    classement: tuple = ()         # domaines de la ligne SOURCES, dans l'ordre donné par le moteur
+
+    def recommendation_for(self, target_domain=None):
+        """Note de la cible : note unique, sinon note du domaine (1 s'il n'est pas recommandé), sinon 3"""
+        if self.recommandation is not None:
+            return self.recommandation
+        if self.notes and target_domain:
+            return min(5, max(1, dict(self.notes).get(target_domain, 1)))
+        return DEFAULT_RECOMMENDATION
+
+    def mentions(self, domain):
+        """Vrai si le domaine enregistrable est mentionné dans la réponse"""
+        return bool(domain) and domain in self.domaines
+
+
+EMPTY = ParsedResponse()
+
+
+def _trailer_fields(text):
+    """Dernière valeur de chaque ligne du bloc final, en un seul parcours"""
+    fields = {}
+    for match in _TRAILER.finditer(text):
+        key = match.group(1).upper().rstrip("S")
+        fields[key] = match.group(2).strip().strip("*_").strip()
+    return fields
+
+def _strip_brackets(value):
+    return value.strip().lstrip("[").rstrip("]").strip()
+
+@lru_cache(maxsize=4096)
+def parse_response(text):
+    """Analyse complète d'une réponse (mise en cache : le même texte n'est analysé qu'une fois)"""
+    if not text:
+        return EMPTY
+
+    fields = _trailer_fields(text[-TAIL_CHARS:])
+    if not fields and len(text) > TAIL_CHARS:
+        fields = _trailer_fields(text)
+
+    # Sources : URLs en ligne puis ligne SOURCES (un nom qui n'est pas un domaine est gardé tel quel)
+    sources = []
+    for url in _URL.findall(text):
+        domain = registrable_domain(url)
+        if domain and domain not in sources:
+            sources.append(domain)
+    declared = []
+    for src in _strip_brackets(fields.get("SOURCE", "")).split(","):
+        src = src.strip().strip("\"'")
+        src = registrable_domain(src) or src
+        if src and src not in declared:
+            declared.append(src)
+        if src and src not in sources:
+            sources.append(src)
+
+    # Recommandation : paires domaine=note dès qu'il y a un "=" (01net.com=4 n'est pas une note unique),
+    # sinon chiffre unique
+    reco_raw = fields.get("RECOMMANDATION", "")
+    recommandation, notes = None, ()
+    digit = _DIGIT.match(reco_raw)
+    if "=" in reco_raw:
+        notes = tuple((registrable_domain(d), int(n)) for d, n in _NOTE.findall(reco_raw) if registrable_domain(d))
+    elif digit:
+        recommandation = min(5, max(1, int(digit.group(1))))
+
+    # Concurrent principal : première valeur de la ligne
+    competitor = _strip_brackets(fields.get("CONCURRENT", "")).split(",")[0].strip().strip("\"'")
+
+    return ParsedResponse(
+        sources=tuple(sources[:MAX_SOURCES]),
+        recommandation=recommandation,
+        notes=notes,
+        concurrent=competitor or "N/A",
+        domaines=find_domains(text),
+        format_ok=bool(fields.get("SOURCE") or fields.get("RECOMMANDATION")),
+        classement=tuple(declared[:MAX_SOURCES]),
+    )
+
+
+# =============================================================================
+# SORTIE STRUCTURÉE (JSON)
+# =============================================================================
+def structured_schema(shared=False):
+    """
+    Schéma JSON demandé aux moteurs. Prompt avec cible : note unique "recommandation" ;
+    prompt partagé : "notes" = liste de {domaine, note}.
+    """
+    properties = {
+        "reponse": {"type": "string"},
+        "sources": {"type": "array", "items": {"type": "string"}},
+        "concurrent": {"type": "string"},
+    }
+    if shared:
+        properties["notes"] = {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"domaine": {"type": "string"}, "note": {"type": "integer"}},
+                "required": ["domaine", "note"],
+                "additionalProperties": False,
+            },
+        }
+    else:
+        properties["recommandation"] = {"type": "integer"}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+def validate_structured(data, shared=False):
+    """Vérifie un objet décodé contre structured_schema() ; renvoie la liste des erreurs"""
+    if not isinstance(data, dict):
+        return ["objet JSON attendu"]
+    errors = []
+    if not isinstance(data.get("reponse"), str) or not data["reponse"].strip():
+        errors.append("reponse : texte attendu")
+    if not isinstance(data.get("sources"), list) or not all(isinstance(x, str) for x in data["sources"]):
+        errors.append("sources : liste de textes attendue")
+    if not isinstance(data.get("concurrent", ""), str):
+        errors.append("concurrent : texte attendu")
+    if shared:
+        notes = data.get("notes")
+        if not isinstance(notes, list) or not all(
+            isinstance(n, dict) and isinstance(n.get("domaine"), str) and isinstance(n.get("note"), int) for n in notes
+        ):
+            errors.append("notes : liste de {domaine, note} attendue")
+    else:
+        note = data.get("recommandation")
+        if not isinstance(note, int) or isinstance(note, bool) or not 1 <= note <= 5:
+            errors.append("recommandation : entier de 1 à 5 attendu")
+    return errors
+
+def format_trailer(data, shared=False):
+    """Bloc final canonique (SOURCES / RECOMMANDATION / CONCURRENT) d'une sortie structurée"""
+    if shared:
+        reco = ", ".join(f"{n['domaine']}={min(5, max(1, n['note']))}" for n in data["notes"])
+    else:
+        reco = str(data["recommandation"])
+    return (f"SOURCES: [{', '.join(data['sources'])}]\n"
+            f"RECOMMANDATION: [{reco}]\n"
+            f"CONCURRENT: [{data.get('concurrent') or 'N/A'}]")
+
+_JSON_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+def parse_structured(raw, shared=False):
+    """
+    Analyse une sortie structurée. Retourne (texte à stocker, ParsedResponse) ;
+    si le JSON est absent ou invalide, repli sur l'analyse du texte brut (structure "json_invalide").
+    """
+    try:
+        data = json.loads(_JSON_FENCE.sub("", raw or ""))
+        errors = validate_structured(data, shared)
+    except ValueError:
+        errors = ["JSON illisible"]
+    if errors:
+        return raw, parse_response(raw)._replace(structure="json_invalide")
+    text = data["reponse"].strip() + "\n\n" + format_trailer(data, shared)
+    return text, parse_response(text)._replace(structure="json")
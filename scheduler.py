@@ -0,0 +1,213 @@
+"""
+Planification des scans GEO-Radar (GEO_PLANIFICATION=1) : chaque (client, requête)
+a un palier de fréquence et seules les requêtes dues sont interrogées.
+
+- Palier manuel : colonne optionnelle "Frequence" de CONFIG_CIBLES (quotidien, bihebdo,
+  hebdo, mensuel ou un nombre de jours). Vide ou "auto" : palier adaptatif.
+- Palier adaptatif : volatilité = moyenne exponentielle (EWMA) de l'écart absolu du
+  Score_Global d'un scan à l'autre. Une requête qui bouge reste quotidienne, une requête
+  stable descend jusqu'au mensuel. Tant que MIN_OBSERVATIONS scans n'ont pas eu lieu,
+  la requête reste quotidienne (volatilité encore inconnue).
+- File de travail : requêtes dues (délai du palier écoulé), triées par priorité =
+  retard (temps écoulé / intervalle) x (1 + volatilité / VOLATILITE_REF) ; une requête
+  jamais scannée passe en premier. Le budget d'appels API du jour (GEO_BUDGET_APPELS_JOUR)
+  est consommé dans cet ordre ; une requête partagée entre clients n'est payée qu'une fois
+  (même regroupement que plan_scan). Les requêtes dues hors budget sont reportées : leur
+  retard augmente, elles passent en tête au scan suivant.
+
+L'état tient dans la feuille PLANIFICATION (une ligne par client et requête), relue et
+réécrite à chaque scan comme ALERTES_ETAT.
+
+Simulation : python scheduler.py --requetes 500 --jours 60
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+PLANIFICATION_HEADERS = ["Client", "Mot_Cle", "Palier", "N", "Dernier_Score", "Volatilite", "Date"]
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Intervalle de chaque palier, en jours
+PALIERS = {"quotidien": 1, "bihebdo": 3, "hebdo": 7, "mensuel": 30}
+AUTO = "auto"
+# Palier adaptatif : volatilité minimale (points de Score_Global) de chaque palier, du plus fréquent au moins fréquent
+SEUILS_VOLATILITE = [(10, "quotidien"), (5, "bihebdo"), (2, "hebdo")]
+PALIER_STABLE = "mensuel"
+MIN_OBSERVATIONS = 3
+ALPHA = 0.3
+VOLATILITE_REF = 10
+# Marge (jours) : un scan quotidien lancé un peu avant les 24 h révolues reste dû
+TOLERANCE = 0.25
+
+
+def query_key(query):
+    """Requête normalisée (casse et espaces), clé de regroupement de plan_scan"""
+    return " ".join(query.lower().split())
+
+
+# =============================================================================
+# 1. PALIERS
+# =============================================================================
+def parse_frequency(value):
+    """Valeur de la colonne Frequence -> palier ou nombre de jours ; AUTO si vide ou illisible"""
+    value = str(value or "").strip().lower()
+    if value in PALIERS:
+        return value
+    try:
+        days = float(value.replace(",", "."))
+    except ValueError:
+        return AUTO
+    return days if days > 0 else AUTO
+
+def adaptive_tier(state):
+    """Palier déduit de la volatilité observée (quotidien tant que l'historique est trop court)"""
+    if state is None or state["n"] < MIN_OBSERVATIONS:
+        return "quotidien"
+    for threshold, tier in SEUILS_VOLATILITE:
+        if state["volatilite"] >= threshold:
+            return tier
+    return PALIER_STABLE
+
+def effective_tier(item, state):
+    """Palier manuel de la ligne de configuration, sinon palier adaptatif"""
+    frequency = item.get("frequence", AUTO)
+    return adaptive_tier(state) if frequency == AUTO else frequency
+
+def interval_days(tier):
+    return PALIERS[tier] if tier in PALIERS else float(tier)
+
+def tier_label(tier):
+    return tier if tier in PALIERS else f"{tier:g}j"
+
+
+# =============================================================================
+# 2. ÉTAT (feuille PLANIFICATION)
+# =============================================================================
+def load_state(values):
+    """Relit l'état depuis les valeurs de la feuille (en-têtes en première ligne)"""
+    state = {}
+    for row in values[1:]:
+        row = row + [""] * (len(PLANIFICATION_HEADERS) - len(row))
+        client_name, query, tier, n, last_score, volatility, date = row[:7]
+        try:
+            state[(client_name, query)] = {
+                "palier": tier, "n": int(n), "score": float(last_score),
+                "volatilite": float(volatility), "date": datetime.strptime(date, DATE_FORMAT),
+            }
+        except ValueError:
+            continue
+    return state
+
+def dump_state(state):
+    """Lignes de la feuille PLANIFICATION (sans en-têtes)"""
+    return [
+        [key[0], key[1], st["palier"], st["n"], round(st["score"], 1), round(st["volatilite"], 3),
+         st["date"].strftime(DATE_FORMAT)]
+        for key, st in sorted(state.items())
+    ]
+
+def record(state, item, score, date):
+    """Met à jour l'état d'une requête qui vient d'être scannée (score global 0-100)"""
+    key = (item["client"], item["query"])
+    st = state.get(key)
+    if st is None:
+        st = state[key] = {"palier": "", "n": 0, "score": score, "volatilite": 0.0, "date": date}
+    else:
+        st["volatilite"] = ALPHA * abs(score - st["score"]) + (1 - ALPHA) * st["volatilite"]
+    st["n"] += 1
+    st["score"] = score
+    st["date"] = date
+    st["palier"] = tier_label(effective_tier(item, st))
+
+
+# =============================================================================
+# 3. FILE DE TRAVAIL
+# =============================================================================
+def priority(item, state, now):
+    """Priorité d'une requête (None si elle n'est pas due) ; inf si jamais scannée"""
+    st = state.get((item["client"], item["query"]))
+    if st is None:
+        return float("inf")
+    interval = interval_days(effective_tier(item, st))
+    elapsed = (now - st["date"]).total_seconds() / 86400
+    if elapsed < interval - TOLERANCE:
+        return None
+    return elapsed / interval * (1 + st["volatilite"] / VOLATILITE_REF)
+
+def spent_today(state, now, calls_per_query):
+    """Appels déjà consommés aujourd'hui (requêtes distinctes scannées depuis minuit)"""
+    queries = {query_key(key[1]) for key, st in state.items() if st["date"].date() == now.date()}
+    return len(queries) * calls_per_query
+
+def build_queue(items, state, now, calls_per_query, budget=0):
+    """
+    Requêtes dues à scanner dans le budget du jour (0 = illimité), dans l'ordre de la
+    configuration. Renvoie (items retenus, rapport {dues, retenues, reportees, appels, budget}).
+    """
+    due = []
+    for idx, item in enumerate(items):
+        score = priority(item, state, now)
+        if score is not None:
+            due.append((-score, idx))
+    due.sort()
+
+    remaining = budget - spent_today(state, now, calls_per_query) if budget > 0 else None
+    paid, selected = set(), []
+    for _, idx in due:
+        key = query_key(items[idx]["query"])
+        if key not in paid:
+            if remaining is not None and remaining < calls_per_query:
+                continue
+            paid.add(key)
+            if remaining is not None:
+                remaining -= calls_per_query
+        selected.append(idx)
+    selected.sort()
+
+    report = {
+        "dues": len(due), "retenues": len(selected), "reportees": len(due) - len(selected),
+        "appels": len(paid) * calls_per_query, "budget": max(remaining, 0) if remaining is not None else None,
+    }
+    return [items[idx] for idx in selected], report
+
+
+# =============================================================================
+# SIMULATION
+# =============================================================================
+def simulate(count, days, calls_per_query=3, budget=0, seed=42):
+    """
+    Requêtes synthétiques : 15 % volatiles (écart-type 15 points), 25 % modérées (5),
+    60 % stables (1). Compare les appels consommés au scan quotidien intégral.
+    """
+    rng = random.Random(seed)
+    sigmas = [15] * (count * 15 // 100) + [5] * (count * 25 // 100)
+    sigmas += [1] * (count - len(sigmas))
+    items = [{"client": "Sim", "query": f"requête {i}", "frequence": AUTO} for i in range(count)]
+    levels = [rng.uniform(20, 80) for _ in items]
+    state, calls, lags = {}, 0, []
+    start = datetime(2026, 1, 1, 9)
+    for day in range(days):
+        now = start + timedelta(days=day)
+        queue, report = build_queue(items, state, now, calls_per_query, budget)
+        calls += report["appels"]
+        for item in queue:
+            i = int(item["query"].split()[-1])
+            score = min(100, max(0, round(levels[i] + rng.gauss(0, sigmas[i]))))
+            record(state, item, score, now)
+        lags.append(report["reportees"])
+    full = count * days * calls_per_query
+    tiers = {}
+    for st in state.values():
+        tiers[st["palier"]] = tiers.get(st["palier"], 0) + 1
+    print(f"🗓️ {count} requêtes sur {days} jours : {calls} appels contre {full} en scan quotidien (÷{full / max(calls, 1):.1f})")
+    print(f"   Paliers finaux : {', '.join(f'{t} {n}' for t, n in sorted(tiers.items(), key=lambda kv: -kv[1]))}")
+    if budget:
+        print(f"   Budget {budget} appels/jour : {max(lags)} requêtes reportées au pire, {lags[-1]} le dernier jour")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulation de la planification GEO-Radar")
+    parser.add_argument("--requetes", type=int, default=500)
+    parser.add_argument("--jours", type=int, default=60)
+    parser.add_argument("--budget", type=int, default=0, help="Appels API par jour (0 = illimité)")
+    args = parser.parse_args()
+    simulate(args.requetes, args.jours, budget=args.budget)
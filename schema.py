@@ -0,0 +1,197 @@
+"""
+Schéma typé du jeu de données LOGS_RESULTATS chargé par le tableau de bord.
+
+La feuille ne renvoie que des chaînes ; apply_schema() fixe des types compacts :
+- colonnes répétitives (Client, Mot_Cle, URL_Cible, Concurrent_Principal) en catégories,
+- scores entiers 0-100 en int16 (float32 si une valeur n'est pas entière),
+  Note_Recommandation en Int8 (valeur manquante conservée),
+- Timestamp en datetime64 avec le format écrit par monitor.py (repli sur l'inférence
+  pour les anciennes lignes),
+- textes longs (réponses Texte_*, Sources_Detectees, JSON de stats) en chaînes Arrow
+  si pyarrow est installé (dépendance de Streamlit), sinon objets Python. Les réponses
+  sont presque toutes distinctes : en catégories, la table des catégories dupliquerait
+  les données et chaque concaténation de get_data() devrait fusionner les dictionnaires.
+
+apply_schema() est idempotent : appliqué après un ajout de lignes, il ne convertit
+que les colonnes qui ont perdu leur type (catégories fusionnées, par exemple).
+
+Banc d'essai mémoire : python schema.py --lignes 100000
+"""
+import argparse
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+
+from storage import encode_text, make_ref
+
+try:
+    import pyarrow  # noqa: F401
+    try:
+        # Même sémantique de valeur manquante (NaN) que les colonnes objet et le type str de pandas 3
+        TEXT_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    TEXT_DTYPE = None
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+CATEGORY_COLUMNS = ["Client", "Mot_Cle", "URL_Cible", "Concurrent_Principal"]
+TEXT_PREFIXES = ("Texte_",)
+LONG_TEXT_COLUMNS = ["Sources_Detectees", "Stats_Echantillons", "Latences_Streaming"]
+NOTE_COLUMN = "Note_Recommandation"
+
+
+def is_score_column(col):
+    """Colonnes numériques historiques : tout ce qui contient "score", plus Position et Reco"""
+    return 'score' in col.lower() or col in ['Position', 'Reco']
+
+def parse_timestamps(values):
+    """Dates au format de monitor.py ; les valeurs dans un autre format sont inférées une par une"""
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    retry = parsed.isna() & values.notna() & (values.astype(str).str.strip() != '')
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], format='mixed', errors='coerce')
+    return parsed
+
+def to_scores(values):
+    """Scores en int16 quand toutes les valeurs sont entières, sinon float32 (manquants à 0)"""
+    numbers = pd.to_numeric(values, errors='coerce').fillna(0)
+    if len(numbers) and (numbers % 1 == 0).all() and numbers.between(-32768, 32767).all():
+        return numbers.astype('int16')
+    return numbers.astype('float32')
+
+def to_note(values):
+    """Note de recommandation 1-5 en entier nullable (une note illisible reste manquante)"""
+    numbers = pd.to_numeric(values, errors='coerce').round()
+    return numbers.where(numbers.between(-128, 127)).astype('Int8')
+
+def is_long_text_column(col):
+    return col in LONG_TEXT_COLUMNS or col.startswith(TEXT_PREFIXES)
+
+def apply_schema(df):
+    """Convertit chaque colonne vers son type compact (sans effet sur une colonne déjà typée)"""
+    if df.empty:
+        return df
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'Timestamp':
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                converted[col] = parse_timestamps(values)
+        elif is_score_column(col):
+            if values.dtype not in ('int16', 'float32'):
+                converted[col] = to_scores(values)
+        elif col == NOTE_COLUMN:
+            if str(values.dtype) != 'Int8':
+                converted[col] = to_note(values)
+        elif col in CATEGORY_COLUMNS:
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                converted[col] = values.astype('category')
+        elif is_long_text_column(col) and TEXT_DTYPE is not None:
+            if values.dtype != TEXT_DTYPE:
+                converted[col] = values.astype(TEXT_DTYPE)
+    return df.assign(**converted) if converted else df
+
+def column_bytes(values):
+    """
+    Octets occupés par une colonne. Pour une colonne objet, chaque chaîne n'est comptée
+    qu'une fois : des cellules qui partagent le même objet (références résolues) ne le
+    dupliquent pas en mémoire, contrairement à ce que suppose memory_usage(deep=True).
+    """
+    if values.dtype != object:
+        return int(values.memory_usage(deep=True, index=False))
+    unique = {id(v): v for v in values.to_numpy()}
+    return values.to_numpy().nbytes + sum(sys.getsizeof(v) for v in unique.values())
+
+def memory_mb(df):
+    """Taille résidente du DataFrame (chaînes comprises), en Mo"""
+    return (sum(column_bytes(df[col]) for col in df.columns) + df.index.memory_usage()) / 1e6
+
+
+# =============================================================================
+# BANC D'ESSAI MÉMOIRE
+# =============================================================================
+WORDS = ("prix qualité garantie livraison avis comparatif conseil magasin option modèle marque "
+         "confort design durable offre promotion service client retour stock taille couleur "
+         "matière entretien installation budget gamme performance sécurité label test choix").split()
+
+def synthetic_values(rows, clients=30, queries_per_client=15, codes=("PPLX", "GEM", "GPT"),
+                     stable=0.6, seed=42):
+    """
+    Valeurs brutes telles que renvoyées par la feuille (chaînes, en-têtes en tête),
+    proportions proches de la production : réponses compressées, et référence REF::
+    vers la dernière réponse complète quand la réponse n'a pas changé (part "stable").
+    """
+    rng = random.Random(seed)
+    domains = [f"site{i}.fr" for i in range(200)]
+    headers = (["Date", "Client", "Mot_Cle", "URL_Cible", "Score_Global"] + [f"Score_{c}" for c in codes]
+               + [f"Texte_{c}" for c in codes] + ["Sources_Detectees", "Note_Recommandation", "Concurrent_Principal"])
+    last_full = {}
+    values = [headers]
+    for i in range(rows):
+        client = rng.randrange(clients)
+        query = f"requête {client}-{rng.randrange(queries_per_client)}"
+        a, b = rng.sample(domains, 2)
+        scores, texts = [], []
+        for code in codes:
+            key = (client, query, code)
+            if key in last_full and rng.random() < stable:
+                texts.append(make_ref(last_full[key]))
+            else:
+                body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(150, 400)))
+                texts.append(encode_text(f"Pour {query}, {body}.\n\nSOURCES: [{a}, {b}]\nRECOMMANDATION: [4]\nCONCURRENT: [{a}]"))
+                last_full[key] = i + 2
+            scores.append(rng.choice([0, 10, 20, 50, 60, 70, 80, 100]))
+        values.append(
+            [f"2026-{1 + i * 12 // rows:02d}-{1 + i % 28:02d} 09:{i % 60:02d}:00", f"Client {client}", query,
+             f"client{client}.fr", str(round(sum(scores) / len(scores)))]
+            + [str(s) for s in scores] + texts
+            + ["|".join(f"{c}:{a},{b}" for c in codes), str(rng.randint(1, 5)), a]
+        )
+    return values
+
+def legacy_frame(headers, data, dtype=None):
+    """
+    Jeu chargé avant ce module : types inférés par pandas (objets Python avant pandas 3,
+    dtype=object pour les simuler), scores en float64, dates inférées
+    """
+    from storage import resolve_text_refs
+    df = pd.DataFrame([list(row) for row in data], columns=headers, dtype=dtype).rename(columns={"Date": "Timestamp"})
+    for col in df.columns:
+        if is_score_column(col):
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('float64')
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+    return resolve_text_refs(df)
+
+def typed_frame(headers, data):
+    """Jeu chargé avec le schéma (même séquence que get_data() dans app.py)"""
+    from storage import resolve_text_refs
+    df = pd.DataFrame([list(row) for row in data], columns=headers).rename(columns={"Date": "Timestamp"})
+    return apply_schema(resolve_text_refs(df))
+
+def benchmark(rows):
+    values = synthetic_values(rows)
+    after = typed_frame(values[0], values[1:])
+    analytics = [c for c in after.columns if not c.startswith(TEXT_PREFIXES)]
+    baselines = {
+        f"pandas {pd.__version__}": legacy_frame(values[0], values[1:]),
+        "objets Python": legacy_frame(values[0], values[1:], dtype=object),
+    }
+    print(f"📏 {rows} lignes, schéma typé : {memory_mb(after):.1f} Mo ({memory_mb(after[analytics]):.1f} Mo hors Texte_*)")
+    for name, before in baselines.items():
+        print(f"   Avant ({name:>14}) : {memory_mb(before):7.1f} Mo  ÷{memory_mb(before) / memory_mb(after):.1f}"
+              f"  | hors Texte_* : {memory_mb(before[analytics]):6.1f} Mo  ÷{memory_mb(before[analytics]) / memory_mb(after[analytics]):.1f}")
+    detail = pd.DataFrame({
+        **{f"avant_mo ({name})": [column_bytes(before[c]) / 1e6 for c in after.columns] for name, before in baselines.items()},
+        "apres_mo": [column_bytes(after[c]) / 1e6 for c in after.columns],
+        "type": [str(t) for t in after.dtypes],
+    }, index=after.columns)
+    print(detail.round(2).to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai mémoire du schéma typé GEO-Radar")
+    parser.add_argument("--lignes", type=int, default=100000)
+    args = parser.parse_args()
+    benchmark(args.lignes)
@@ -0,0 +1,391 @@
+"""
+Index plein texte local (SQLite FTS5) des réponses IA historiques.
+
+- Table `reponses` : une ligne par (ligne LOGS_RESULTATS, moteur) avec client,
+  requête, date, score et texte compressé (codec de storage.py).
+- Table virtuelle `reponses_fts` (contentless) : texte et domaines cités, même rowid.
+- Mise à jour incrémentale : seules les lignes de la feuille postérieures à la
+  dernière ligne indexée sont ajoutées.
+
+Recherche par termes, phrase exacte, domaine, moteur, client et dates, paginée
+par rowid décroissant (ordre d'ingestion) pour rester rapide sur des millions de lignes.
+
+À l'ingestion, chaque réponse est aussi comparée à la précédente du même
+(client, requête, moteur) : le diff (diff_engine.py) est stocké dans la table
+`diffs` et n'est jamais recalculé à l'affichage. Les paires de domaines cités
+ensemble (co-citations, voir cocitation.py) sont enregistrées dans `cocitations`.
+"""
+import html
+import json
+import os
+import re
+import sqlite3
+from functools import lru_cache
+
+import pandas as pd
+
+from cocitation import citation_pairs
+from diff_engine import diff_answers
+from domains import registrable_domain
+from storage import decode_text, encode_text
+
+INDEX_PATH = os.environ.get("GEO_INDEX_PATH", os.path.join(".geo_radar", "search.db"))
+# Incrémenté à chaque changement de schéma : l'index local est alors reconstruit
+SCHEMA_VERSION = 4
+# Réponses écrites par executemany à la fois pendant l'indexation
+TAILLE_PAQUET = 5000
+# Plafond du comptage et de la pagination d'une recherche
+MAX_RESULTATS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reponses (
+    id INTEGER PRIMARY KEY,
+    ligne INTEGER NOT NULL,
+    moteur TEXT NOT NULL,
+    client TEXT,
+    mot_cle TEXT,
+    date TEXT,
+    score INTEGER,
+    texte TEXT,
+    sources TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reponses_client_date ON reponses(client, date);
+CREATE INDEX IF NOT EXISTS idx_reponses_date ON reponses(date);
+CREATE INDEX IF NOT EXISTS idx_reponses_ligne ON reponses(ligne, moteur);
+CREATE VIRTUAL TABLE IF NOT EXISTS reponses_fts USING fts5(
+    texte, domaines, content='', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT);
+CREATE TABLE IF NOT EXISTS dernieres (cle TEXT PRIMARY KEY, id INTEGER);
+CREATE TABLE IF NOT EXISTS diffs (
+    id INTEGER PRIMARY KEY,
+    precedent INTEGER,
+    similarite REAL,
+    detail TEXT
+);
+CREATE TABLE IF NOT EXISTS cocitations (id INTEGER NOT NULL, a TEXT NOT NULL, b TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_cocitations_id ON cocitations(id);
+"""
+DROP_SCHEMA = """
+DROP TABLE IF EXISTS reponses;
+DROP TABLE IF EXISTS reponses_fts;
+DROP TABLE IF EXISTS meta;
+DROP TABLE IF EXISTS dernieres;
+DROP TABLE IF EXISTS diffs;
+DROP TABLE IF EXISTS cocitations;
+"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def connect(path=INDEX_PATH):
+    """Ouvre (et initialise si besoin) l'index"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript(DROP_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# =============================================================================
+# 1. INDEXATION
+# =============================================================================
+def get_last_indexed_row(conn):
+    row = conn.execute("SELECT valeur FROM meta WHERE cle = 'derniere_ligne'").fetchone()
+    return int(row[0]) if row else 1
+
+def sync_index(df, codes, parse_sources, path=INDEX_PATH):
+    """
+    Ajoute à l'index les lignes de LOGS_RESULTATS pas encore indexées.
+    df doit être le jeu complet (position i = ligne i + 2 de la feuille).
+    Retourne le nombre de réponses ajoutées.
+
+    Lecture par colonnes (pas de iterrows) et insertions par paquets de TAILLE_PAQUET
+    réponses (executemany, identifiants attribués ici). Une cellule déjà compressée est
+    stockée telle quelle ; une réponse identique à la précédente de la même clé (référence
+    REF:: résolue) n'est décodée qu'une fois.
+    """
+    conn = connect(path)
+    try:
+        last = get_last_indexed_row(conn)
+        start = max(0, last - 1)
+        if start > len(df):
+            # Feuille raccourcie ou remplacée : l'index est reconstruit
+            with conn:
+                conn.execute("DELETE FROM reponses")
+                conn.execute("INSERT INTO reponses_fts (reponses_fts) VALUES ('delete-all')")
+                conn.execute("DELETE FROM meta WHERE cle = 'derniere_ligne'")
+                conn.execute("DELETE FROM dernieres")
+                conn.execute("DELETE FROM diffs")
+                conn.execute("DELETE FROM cocitations")
+            start = 0
+        if start >= len(df):
+            return 0
+
+        new = df.iloc[start:]
+        column = lambda name, default='': new[name].tolist() if name in new.columns else [default] * len(new)
+        clients, queries = column('Client'), column('Mot_Cle')
+        dates = [ts.isoformat(sep=' ') if pd.notna(ts) else '' for ts in column('Timestamp', None)]
+        sources_col = column('Sources_Detectees')
+        texts = {code: column(f'Texte_{code}') for code in codes}
+        scores = {code: column(f'Score_{code}', 0) for code in codes}
+
+        next_id = (conn.execute("SELECT max(id) FROM reponses").fetchone()[0] or 0) + 1
+        added = 0
+        # Dernière réponse connue par (client, requête, moteur) : (id, texte, sources) ; dernière cellule lue
+        previous, last_cells = {}, {}
+        batch = {"reponses": [], "fts": [], "cocitations": [], "diffs": []}
+        with conn:
+            for i in range(len(new)):
+                parsed = parse_sources(sources_col[i], codes)
+                for code in codes:
+                    cell = texts[code][i]
+                    if not isinstance(cell, str) or not cell:
+                        continue
+                    key = f"{clients[i]}|{queries[i]}|{code}"
+                    cached = last_cells.get(key)
+                    text = cached[1] if cached is not None and cached[0] == cell else (decode_text(cell) or '')
+                    last_cells[key] = (cell, text)
+                    if not text:
+                        continue
+                    score = scores[code][i]
+                    sources = list(dict.fromkeys(registrable_domain(src) or src.lower() for src in parsed.get(code, [])))
+                    batch["reponses"].append((
+                        next_id, i + start + 2, code, clients[i], queries[i], dates[i],
+                        int(score) if pd.notna(score) else 0, cell if cell != text else encode_text(text), ",".join(sources)
+                    ))
+                    batch["fts"].append((next_id, text, " ".join(sources)))
+                    batch["cocitations"].extend((next_id, a, b) for a, b in citation_pairs(sources))
+                    record_diff(conn, previous, key, next_id, text, sources, batch["diffs"])
+                    next_id += 1
+                    added += 1
+                if len(batch["reponses"]) >= TAILLE_PAQUET:
+                    _flush(conn, batch)
+            _flush(conn, batch)
+            conn.executemany(
+                "INSERT OR REPLACE INTO dernieres (cle, id) VALUES (?, ?)",
+                [(key, value[0]) for key, value in previous.items() if value is not None]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (cle, valeur) VALUES ('derniere_ligne', ?)",
+                (str(len(df) + 1),)
+            )
+        return added
+    finally:
+        conn.close()
+
+def _flush(conn, batch):
+    """Écrit un paquet de réponses (tables reponses, FTS, co-citations, diffs) et le vide"""
+    conn.executemany(
+        "INSERT INTO reponses (id, ligne, moteur, client, mot_cle, date, score, texte, sources) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        batch["reponses"]
+    )
+    conn.executemany("INSERT INTO reponses_fts (rowid, texte, domaines) VALUES (?, ?, ?)", batch["fts"])
+    conn.executemany("INSERT INTO cocitations (id, a, b) VALUES (?, ?, ?)", batch["cocitations"])
+    conn.executemany("INSERT OR REPLACE INTO diffs (id, precedent, similarite, detail) VALUES (?, ?, ?, ?)", batch["diffs"])
+    for rows in batch.values():
+        rows.clear()
+
+@lru_cache(maxsize=1024)
+def _encode_detail(detail):
+    """Diff encodé ; les diffs identiques (réponse inchangée, mêmes sources) ne sont compressés qu'une fois"""
+    return encode_text(detail)
+
+def record_diff(conn, previous, key, new_id, text, sources, diffs):
+    """
+    Calcule le diff avec la réponse précédente de la même clé (ajouté à diffs, ligne de la
+    table diffs), puis met à jour la clé. La table dernieres est écrite par sync_index().
+    """
+    if key not in previous:
+        row = conn.execute(
+            "SELECT r.id, r.texte, r.sources FROM dernieres d JOIN reponses r ON r.id = d.id WHERE d.cle = ?", (key,)
+        ).fetchone()
+        previous[key] = (row[0], decode_text(row[1]), row[2].split(",") if row[2] else []) if row else None
+
+    if previous[key] is not None:
+        prev_id, prev_text, prev_sources = previous[key]
+        diff = diff_answers(prev_text, text, prev_sources, sources)
+        diffs.append((new_id, prev_id, diff["similarite"], _encode_detail(json.dumps(diff, ensure_ascii=False))))
+    previous[key] = (new_id, text, list(sources))
+
+def get_diff(ligne, moteur, path=INDEX_PATH):
+    """Diff stocké entre la réponse (ligne de la feuille, moteur) et la précédente, None si aucun"""
+    conn = connect(path)
+    try:
+        row = conn.execute(
+            "SELECT d.detail, p.date FROM reponses r JOIN diffs d ON d.id = r.id "
+            "JOIN reponses p ON p.id = d.precedent WHERE r.ligne = ? AND r.moteur = ?",
+            (int(ligne), moteur)
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    diff = json.loads(decode_text(row[0]))
+    diff["date_precedente"] = row[1]
+    return diff
+
+
+# =============================================================================
+# 2. RECHERCHE
+# =============================================================================
+def _quote(value):
+    """Échappe une valeur pour une requête FTS5 (chaîne entre guillemets)"""
+    return '"' + value.replace('"', '""') + '"'
+
+def build_match(termes="", phrase="", domaine=""):
+    """Construit l'expression MATCH FTS5 : termes (ET), phrase exacte, domaine cité"""
+    clauses = [_quote(word) for word in _WORD.findall(termes or "")]
+    if phrase and phrase.strip():
+        clauses.append(_quote(phrase.strip()))
+    if domaine and domaine.strip():
+        clauses.append(f"domaines : {_quote(domaine.strip().lower())}")
+    return " AND ".join(clauses)
+
+def search(termes="", phrase="", domaine="", moteur=None, client=None,
+           date_min=None, date_max=None, page=1, par_page=20, path=INDEX_PATH):
+    """
+    Recherche paginée. Retourne (nombre de résultats plafonné à MAX_RESULTATS, DataFrame de la page).
+    Les résultats les plus récemment indexés viennent en premier ; au-delà de MAX_RESULTATS
+    ni le comptage ni la pagination ne parcourent l'index (dernière page = MAX_RESULTATS).
+    """
+    conn = connect(path)
+    try:
+        match = build_match(termes, phrase, domaine)
+        # Avec des termes, l'index FTS est parcouru par rowid décroissant (CROSS JOIN : FTS en
+        # table externe) et LIMIT arrête le parcours dès la page remplie, sans matérialiser
+        # toutes les correspondances
+        source = "reponses r"
+        where, params = [], []
+        if match:
+            source = "reponses_fts f CROSS JOIN reponses r ON r.id = f.rowid"
+            where.append("reponses_fts MATCH ?")
+            params.append(match)
+        if moteur:
+            where.append("r.moteur = ?")
+            params.append(moteur)
+        if client:
+            where.append("r.client = ?")
+            params.append(client)
+        if date_min:
+            where.append("r.date >= ?")
+            params.append(str(date_min))
+        if date_max:
+            where.append("r.date < date(?, '+1 day')")
+            params.append(str(date_max))
+        where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+        order = "f.rowid" if match else "r.id"
+
+        total = conn.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM {source} {where_sql} LIMIT ?)", params + [MAX_RESULTATS]
+        ).fetchone()[0]
+        offset = min(max(0, page - 1) * par_page, max(0, MAX_RESULTATS - par_page))
+        rows = conn.execute(
+            f"SELECT r.id, r.ligne, r.date, r.client, r.mot_cle, r.moteur, r.score, r.texte "
+            f"FROM {source} {where_sql} ORDER BY {order} DESC LIMIT ? OFFSET ?",
+            params + [par_page, offset]
+        ).fetchall()
+        columns = ["id", "ligne", "date", "client", "mot_cle", "moteur", "score", "texte"]
+        return total, pd.DataFrame(rows, columns=columns)
+    finally:
+        conn.close()
+
+def get_cocitations(client=None, date_min=None, date_max=None, path=INDEX_PATH):
+    """
+    Arêtes de co-citation agrégées (a, b, poids) et nombre de réponses citant chaque domaine,
+    pour un client et une période.
+    """
+    where, params = [], []
+    if client:
+        where.append("r.client = ?")
+        params.append(client)
+    if date_min:
+        where.append("r.date >= ?")
+        params.append(str(date_min))
+    if date_max:
+        where.append("r.date < date(?, '+1 day')")
+        params.append(str(date_max))
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+
+    conn = connect(path)
+    try:
+        edges = conn.execute(
+            f"SELECT c.a, c.b, count(*) FROM cocitations c JOIN reponses r ON r.id = c.id {where_sql} GROUP BY c.a, c.b",
+            params
+        ).fetchall()
+        counts = {}
+        for (sources,) in conn.execute(f"SELECT r.sources FROM reponses r {where_sql}", params):
+            for domain in {d.lower() for d in (sources or "").split(",") if d}:
+                counts[domain] = counts.get(domain, 0) + 1
+        return edges, counts
+    finally:
+        conn.close()
+
+def make_snippet(text, termes="", phrase="", width=160):
+    """Extrait HTML autour de la première occurrence recherchée, termes surlignés"""
+    text = decode_text(text) or ""
+    needles = [phrase.strip()] if phrase and phrase.strip() else []
+    needles += _WORD.findall(termes or "")
+    lower = text.lower()
+    positions = [lower.find(n.lower()) for n in needles if n and lower.find(n.lower()) >= 0]
+    start = max(0, min(positions) - width // 2) if positions else 0
+    excerpt = html.escape(text[start:start + width * 2])
+    for needle in needles:
+        if needle:
+            excerpt = re.sub(r"\b" + re.escape(html.escape(needle)) + r"\b", lambda m: f"<mark>{m.group(0)}</mark>", excerpt, flags=re.IGNORECASE)
+    return ("…" if start > 0 else "") + excerpt + ("…" if start + width * 2 < len(text) else "")
+
+
+# =============================================================================
+# BANC D'ESSAI
+# =============================================================================
+BENCH_QUERIES = [
+    ("terme fréquent", {"termes": "garantie"}),
+    ("deux termes + client", {"termes": "garantie livraison", "client": "Client 3"}),
+    ("phrase exacte", {"phrase": "service client"}),
+    ("domaine cité", {"domaine": "site5.fr"}),
+    ("client + période", {"client": "Client 7", "date_min": "2026-06-01", "date_max": "2026-06-30"}),
+    ("terme + moteur, page 50", {"termes": "prix", "moteur": "GEM", "page": 50}),
+]
+
+def benchmark(rows, path):
+    """
+    Indexe rows lignes synthétiques de LOGS_RESULTATS (schema.synthetic_values, 3 moteurs :
+    3 x rows réponses) dans un index neuf, puis chronomètre les recherches de BENCH_QUERIES
+    """
+    import time
+    from alerts import parse_sources_str
+    from schema import synthetic_values, typed_frame
+
+    if os.path.exists(path):
+        os.remove(path)
+    start = time.perf_counter()
+    values = synthetic_values(rows)
+    df = typed_frame(values[0], values[1:])
+    del values
+    print(f"🧪 {rows} lignes synthétiques générées en {time.perf_counter() - start:.0f} s")
+
+    start = time.perf_counter()
+    added = sync_index(df, ["PPLX", "GEM", "GPT"], lambda value, codes: parse_sources_str(value), path)
+    duration = time.perf_counter() - start
+    print(f"📚 {added} réponses indexées en {duration:.0f} s ({added / duration:.0f} réponses/s), "
+          f"index {os.path.getsize(path) / 1e6:.0f} Mo")
+
+    for label, query in BENCH_QUERIES:
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            total, page = search(path=path, **query)
+            timings.append(time.perf_counter() - start)
+        print(f"   🔎 {label:<26} {total:>8} résultats  médiane {sorted(timings)[2] * 1000:6.1f} ms  max {max(timings) * 1000:6.1f} ms")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Banc d'essai de l'index plein texte GEO-Radar")
+    parser.add_argument("--lignes", type=int, default=334000, help="Lignes LOGS_RESULTATS (3 réponses chacune)")
+    parser.add_argument("--index", default=os.path.join(".geo_radar", "bench.db"))
+    args = parser.parse_args()
+    benchmark(args.lignes, args.index)
@@ -0,0 +1,69 @@
+"""
+Statistiques d'échantillonnage GEO-Radar.
+
+Les réponses des LLM n'étant pas déterministes, le monitor peut interroger
+K fois chaque (requête, moteur). Ce module agrège les K échantillons
+(moyenne, variance, probabilité de citation avec intervalles de confiance)
+et relit ces agrégats côté tableau de bord pour tracer des bandes d'erreur.
+"""
+import json
+import math
+
+Z_95 = 1.96
+
+
+def wilson_interval(successes, n, z=Z_95):
+    """Intervalle de confiance de Wilson pour une proportion (robuste pour petits n)"""
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def summarize_samples(scores, cited):
+    """
+    Agrège les échantillons d'un (requête, moteur).
+    scores : scores GEO des échantillons valides ; cited : booléens de citation associés.
+    """
+    n = len(scores)
+    if n == 0:
+        return {"n": 0, "moyenne": 0.0, "variance": 0.0, "ic_bas": 0.0, "ic_haut": 0.0,
+                "p_citation": 0.0, "p_ic_bas": 0.0, "p_ic_haut": 0.0}
+
+    mean = sum(scores) / n
+    variance = sum((s - mean) ** 2 for s in scores) / (n - 1) if n > 1 else 0.0
+    margin = Z_95 * math.sqrt(variance / n)
+    k = sum(1 for c in cited if c)
+    p_low, p_high = wilson_interval(k, n)
+    return {
+        "n": n,
+        "moyenne": round(mean, 2),
+        "variance": round(variance, 2),
+        "ic_bas": round(max(0.0, mean - margin), 2),
+        "ic_haut": round(min(100.0, mean + margin), 2),
+        "p_citation": round(k / n, 3),
+        "p_ic_bas": round(p_low, 3),
+        "p_ic_haut": round(p_high, 3),
+    }
+
+
+def parse_stats(cell):
+    """Relit la colonne Stats_Echantillons ({moteur: agrégats}). Cellule vide ou invalide -> {}"""
+    if not cell or not isinstance(cell, str):
+        return {}
+    try:
+        data = json.loads(cell)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def mean_variance(stats_by_engine, codes):
+    """Variance de la moyenne d'un ensemble de moteurs (échantillons indépendants)"""
+    present = [stats_by_engine[c] for c in codes if c in stats_by_engine and stats_by_engine[c].get("n")]
+    if not present:
+        return 0.0
+    return sum(s["variance"] / s["n"] for s in present) / len(present) ** 2
@@ -0,0 +1,223 @@
+"""
+Encodage des réponses IA stockées dans LOGS_RESULTATS.
+
+Stockage delta : chaque réponse reçoit une empreinte (hash du texte normalisé,
+simhash des shingles de mots, ensemble des sources). Si la réponse ne diffère
+pas sensiblement de la précédente pour le même (client, requête, moteur), la
+cellule Texte_<CODE> contient une référence "REF::<ligne>" vers la ligne de la
+feuille qui porte le texte complet, au lieu du texte lui-même.
+
+Compression : les réponses complètes (non tronquées) sont compressées avec zlib
+et un dictionnaire partagé, puis encodées en base85 dans la cellule
+("Z<version>:<données>"). Le tableau de bord ne les décompresse qu'à l'affichage.
+Un dictionnaire entraîné sur l'historique peut être ajouté (zdict_v<N>.txt) :
+les anciennes cellules restent lisibles grâce au numéro de version.
+"""
+import base64
+import glob
+import hashlib
+import os
+import re
+import zlib
+from collections import Counter
+
+REF_PREFIX = "REF::"
+SIMHASH_BITS = 64
+# Distance de Hamming maximale entre simhash pour considérer deux réponses identiques
+SIMHASH_SEUIL = 3
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+# =============================================================================
+# 1. EMPREINTES
+# =============================================================================
+def normalize_text(text):
+    """Texte en minuscules, ponctuation et espaces normalisés"""
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+def simhash(text, shingle=3):
+    """Simhash 64 bits des shingles de mots : proche pour des textes presque identiques"""
+    words = normalize_text(text).split()
+    grams = [" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))]
+    weights = [0] * SIMHASH_BITS
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+def fingerprint(text, sources):
+    """Empreinte d'une réponse : hash du texte normalisé, simhash, sources triées"""
+    return {
+        "hash": hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()[:16],
+        "simhash": f"{simhash(text):016x}",
+        "sources": ",".join(sorted({s.lower() for s in sources})),
+    }
+
+def is_same_answer(fp, previous):
+    """Vrai si la réponse ne diffère pas sensiblement de la précédente (mêmes sources, texte quasi identique)"""
+    if not previous or fp["sources"] != previous.get("sources"):
+        return False
+    if fp["hash"] == previous.get("hash"):
+        return True
+    try:
+        distance = bin(int(fp["simhash"], 16) ^ int(previous.get("simhash", ""), 16)).count("1")
+    except ValueError:
+        return False
+    return distance <= SIMHASH_SEUIL
+
+
+# =============================================================================
+# 2. RÉFÉRENCES
+# =============================================================================
+def make_ref(row_number):
+    """Référence vers la ligne de LOGS_RESULTATS qui porte le texte complet"""
+    return f"{REF_PREFIX}{row_number}"
+
+def parse_ref(cell):
+    """Numéro de ligne référencé par une cellule, None si la cellule contient un texte"""
+    if isinstance(cell, str) and cell.startswith(REF_PREFIX):
+        try:
+            return int(cell[len(REF_PREFIX):])
+        except ValueError:
+            return None
+    return None
+
+def resolve_text_refs(df):
+    """
+    Remplace les références "REF::<ligne>" des colonnes Texte_* par le texte référencé.
+    La ligne N de la feuille correspond à la position N-2 du DataFrame (en-têtes en ligne 1).
+    Les cellules résolues partagent la même chaîne Python : pas de copie du texte en mémoire.
+    """
+    for col in [c for c in df.columns if c.startswith("Texte_")]:
+        # Repérage vectorisé : la colonne n'est copiée que si elle contient des références
+        is_ref = df[col].str.startswith(REF_PREFIX, na=False).to_numpy(dtype=bool)
+        if not is_ref.any():
+            continue
+        values = df[col].to_numpy(dtype=object, copy=True)
+        for i in is_ref.nonzero()[0]:
+            row_number = parse_ref(values[i])
+            pos = row_number - 2 if row_number is not None else -1
+            values[i] = values[pos] if 0 <= pos < len(values) and parse_ref(values[pos]) is None else ""
+        df[col] = values
+    return df
+
+
+# =============================================================================
+# 3. COMPRESSION
+# =============================================================================
+# Dictionnaire de base : tournures et marqueurs fréquents des réponses IA.
+# zlib exploite en priorité la fin du dictionnaire : les motifs les plus fréquents y sont placés.
+SEED_DICTIONARY = """
+Voici les meilleures options. En résumé, Pour conclure, En conclusion, Il est recommandé de
+comparer les prix, la qualité, les avis clients, la garantie et les conditions de livraison.
+Les principaux critères à prendre en compte sont : ### Conseils pratiques ### Points clés
+- **Prix** : - **Qualité** : - **Livraison** : - **Garantie** : - **Avis clients** :
+Selon les sources officielles, selon plusieurs études, d'après les avis des utilisateurs,
+vous pouvez consulter le site officiel, sur le site de, il est conseillé de vérifier
+la disponibilité en magasin et en ligne. N'hésitez pas à demander conseil à un professionnel.
+gratuit, gratuite, livraison gratuite, service client, rapport qualité-prix, meilleur prix,
+www.amazon.fr www.leboncoin.fr www.wikipedia.org fr.wikipedia.org www.service-public.fr
+www.ameli.fr www.sante.gouv.fr www.quechoisir.org www.60millions-mag.com www.youtube.com
+https://www. https://fr. https:// .com/ .fr/ .org/ .gouv.fr
+ pour les des une est que qui dans sur avec vous votre vos plus sont par pas ce cette aux
+ **
+SOURCES: [
+RECOMMANDATION: [
+CONCURRENT: [
+"""
+
+DICTIONARY_DIR = os.path.dirname(os.path.abspath(__file__))
+# Taille max d'une cellule Google Sheets (50 000 caractères), avec marge
+MAX_CELL_CHARS = 49000
+
+_CODEC_RE = re.compile(r"^Z(\d+):")
+
+
+def load_dictionaries():
+    """Dictionnaires disponibles par version : v1 intégré + fichiers zdict_v<N>.txt entraînés"""
+    dictionaries = {1: SEED_DICTIONARY.encode("utf-8")}
+    for path in glob.glob(os.path.join(DICTIONARY_DIR, "zdict_v*.txt")):
+        match = re.search(r"zdict_v(\d+)\.txt$", path)
+        if match:
+            with open(path, "rb") as f:
+                dictionaries[int(match.group(1))] = f.read()
+    return dictionaries
+
+DICTIONARIES = load_dictionaries()
+CURRENT_VERSION = max(DICTIONARIES)
+
+
+def _compress(text, version):
+    comp = zlib.compressobj(level=9, wbits=-15, zdict=DICTIONARIES[version])
+    data = comp.compress(text.encode("utf-8")) + comp.flush()
+    return f"Z{version}:" + base64.b85encode(data).decode("ascii")
+
+def encode_text(text):
+    """
+    Compresse une réponse complète pour stockage dans une cellule.
+    Les textes courts (où la compression ne gagne rien) restent en clair ;
+    un texte trop long pour une cellule est raccourci jusqu'à tenir.
+    """
+    if not text:
+        return text
+    encoded = _compress(text, CURRENT_VERSION)
+    while len(encoded) > MAX_CELL_CHARS:
+        text = text[:int(len(text) * MAX_CELL_CHARS / len(encoded) * 0.95)]
+        encoded = _compress(text, CURRENT_VERSION)
+    return encoded if len(encoded) < len(text) else text
+
+def decode_text(cell):
+    """Décompresse une cellule encodée par encode_text ; renvoie les autres valeurs telles quelles"""
+    if not isinstance(cell, str):
+        return cell
+    match = _CODEC_RE.match(cell)
+    if not match or int(match.group(1)) not in DICTIONARIES:
+        return cell
+    try:
+        data = base64.b85decode(cell[match.end():])
+        decomp = zlib.decompressobj(wbits=-15, zdict=DICTIONARIES[int(match.group(1))])
+        return (decomp.decompress(data) + decomp.flush()).decode("utf-8")
+    except (ValueError, zlib.error):
+        return cell
+
+def train_dictionary(samples, size=32768, ngram=4):
+    """
+    Construit un dictionnaire zlib à partir de réponses historiques :
+    n-grammes de mots les plus fréquents, du moins au plus fréquent.
+    """
+    counts = Counter()
+    for text in samples:
+        words = (text or "").split(" ")
+        counts.update(" ".join(words[i:i + ngram]) for i in range(len(words) - ngram + 1))
+
+    chunks = []
+    total = 0
+    for gram, freq in counts.most_common():
+        if freq < 2:
+            break
+        chunk = gram + " "
+        if total + len(chunk.encode("utf-8")) > size:
+            break
+        chunks.append(chunk)
+        total += len(chunk.encode("utf-8"))
+    return "".join(reversed(chunks)).encode("utf-8")
+
+
+if __name__ == "__main__":
+    # Entraîne un nouveau dictionnaire depuis un export CSV du tableau de bord :
+    #   python storage.py export.csv
+    import csv
+    import sys
+
+    csv.field_size_limit(10 ** 7)
+    texts = []
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            texts.extend(decode_text(v) for k, v in row.items() if k and k.startswith("Texte_") and v)
+    version = CURRENT_VERSION + 1
+    path = os.path.join(DICTIONARY_DIR, f"zdict_v{version}.txt")
+    with open(path, "wb") as f:
+        f.write(train_dictionary(texts))
+    print(f"✅ Dictionnaire v{version} entraîné sur {len(texts)} réponses : {path}")
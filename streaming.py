@@ -0,0 +1,99 @@
+"""
+Mode streaming GEO-Radar : lecture des réponses au fil de l'eau.
+
+- OpenAI / Perplexity : chat/completions avec "stream": true (Server-Sent Events),
+- Gemini : streamGenerateContent?alt=sse.
+
+Le moteur choisit son format via ENGINES[code]["parse_stream"] (voir engines.py).
+StreamCollector accumule le texte et coupe la lecture dès que le budget de caractères
+stocké est atteint : la connexion est fermée, le fournisseur arrête de générer (et de
+facturer) les tokens suivants. Le prompt demande alors le bloc SOURCES /
+RECOMMANDATION / CONCURRENT en tête de réponse, pour qu'il survive à la coupure.
+Le temps jusqu'au premier token (TTFT) et la durée totale sont mesurés.
+"""
+import json
+import re
+import time
+
+import requests
+
+
+class StreamCollector:
+    """Texte reçu, budget de caractères et mesures de latence"""
+
+    def __init__(self, max_chars=5000):
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self.tronque = False
+        self._start = time.monotonic()
+        self.ttft = None
+
+    def feed(self, delta):
+        """Ajoute un fragment ; retourne False quand le budget est atteint (arrêter la lecture)"""
+        if not delta:
+            return True
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self._start
+        if self.max_chars and self.length + len(delta) >= self.max_chars:
+            delta = delta[:self.max_chars - self.length]
+            self.tronque = True
+        self.parts.append(delta)
+        self.length += len(delta)
+        return not self.tronque
+
+    def close(self):
+        """Fin de lecture : fige la durée totale"""
+        self.duree = time.monotonic() - self._start
+        return self
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+
+_HEADER = re.compile(
+    r"\A\s*((?:[*_]*(?:SOURCES?|RECOMMANDATION|CONCURRENT)[\s*_]*:[^\n]*(?:\n|\Z)\s*){1,3})",
+    re.IGNORECASE
+)
+
+def move_header_to_end(text):
+    """
+    Replace en fin de texte le bloc de métadonnées demandé en tête en mode streaming :
+    le texte stocké garde le format habituel (bloc final), lu par response_parser.
+    """
+    match = _HEADER.match(text or "")
+    if not match:
+        return text
+    body = text[match.end():].strip()
+    return f"{body}\n\n{match.group(1).strip()}" if body else match.group(1).strip()
+
+
+def iter_sse(response):
+    """Événements JSON d'un flux Server-Sent Events (lignes "data: ...", fin sur [DONE])"""
+    for raw in response.iter_lines():
+        # SSE est toujours en UTF-8 (requests supposerait ISO-8859-1 sans charset)
+        line = raw.decode("utf-8", errors="replace")
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            yield json.loads(data)
+        except ValueError:
+            continue
+
+
+def stream_completion(request, parse_event, max_chars=5000, timeout=60):
+    """
+    Envoie une requête en streaming et collecte la réponse.
+    parse_event(événement) -> fragment de texte. Retourne le StreamCollector fermé.
+    """
+    collector = StreamCollector(max_chars)
+    with requests.post(stream=True, timeout=timeout, **request) as r:
+        r.raise_for_status()
+        for event in iter_sse(r):
+            if not collector.feed(parse_event(event)):
+                break
+    return collector.close()
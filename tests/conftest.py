@@ -0,0 +1,30 @@
+"""
+Les modules du projet sont à la racine du dépôt : on la rend importable pour pytest.
+Fixture mock_engines : moteurs du registre redirigés vers mock_server.py, sans limiteur.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_engines(monkeypatch):
+    """Serveur simulé démarré, URLs et clés des moteurs pointées dessus, réglages GEO_* effacés"""
+    import mock_server
+    import monitor
+
+    for key in list(os.environ):
+        if key.startswith("GEO_"):
+            monkeypatch.delenv(key)
+    monkeypatch.setenv("GEO_BATCH_POLL_SECONDS", "0")
+    server, base_url = mock_server.start_mock_server()
+    urls = {"PPLX": base_url, "GPT": f"{base_url}/v1", "GEM": f"{base_url}/v1beta"}
+    for code, engine in monitor.ENGINES.items():
+        monkeypatch.setenv(engine["secret"], "mock")
+        monkeypatch.setitem(engine, "base_url", urls[code])
+        monkeypatch.setitem(monitor.LIMITEURS, code, monitor.RateLimiter(0, engine["max_simultanes"]))
+    yield server
+    server.shutdown()
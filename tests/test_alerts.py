@@ -0,0 +1,32 @@
+from alerts import AnomalyDetector
+
+
+def alert_row(competitor, score=50):
+    return {"Client": "Boulanger", "Mot_Cle": "lave-linge", "Date": "2026-01-01 09:00:00",
+            "Score_PPLX": score, "Score_Global": score, "Sources_Detectees": "PPLX:boulanger.com",
+            "Concurrent_Principal": competitor}
+
+
+def test_competitor_spellings_are_one_competitor():
+    detector = AnomalyDetector()
+    alerts = []
+    for competitor in ["www.darty.com", "darty.com", "https://darty.com/", "DARTY.COM", "Darty.com"]:
+        alerts += detector.observe(alert_row(competitor), ["PPLX"], "boulanger.com")
+    assert [a for a in alerts if a["type"] == "nouveau_concurrent"] == []
+    assert detector.state[("Boulanger", "lave-linge", "GLOBAL")]["concurrents"] == "darty.com"
+
+
+def test_new_competitor_alert():
+    detector = AnomalyDetector()
+    for _ in range(3):
+        detector.observe(alert_row("darty.com"), ["PPLX"], "boulanger.com")
+    alerts = detector.observe(alert_row("https://www.fnac.com/electromenager"), ["PPLX"], "boulanger.com")
+    assert [a["valeur"] for a in alerts if a["type"] == "nouveau_concurrent"] == ["fnac.com"]
+
+
+def test_score_drop_alert():
+    detector = AnomalyDetector()
+    for _ in range(5):
+        assert detector.observe(alert_row("darty.com", 80), ["PPLX"], "boulanger.com") == []
+    alerts = detector.observe(alert_row("darty.com", 20), ["PPLX"], "boulanger.com")
+    assert {a["moteur"] for a in alerts if a["type"] == "chute_score"} == {"PPLX", "GLOBAL"}
@@ -0,0 +1,61 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+
+import monitor
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# Part de voix : sources amies (cible ou partenaire) / sources citées (Conforama 1/6, SPF 2/3)
+LOGS = [
+    ("2026-09-01 09:00:00", "Conforama", "PPLX:www.conforama.fr,ikea.com|GEM:but.fr|GPT:N/A"),
+    ("2026-09-02 09:00:00", "Conforama", "PPLX:ikea.com|GEM:ikea.com|GPT:leroymerlin.fr"),
+    ("2026-09-02 10:00:00", "SPF", "PPLX:tabac-info-service.fr|GEM:ameli.fr|GPT:doctissimo.fr"),
+]
+
+
+class Workbook:
+    """Classeur minimal : LOGS_RESULTATS seulement, les autres feuilles sont absentes"""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def open(self, name):
+        return self
+
+    def worksheet(self, name):
+        if name != "LOGS_RESULTATS":
+            raise Exception(f"feuille absente : {name}")
+        return mock.Mock(get_all_values=lambda: self.rows)
+
+
+def logs_values():
+    headers = monitor.get_log_headers(["PPLX", "GEM", "GPT"])
+    rows = [headers]
+    for date, client, sources in LOGS:
+        row = {"Date": date, "Client": client, "Mot_Cle": "requête", "Score_Global": 50, "Sources_Detectees": sources}
+        rows.append([str(row.get(h, "")) for h in headers])
+    return rows
+
+
+def test_portfolio_share_of_voice(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GEO_INDEX_PATH", raising=False)
+    with mock.patch("gspread.authorize", return_value=Workbook(logs_values())), \
+         mock.patch("google.oauth2.service_account.Credentials.from_service_account_info", return_value=None):
+        at = AppTest.from_file(APP, default_timeout=60)
+        at.secrets["GOOGLE_JSON_KEY"] = json.dumps({"private_key": "x"})
+        at.run()
+        at.radio(key="vue").set_value("🗂️ Portefeuille").run()
+
+    assert not at.exception
+    portfolio = at.dataframe[0].value.set_index("Client")
+    assert portfolio.loc["Conforama", "part_voix"] == pytest.approx(100 / 6)
+    assert portfolio.loc["SPF", "part_voix"] == pytest.approx(100 * 2 / 3)
+    assert portfolio.loc["Conforama", "taux_citation"] == 50 and portfolio.loc["Conforama", "taux_GPT"] == 0
+    assert portfolio.loc["Conforama", "nb_requetes"] == 2 and portfolio.loc["SPF", "nb_requetes"] == 1
+    assert {m.label: m.value for m in at.metric}["Part de voix moyenne"] == "41.7%"
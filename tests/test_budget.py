@@ -0,0 +1,44 @@
+import pytest
+
+import budget
+from budget import BudgetGovernor
+
+
+def test_parse_caps():
+    assert budget.parse_caps("5") == {"*": 5.0}
+    assert budget.parse_caps("PPLX=2, GPT=1.5, GEM=x") == {"PPLX": 2.0, "GPT": 1.5}
+    assert budget.parse_caps("") == {}
+
+
+def test_cost_uses_registry_prices_and_batch_discount():
+    governor = BudgetGovernor()
+    # GPT : 0,15 $ / 0,60 $ par million de tokens d'entrée / de sortie
+    assert governor.cost("GPT", 1_000_000, 1_000_000) == pytest.approx(0.75)
+    assert BudgetGovernor(batch_mode=True).cost("GPT", 1_000_000, 1_000_000) == pytest.approx(0.375)
+    # Perplexity n'a pas d'API batch : pas de remise, prix par requête compris
+    assert BudgetGovernor(batch_mode=True).cost("PPLX", 0, 0) == pytest.approx(0.005)
+
+
+def test_reserve_refuses_over_cap_and_settle_records_actual_cost():
+    governor = BudgetGovernor(client_caps={"Ikea": 0.011})
+    # 100 tokens d'entrée, 800 de sortie (défaut sans historique), 0,005 $ par requête
+    costs = governor.estimate([("PPLX", "x" * 400)])
+    assert costs["PPLX"] == pytest.approx(0.0059)
+    assert governor.reserve(costs, ["Ikea"])
+    assert not governor.throttled()
+    # Requête partagée : moitié du coût pour Ikea, qui passe à 80 % de son plafond
+    assert governor.reserve(costs, ["Ikea", "But"])
+    assert not governor.reserve(costs, ["Ikea"])
+    assert governor.throttled()
+
+    actual = governor.settle(costs, ["Ikea"], [("PPLX", "x" * 400, "y" * 2000)])
+    assert governor.spent[("client", "Ikea")] == pytest.approx(actual["PPLX"])
+    assert governor.history["PPLX"] == {"tokens": 500, "n": 1}
+    # Réponse vide (erreur) : l'historique des tokens de sortie ne bouge pas
+    governor.settle(costs, ["But"], [("PPLX", "x" * 400, "")])
+    assert governor.history["PPLX"]["n"] == 1
+
+
+def test_history_round_trip():
+    history = {"GPT": {"tokens": 812.4, "n": 7}}
+    assert budget.load_history([budget.BUDGET_HEADERS] + budget.dump_history(history)) == history
@@ -0,0 +1,39 @@
+import pytest
+
+from cocitation import build_graph, citation_pairs, label_propagation, pagerank, spring_layout
+
+
+def two_cliques():
+    """Deux groupes de domaines co-cités, reliés par une arête faible"""
+    edges = [(a, b, 5) for a, b in citation_pairs(["ikea.com", "but.fr", "conforama.fr"])]
+    edges += [(a, b, 5) for a, b in citation_pairs(["ameli.fr", "tabac-info-service.fr", "vidal.fr"])]
+    edges.append(("conforama.fr", "ameli.fr", 1))
+    return build_graph(edges)
+
+
+def test_citation_pairs_sorted_without_duplicates():
+    assert citation_pairs(["b.fr", "A.fr", "b.fr", " "]) == [("a.fr", "b.fr")]
+    assert build_graph([("a", "b", 2), ("b", "a", 1)]) == {"a": {"b": 3}, "b": {"a": 3}}
+
+
+def test_pagerank_sums_to_one_and_favors_hubs():
+    adj = build_graph([("hub.fr", f"site{i}.fr", 1) for i in range(5)] + [("site0.fr", "site1.fr", 1)])
+    ranks = pagerank(adj)
+    assert sum(ranks.values()) == pytest.approx(1.0)
+    assert max(ranks, key=ranks.get) == "hub.fr"
+    assert ranks["site0.fr"] > ranks["site4.fr"]
+    assert pagerank({}) == {}
+
+
+def test_label_propagation_separates_groups():
+    clusters = label_propagation(two_cliques())
+    assert clusters["ikea.com"] == clusters["but.fr"] == clusters["conforama.fr"]
+    assert clusters["ameli.fr"] == clusters["tabac-info-service.fr"] == clusters["vidal.fr"]
+    assert clusters["ikea.com"] != clusters["ameli.fr"]
+    assert set(clusters.values()) == {0, 1}
+
+
+def test_spring_layout_only_for_shown_nodes():
+    positions = spring_layout(two_cliques(), ["ikea.com", "but.fr", "ameli.fr"])
+    assert set(positions) == {"ikea.com", "but.fr", "ameli.fr"}
+    assert spring_layout(two_cliques(), ["ikea.com", "but.fr", "ameli.fr"]) == positions
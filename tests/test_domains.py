@@ -0,0 +1,38 @@
+from domains import find_domains, registrable_domain
+from monitor import calculate_geo_score
+from prominence import ProminenceScorer
+from response_parser import parse_response
+
+
+def test_registrable_domain():
+    assert registrable_domain("https://www.ameli.fr/assure") == "ameli.fr"
+    assert registrable_domain("fr.wikipedia.org") == "wikipedia.org"
+    assert registrable_domain("sante.gouv.fr") == "sante.gouv.fr"
+    assert registrable_domain("ameli.fr.evil.com") == "evil.com"
+    assert registrable_domain("pas un domaine") == ""
+
+
+def test_find_domains_bare_hosts_and_urls():
+    text = "Voir ikea.com, (https://fr.wikipedia.org/wiki/X) et <https://a.b.fr/x>. Fin."
+    assert find_domains(text) == ("ikea.com", "wikipedia.org", "b.fr")
+
+
+def test_find_domains_markdown_link():
+    assert find_domains("[Secours populaire](https://www.secourspopulaire.fr/aide)") == ("secourspopulaire.fr",)
+
+
+def test_markdown_link_counts_for_target_score():
+    text = "Voir [IKEA](https://www.ikea.com/fr/)"
+    assert calculate_geo_score(text, "https://www.ikea.com/fr/", []) == 50
+    assert parse_response(text).mentions("ikea.com")
+    score, mentions = ProminenceScorer("https://www.ikea.com/fr/").score(text, parse_response(text))
+    assert score > 0
+    assert mentions[0].type == "cible"
+
+
+def test_find_domains_ignores_file_names_and_joined_sentences():
+    text = "Le rapport.pdf du site.ensuite compare ikea.com, www.conforama.fr et https://exemple.localhost/x."
+    assert find_domains(text) == ("ikea.com", "conforama.fr", "exemple.localhost")
+    parsed = parse_response(text + "\nSOURCES: [ikea.com]\nRECOMMANDATION: [4]\nCONCURRENT: [conforama.fr]")
+    assert not parsed.mentions("rapport.pdf") and not parsed.mentions("site.ensuite")
+    assert parsed.sources == ("exemple.localhost", "ikea.com")
@@ -0,0 +1,28 @@
+import pytest
+
+from mock_sheets import FakeClient, WorksheetNotFound, column_letters, column_number
+
+
+def test_column_letters():
+    assert [column_letters(n) for n in (1, 26, 27, 702)] == ["A", "Z", "AA", "ZZ"]
+    assert all(column_number(column_letters(n)) == n for n in range(1, 800))
+
+
+def test_worksheet_subset_of_gspread():
+    client = FakeClient({"Classeur": {"LOGS": [["Date", "Score"], ["2026-01-01", 50.0]]}})
+    sh = client.open("Classeur")
+    ws = sh.worksheet("LOGS")
+    assert ws.get_all_values() == [["Date", "Score"], ["2026-01-01", "50"]]
+
+    response = ws.append_rows([["2026-01-02", 40, "note"]])
+    assert response["updates"]["updatedRange"] == "LOGS!A3:C3"
+    ws.update("C1", [["Note"]])
+    assert ws.row_values(1) == ["Date", "Score", "Note"]
+    assert ws.get("A2:B10") == [["2026-01-01", "50"], ["2026-01-02", "40"]]
+    assert ws.col_values(3) == ["Note", "", "note"]
+
+    with pytest.raises(WorksheetNotFound):
+        sh.worksheet("ABSENTE")
+    sh.add_worksheet("NOUVELLE", rows=10, cols=3)
+    assert [w.title for w in sh.worksheets()] == ["LOGS", "NOUVELLE"]
+    assert client.calls["append_rows"] == 1 and client.calls["worksheet"] == 2
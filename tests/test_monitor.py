@@ -0,0 +1,65 @@
+import json
+
+from monitor import build_log_row, make_result
+
+
+def item(target, partners=(), keywords=()):
+    return {"client": "SPF", "query": "aide alimentaire", "target": target,
+            "partners": list(partners), "keywords": list(keywords), "frequence": "auto"}
+
+
+def test_build_log_row_uses_registrable_target_domain():
+    text = ("Le Secours populaire (https://boutique.spf.fr) aide les familles.\n\n"
+            "SOURCES: [spf.fr, restosducoeur.org]\nRECOMMANDATION: spf.fr=5, restosducoeur.org=3\nCONCURRENT: [restosducoeur.org]")
+    row = build_log_row(item("https://boutique.spf.fr"), {"PPLX": [make_result(text)]})
+    assert row["Score_PPLX"] == 50
+    assert row["Note_Recommandation"] == 5
+    assert json.loads(row["Stats_Echantillons"])["PPLX"]["p_citation"] == 1.0
+
+
+def delta_row(text, date):
+    return {"Client": "SPF", "Mot_Cle": "aide alimentaire", "Date": date, "Texte_PPLX": text}
+
+
+def test_delta_storage_keeps_fingerprint_of_stored_text():
+    import monitor
+    base = "Le Secours populaire aide les familles en difficulté partout en France. " * 5
+    state = {}
+    assert monitor.apply_delta_storage(delta_row(base, "2026-01-01 09:00:00"), ["PPLX"], state, 2) == 0
+    stored = dict(state[("SPF", "aide alimentaire", "PPLX")])
+
+    drifted = base.replace("partout", "un peu partout", 1)
+    row = delta_row(drifted, "2026-01-02 09:00:00")
+    assert monitor.apply_delta_storage(row, ["PPLX"], state, 3) == 1
+    assert row["Texte_PPLX"] == monitor.make_ref(2)
+    kept = state[("SPF", "aide alimentaire", "PPLX")]
+    assert {k: kept[k] for k in ("hash", "simhash", "sources", "ligne")} == \
+        {k: stored[k] for k in ("hash", "simhash", "sources", "ligne")}
+    assert kept["date"] == "2026-01-02 09:00:00"
+
+
+def test_delta_storage_compares_with_stored_text_not_last_reference(monkeypatch):
+    import monitor
+    state = {("SPF", "aide alimentaire", "PPLX"): {"hash": "h0", "simhash": "0", "sources": "", "ligne": 2, "date": "d0"}}
+    compared = []
+
+    def same(fp, previous):
+        compared.append(previous["hash"])
+        return True
+    monkeypatch.setattr(monitor, "is_same_answer", same)
+    for day, text in enumerate(["version 1", "version 2", "version 3"]):
+        monitor.apply_delta_storage(delta_row(text, f"d{day + 1}"), ["PPLX"], state, 10 + day)
+    assert compared == ["h0", "h0", "h0"]
+
+
+def test_load_targets_fills_from_registry_only_when_given():
+    from clients import build_registry
+    from monitor import load_targets
+    values = [["Client", "Mot_Cle", "URL_Cible", "URLs_Partenaires", "Mots_Signatures"],
+              ["SPF", "aide alimentaire", "secourspopulaire.fr", "", ""]]
+    registry = build_registry({"clients": {"SPF": {"urls_partenaires": ["restosducoeur.org"],
+                                                   "mots_signatures": ["solidarité"]}}}, values)
+    plain = load_targets(values)[0]
+    assert (plain["partners"], plain["keywords"]) == ([], [])
+    filled = load_targets(values, registry)[0]
+    assert (filled["partners"], filled["keywords"]) == (["restosducoeur.org"], ["solidarité"])
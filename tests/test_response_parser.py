@@ -0,0 +1,47 @@
+from response_parser import EMPTY, parse_response, parse_structured
+
+
+def test_trailer_fields():
+    text = ("Consultez https://www.ikea.com/fr/ et conforama.fr.\n\n"
+            "SOURCES: [ikea.com, but.fr, Wikipédia]\nRECOMMANDATION: [4]\nCONCURRENT: [conforama.fr, but.fr]")
+    parsed = parse_response(text)
+    assert parsed.format_ok
+    assert parsed.sources == ("ikea.com", "but.fr", "Wikipédia")
+    assert parsed.classement == ("ikea.com", "but.fr", "Wikipédia")
+    assert parsed.recommandation == 4
+    assert parsed.concurrent == "conforama.fr"
+    assert parsed.mentions("conforama.fr") and not parsed.mentions("darty.com")
+
+
+def test_shared_prompt_notes():
+    parsed = parse_response("Texte.\nSOURCES: [a.fr]\nRECOMMANDATION: www.ikea.com=5, but.fr=2\nCONCURRENT: N/A")
+    assert parsed.notes == (("ikea.com", 5), ("but.fr", 2))
+    assert parsed.recommendation_for("ikea.com") == 5
+    assert parsed.recommendation_for("darty.com") == 1
+
+
+def test_missing_trailer_uses_defaults():
+    parsed = parse_response("Une réponse sans bloc final.")
+    assert not parsed.format_ok
+    assert parsed.recommendation_for("ikea.com") == 3
+    assert parsed.concurrent == "N/A"
+    assert parse_response("") is EMPTY
+
+
+def test_structured_output_and_fallback():
+    raw = '```json\n{"reponse": "Voir ikea.com.", "sources": ["ikea.com"], "concurrent": "but.fr", "recommandation": 5}\n```'
+    text, parsed = parse_structured(raw)
+    assert parsed.structure == "json"
+    assert text.endswith("CONCURRENT: [but.fr]")
+    assert (parsed.recommandation, parsed.sources) == (5, ("ikea.com",))
+
+    raw = '{"reponse": "Voir ikea.com.", "sources": ["ikea.com"], "concurrent": "but.fr", "recommandation": 9}'
+    text, parsed = parse_structured(raw)
+    assert (text, parsed.structure) == (raw, "json_invalide")
+
+
+def test_shared_notes_with_leading_digit_domain():
+    parsed = parse_response("Texte.\nSOURCES: [01net.com]\nRECOMMANDATION: [01net.com=4, a.fr=2]\nCONCURRENT: N/A")
+    assert parsed.recommandation is None
+    assert parsed.notes == (("01net.com", 4), ("a.fr", 2))
+    assert parsed.recommendation_for("01net.com") == 4
@@ -0,0 +1,73 @@
+import monitor
+from mock_sheets import FakeClient
+from storage import decode_text, parse_ref
+
+CLASSEUR = "GEO-Radar_DATA"
+CONFIG = [
+    ["Client", "Mot_Cle", "URL_Cible", "URLs_Partenaires", "Mots_Signatures"],
+    ["Référence", "guide achat canapé", "https://www.exemple-reference.fr", "", ""],
+    ["Absent", "guide achat canapé", "absent.fr", "", ""],
+    ["Absent", "meilleur matelas", "absent.fr", "wikipedia.org", ""],
+]
+
+
+def fake_client():
+    return FakeClient({CLASSEUR: {"CONFIG_CIBLES": CONFIG, "LOGS_RESULTATS": []}})
+
+def scan(client):
+    """Scan complet ; lignes de LOGS_RESULTATS en dicts (toutes, scans précédents compris)"""
+    monitor.main(client)
+    rows = client.workbooks[CLASSEUR].sheets["LOGS_RESULTATS"].rows
+    return [dict(zip(rows[0], row)) for row in rows[1:]]
+
+
+def test_scan_writes_one_row_per_config_line(mock_engines):
+    client = fake_client()
+    logs = scan(client)
+    assert [(r["Client"], r["Mot_Cle"], r["URL_Cible"]) for r in logs] == [tuple(row[:3]) for row in CONFIG[1:]]
+    # Réponse simulée : cible citée (50), partenaire seul cité (10), ni l'un ni l'autre (0)
+    assert [r["Score_Global"] for r in logs] == ["50", "0", "10"]
+    for row in logs:
+        assert {row[f"Score_{code}"] for code in monitor.ENGINES} == {row["Score_Global"]}
+        assert all("exemple-reference.fr" in row[f"Texte_{code}"] for code in monitor.ENGINES)
+        assert row["Concurrent_Principal"] == "comparateur-demo.com"
+    # Requête partagée entre deux clients : un seul appel par moteur
+    assert mock_engines.state.stats()["appels"] == 2 * len(monitor.ENGINES)
+    assert "METADONNEES" in client.workbooks[CLASSEUR].sheets
+
+
+def test_scan_in_batch_mode_polls_jobs(mock_engines, monkeypatch):
+    monkeypatch.setenv("GEO_BATCH_MODE", "1")
+    logs = scan(fake_client())
+    assert [r["Score_Global"] for r in logs] == ["50", "0", "10"]
+    # Perplexity sans API batch : en ligne ; OpenAI et Gemini : une requête par (requête, moteur) dans les batchs
+    assert mock_engines.state.stats()["par_route"] == {"chat": 2, "batch": 4}
+
+
+def test_second_scan_stores_references_and_compressed_text(mock_engines, monkeypatch):
+    monkeypatch.setenv("GEO_DELTA_STORAGE", "1")
+    monkeypatch.setenv("GEO_COMPRESSION", "1")
+    client = fake_client()
+    first = scan(client)
+    second = scan(client)[len(first):]
+    assert len(second) == len(first)
+    for i, (row, previous) in enumerate(zip(second, first)):
+        assert row["Score_Global"] == previous["Score_Global"]
+        for code in monitor.ENGINES:
+            # Ligne 1 : en-têtes ; la i-ème ligne du premier scan est la ligne i + 2 de la feuille
+            assert parse_ref(row[f"Texte_{code}"]) == i + 2
+            assert "exemple-reference.fr" in decode_text(previous[f"Texte_{code}"])
+
+
+def test_registry_fill_in_only_with_setting(mock_engines, monkeypatch):
+    import clients
+
+    def no_registry(*args, **kwargs):
+        raise AssertionError("registre construit sans GEO_REGISTRE_COMPLETE")
+    with monkeypatch.context() as patch:
+        patch.setattr(clients, "get_registry", no_registry)
+        assert [r["Score_Global"] for r in scan(fake_client())] == ["50", "0", "10"]
+
+    # Partenaire wikipedia.org de la fiche "Absent" (3e ligne) repris sur sa ligne sans partenaire
+    monkeypatch.setenv("GEO_REGISTRE_COMPLETE", "1")
+    assert [r["Score_Global"] for r in scan(fake_client())] == ["50", "10", "10"]
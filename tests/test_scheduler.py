@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import scheduler
+
+NOW = datetime(2026, 3, 1, 9)
+
+
+def item(query, client="Ikea", frequence=scheduler.AUTO):
+    return {"client": client, "query": query, "frequence": frequence}
+
+
+def test_parse_frequency():
+    assert scheduler.parse_frequency("Hebdo") == "hebdo"
+    assert scheduler.parse_frequency("2,5") == 2.5
+    assert scheduler.parse_frequency("") == scheduler.AUTO
+    assert scheduler.parse_frequency("-1") == scheduler.AUTO
+
+
+def test_adaptive_tier_follows_volatility():
+    state = {}
+    stable, volatile = item("canapé"), item("matelas")
+    for day, (a, b) in enumerate([(50, 20), (50, 60), (51, 25), (50, 70), (50, 30)]):
+        scheduler.record(state, stable, a, NOW + timedelta(days=day))
+        scheduler.record(state, volatile, b, NOW + timedelta(days=day))
+    assert state[("Ikea", "canapé")]["palier"] == "mensuel"
+    assert state[("Ikea", "matelas")]["palier"] == "quotidien"
+    # Moins de MIN_OBSERVATIONS scans : quotidien quelle que soit la volatilité
+    assert scheduler.adaptive_tier({"n": 2, "volatilite": 0.0}) == "quotidien"
+
+
+def test_queue_keeps_due_queries_within_budget():
+    items = [item("jamais scannée"), item("en retard"), item("à jour"), item("en retard", client="But")]
+    state = {}
+    scheduler.record(state, items[1], 50, NOW - timedelta(days=3))
+    scheduler.record(state, items[3], 50, NOW - timedelta(days=3))
+    scheduler.record(state, items[2], 50, NOW - timedelta(hours=2))
+
+    queue, report = scheduler.build_queue(items, state, NOW, calls_per_query=3)
+    assert [i["query"] for i in queue] == ["jamais scannée", "en retard", "en retard"]
+    # Requête partagée entre Ikea et But : payée une fois ; "à jour" a été scannée aujourd'hui
+    assert report["appels"] == 6
+
+    queue, report = scheduler.build_queue(items, state, NOW, calls_per_query=3, budget=6)
+    assert [i["query"] for i in queue] == ["jamais scannée"]
+    assert (report["reportees"], report["budget"]) == (2, 0)
+
+
+def test_state_round_trip():
+    state = {}
+    scheduler.record(state, item("canapé", frequence="hebdo"), 42, NOW)
+    values = [scheduler.PLANIFICATION_HEADERS] + scheduler.dump_state(state)
+    assert scheduler.load_state(values) == state
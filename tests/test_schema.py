@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from schema import TEXT_DTYPE, apply_schema
+
+
+def raw_frame():
+    return pd.DataFrame({
+        "Timestamp": ["2026-01-01 09:00:00", "01/02/2026"],
+        "Client": ["Ikea", "Ikea"],
+        "Score_Global": ["50", "x"],
+        "Note_Recommandation": ["4", ""],
+        "Texte_PPLX": ["réponse A", "réponse B"],
+        "Sources_Detectees": ["PPLX:ikea.com", ""],
+    }, dtype=object)
+
+
+def test_apply_schema_types():
+    df = apply_schema(raw_frame())
+    assert pd.api.types.is_datetime64_any_dtype(df["Timestamp"]) and df["Timestamp"].notna().all()
+    assert isinstance(df["Client"].dtype, pd.CategoricalDtype)
+    assert df["Score_Global"].tolist() == [50, 0] and df["Score_Global"].dtype == "int16"
+    assert df["Note_Recommandation"].dtype == "Int8" and df["Note_Recommandation"].isna().tolist() == [False, True]
+
+
+@pytest.mark.skipif(TEXT_DTYPE is None, reason="pyarrow absent")
+def test_long_text_columns_are_arrow_strings_after_concat():
+    df = apply_schema(raw_frame())
+    merged = apply_schema(pd.concat([df, apply_schema(raw_frame())], ignore_index=True))
+    for col in ("Texte_PPLX", "Sources_Detectees"):
+        assert merged[col].dtype == TEXT_DTYPE
+    assert isinstance(merged["Client"].dtype, pd.CategoricalDtype)
+    assert apply_schema(merged) is merged
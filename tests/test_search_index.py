@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import search_index
+
+
+def parse_sources(value, codes):
+    result = {}
+    for part in str(value or "").split("|"):
+        code, _, sources = part.partition(":")
+        result[code] = [s for s in sources.split(",") if s]
+    return result
+
+
+def logs(rows):
+    """LOGS_RESULTATS minimal : (date, client, requête, texte, sources)"""
+    return pd.DataFrame({
+        "Timestamp": pd.to_datetime([r[0] for r in rows]),
+        "Client": [r[1] for r in rows],
+        "Mot_Cle": [r[2] for r in rows],
+        "Score_PPLX": [50] * len(rows),
+        "Texte_PPLX": [r[3] for r in rows],
+        "Sources_Detectees": [f"PPLX:{r[4]}" for r in rows],
+    })
+
+
+ROWS = [
+    ("2026-01-01 09:00:00", "Ikea", "canapé", "Ikea vend des canapés convertibles.", "ikea.com,but.fr"),
+    ("2026-01-01 09:00:00", "SPF", "aide alimentaire", "Le Secours populaire distribue des colis.", "secourspopulaire.fr"),
+    ("2026-01-02 09:00:00", "Ikea", "canapé", "Ikea vend des canapés convertibles. Conforama aussi.", "ikea.com,conforama.fr"),
+    ("2026-01-03 09:00:00", "Ikea", "matelas", "", ""),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return str(tmp_path / "search.db")
+
+
+def test_sync_is_incremental(index):
+    assert search_index.sync_index(logs(ROWS[:2]), ["PPLX"], parse_sources, index) == 2
+    assert search_index.sync_index(logs(ROWS[:2]), ["PPLX"], parse_sources, index) == 0
+    # Réponse vide non indexée
+    assert search_index.sync_index(logs(ROWS), ["PPLX"], parse_sources, index) == 1
+    # Feuille raccourcie : index reconstruit
+    assert search_index.sync_index(logs(ROWS[:1]), ["PPLX"], parse_sources, index) == 1
+
+
+def test_search_filters_and_pages_newest_first(index):
+    search_index.sync_index(logs(ROWS), ["PPLX"], parse_sources, index)
+    total, page = search_index.search(termes="canapes", path=index)
+    assert total == 2 and page["ligne"].tolist() == [4, 2]
+    total, page = search_index.search(termes="canapés", page=2, par_page=1, path=index)
+    assert total == 2 and page["ligne"].tolist() == [2]
+    assert search_index.search(phrase="colis", client="SPF", path=index)[0] == 1
+    assert search_index.search(domaine="conforama.fr", path=index)[1]["ligne"].tolist() == [4]
+    assert search_index.search(date_min="2026-01-02", date_max="2026-01-02", path=index)[0] == 1
+    assert search_index.search(termes="canapés", moteur="GEM", path=index)[0] == 0
+
+
+def test_search_count_and_paging_are_capped(index, monkeypatch):
+    search_index.sync_index(logs(ROWS), ["PPLX"], parse_sources, index)
+    monkeypatch.setattr(search_index, "MAX_RESULTATS", 2)
+    total, page = search_index.search(page=9, par_page=1, path=index)
+    assert total == 2 and page["ligne"].tolist() == [3]
+
+
+def test_diff_maps_sheet_row_to_previous_answer(index):
+    # Deux synchronisations : la réponse précédente est retrouvée via la table dernieres
+    search_index.sync_index(logs(ROWS[:2]), ["PPLX"], parse_sources, index)
+    search_index.sync_index(logs(ROWS), ["PPLX"], parse_sources, index)
+    assert search_index.get_diff(2, "PPLX", index) is None
+    assert search_index.get_diff(3, "PPLX", index) is None
+    diff = search_index.get_diff(4, "PPLX", index)
+    assert diff["ajouts"] == ["Conforama aussi."] and diff["suppressions"] == []
+    assert diff["sources_ajoutees"] == ["conforama.fr"] and diff["sources_supprimees"] == ["but.fr"]
+    assert diff["date_precedente"].startswith("2026-01-01")
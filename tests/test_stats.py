@@ -0,0 +1,32 @@
+import pytest
+
+from stats import mean_variance, parse_stats, summarize_samples, wilson_interval
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 0.0)
+    low, high = wilson_interval(5, 10)
+    assert low == pytest.approx(0.2366, abs=1e-4) and high == pytest.approx(0.7634, abs=1e-4)
+    # Bornes dans [0, 1] même pour 0 ou n succès, intervalle non dégénéré sur petit échantillon
+    low, high = wilson_interval(3, 3)
+    assert high == 1.0 and 0.4 < low < 0.5
+    assert wilson_interval(0, 3)[0] == 0.0
+
+
+def test_summarize_samples():
+    stats = summarize_samples([40, 50, 60], [True, True, False])
+    assert (stats["n"], stats["moyenne"], stats["variance"]) == (3, 50.0, 100.0)
+    assert (stats["ic_bas"], stats["ic_haut"]) == (38.68, 61.32)
+    assert stats["p_citation"] == 0.667
+    assert stats["p_ic_bas"] < stats["p_citation"] < stats["p_ic_haut"]
+
+    single = summarize_samples([80], [True])
+    assert single["variance"] == 0.0 and single["ic_bas"] == single["ic_haut"] == 80.0
+    assert summarize_samples([], [])["n"] == 0
+
+
+def test_parse_stats_and_mean_variance():
+    cell = '{"PPLX": {"n": 4, "variance": 16}, "GEM": {"n": 2, "variance": 8}}'
+    stats = parse_stats(cell)
+    assert mean_variance(stats, ["PPLX", "GEM", "GPT"]) == pytest.approx((16 / 4 + 8 / 2) / 4)
+    assert parse_stats("") == {} and parse_stats("[1, 2]") == {} and parse_stats("pas du json") == {}
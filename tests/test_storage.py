@@ -0,0 +1,42 @@
+import pandas as pd
+
+from storage import (MAX_CELL_CHARS, decode_text, encode_text, fingerprint, is_same_answer, make_ref,
+                     parse_ref, resolve_text_refs)
+
+ANSWER = ("Pour arrêter de fumer, Tabac Info Service propose un accompagnement gratuit par des tabacologues. "
+          "Les substituts nicotiniques sont remboursés par l'Assurance Maladie. ") * 8
+
+
+def test_fingerprint_tolerates_small_edits_only():
+    fp = fingerprint(ANSWER, ["tabac-info-service.fr", "ameli.fr"])
+    assert is_same_answer(fingerprint(ANSWER.upper(), ["ameli.fr", "tabac-info-service.fr"]), fp)
+    assert is_same_answer(fingerprint(ANSWER.replace("gratuit", "gratuit et", 1), ["ameli.fr", "tabac-info-service.fr"]), fp)
+    assert not is_same_answer(fingerprint(ANSWER, ["ameli.fr"]), fp)
+    assert not is_same_answer(fingerprint("Une tout autre réponse sur les cigarettes électroniques.", ["ameli.fr", "tabac-info-service.fr"]), fp)
+
+
+def test_references_resolve_to_stored_text():
+    assert parse_ref(make_ref(12)) == 12
+    assert parse_ref("texte") is None
+    df = pd.DataFrame({"Texte_PPLX": ["réponse A", make_ref(2), "réponse B", make_ref(4), make_ref(99)],
+                       "Texte_GEM": ["a", "b", "c", "d", "e"]})
+    resolved = resolve_text_refs(df)
+    assert resolved["Texte_PPLX"].tolist() == ["réponse A", "réponse A", "réponse B", "réponse B", ""]
+    assert resolved["Texte_GEM"].tolist() == ["a", "b", "c", "d", "e"]
+
+
+def test_compression_round_trip():
+    encoded = encode_text(ANSWER)
+    assert encoded.startswith("Z") and len(encoded) < len(ANSWER)
+    assert decode_text(encoded) == ANSWER
+    assert encode_text("court") == "court"
+    assert decode_text("texte en clair") == "texte en clair"
+
+
+def test_compression_fits_in_a_cell():
+    import random
+    rng = random.Random(0)
+    text = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(200000))
+    encoded = encode_text(text)
+    assert len(encoded) <= MAX_CELL_CHARS
+    assert text.startswith(decode_text(encoded))
@@ -0,0 +1,35 @@
+from streaming import StreamCollector, iter_sse, move_header_to_end
+
+
+def test_collector_cuts_at_character_budget():
+    collector = StreamCollector(max_chars=10)
+    assert collector.ttft is None
+    assert collector.feed("")
+    assert collector.ttft is None
+    assert collector.feed("abcd")
+    assert collector.ttft is not None
+    assert not collector.feed("efghijkl")
+    collector.close()
+    assert (collector.text, collector.tronque) == ("abcdefghij", True)
+    assert collector.duree >= collector.ttft
+
+
+def test_collector_without_budget():
+    collector = StreamCollector(max_chars=0)
+    assert all(collector.feed("x" * 1000) for _ in range(10))
+    assert collector.length == 10000 and not collector.tronque
+
+
+def test_move_header_to_end():
+    text = "SOURCES: [ikea.com]\nRECOMMANDATION: [4]\nCONCURRENT: [but.fr]\n\nIkea propose des canapés."
+    assert move_header_to_end(text) == "Ikea propose des canapés.\n\nSOURCES: [ikea.com]\nRECOMMANDATION: [4]\nCONCURRENT: [but.fr]"
+    assert move_header_to_end("Pas de bloc.\nSOURCES: [a.fr]") == "Pas de bloc.\nSOURCES: [a.fr]"
+    # Réponse coupée juste après le bloc : le bloc seul est conservé
+    assert move_header_to_end("**SOURCES:** [a.fr]\n") == "**SOURCES:** [a.fr]"
+
+
+def test_iter_sse_stops_at_done():
+    class Response:
+        def iter_lines(self):
+            return iter([b": ping", b'data: {"a": 1}', b"data: pas du json", "data: {\"é\": 2}".encode(), b"data: [DONE]", b'data: {"a": 3}'])
+    assert list(iter_sse(Response())) == [{"a": 1}, {"é": 2}]
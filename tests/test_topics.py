@@ -0,0 +1,26 @@
+from topics import AUTRES, cluster_keywords, synthetic_keywords
+
+
+def test_cluster_keywords_groups_close_queries():
+    topics = cluster_keywords([
+        "meilleur canapé convertible", "canapé convertible pas cher", "avis canapé convertible",
+        "patch nicotine remboursé", "patch nicotine avis", "prix patch nicotine",
+        "recette de crêpes", "", "avis canapé convertible",
+    ])
+    assert topics == {
+        "avis canapé convertible": "canapé convertible",
+        "canapé convertible pas cher": "canapé convertible",
+        "meilleur canapé convertible": "canapé convertible",
+        "patch nicotine avis": "patch nicotine",
+        "patch nicotine remboursé": "patch nicotine",
+        "prix patch nicotine": "patch nicotine",
+        "recette de crêpes": AUTRES,
+    }
+    assert cluster_keywords([]) == {}
+
+
+def test_cluster_keywords_scales_to_synthetic_set():
+    keywords = synthetic_keywords(500)
+    topics = cluster_keywords(keywords)
+    assert set(topics) == set(keywords)
+    assert len(set(topics.values())) < len(keywords) // 5
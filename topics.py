@@ -0,0 +1,240 @@
+"""
+Regroupement des requêtes suivies (Mot_Cle) en thèmes, hors ligne et sur CPU.
+
+- Vecteurs TF-IDF : mots et trigrammes de caractères de chaque mot (les variantes
+  "canapé" / "canapés" se rapprochent), accents et mots vides retirés. Les termes sont
+  projetés par hachage signé sur N_COLONNES colonnes : matrice dense float32 compacte,
+  sans vocabulaire à conserver.
+- Similarité cosinus vectorisée (produit matriciel numpy par blocs de lignes) : on ne
+  garde que les K_VOISINS plus proches voisins au-dessus de SEUIL_SIMILARITE.
+- Thèmes : regroupement glouton autour des requêtes les plus centrales (somme des
+  similarités) ; chaque membre est un voisin direct du centre, sans effet de chaîne.
+  Libellé = mots les plus lourds du thème. Une requête sans voisin va dans "Autres".
+
+Le résultat ne dépend que de l'ensemble des requêtes : le tableau de bord le met en cache
+sur cet ensemble et ne recalcule les thèmes que lorsqu'une nouvelle requête apparaît.
+
+Banc d'essai : python topics.py --requetes 5000
+"""
+import argparse
+import random
+import re
+import time
+import unicodedata
+import zlib
+from collections import Counter
+
+import numpy as np
+
+N_COLONNES = 2 ** 10
+K_VOISINS = 10
+SEUIL_SIMILARITE = 0.35
+TAILLE_BLOC = 1024
+AUTRES = "Autres"
+
+MOTS_VIDES = set("""
+a au aux avec ce ces comment dans de des du en est et il la le les leur mon ma mes ne ou par pas
+pour qu que qui quel quelle quels quelles quoi sa se ses son sur ta te tes ton un une vos votre
+d l j n s c y faut peut plus moins tres bien
+""".split())
+
+_MOT = re.compile(r"\w+", re.UNICODE)
+
+
+def _strip_accents(text):
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+def normalize_keyword(keyword):
+    """Mots d'une requête : minuscules, sans accents, sans mots vides"""
+    words = (_strip_accents(w) for w in _MOT.findall(str(keyword).lower()))
+    return [w for w in words if w not in MOTS_VIDES and (len(w) > 1 or w.isdigit())]
+
+def surface_forms(keywords):
+    """Graphie la plus fréquente (accents compris) de chaque mot normalisé, pour les libellés"""
+    forms = {}
+    for keyword in keywords:
+        for word in _MOT.findall(str(keyword).lower()):
+            forms.setdefault(_strip_accents(word), Counter())[word] += 1
+    return {norm: counts.most_common(1)[0][0] for norm, counts in forms.items()}
+
+def keyword_terms(words):
+    """Termes d'une requête : mots ("w:") et trigrammes de caractères bornés par mot ("c:")"""
+    terms = [f"w:{w}" for w in words]
+    for w in words:
+        padded = f" {w} "
+        terms.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return terms
+
+def _bucket(term):
+    """Colonne et signe d'un terme (crc32 : stable d'une exécution à l'autre)"""
+    h = zlib.crc32(term.encode("utf-8"))
+    return h % N_COLONNES, 1.0 if (h >> 31) & 1 else -1.0
+
+
+# =============================================================================
+# 1. VECTEURS ET VOISINS
+# =============================================================================
+def tfidf_matrix(keywords):
+    """
+    Matrice TF-IDF normalisée (une ligne par requête) et poids IDF des mots.
+    TF sous-linéaire (1 + log), IDF lissé, lignes de norme 1 : X @ X.T = cosinus.
+    Seuls les termes présents dans au moins deux requêtes sont projetés (les autres ne
+    rapprochent aucune paire) ; ils comptent néanmoins dans la norme de chaque ligne.
+    """
+    words = [normalize_keyword(k) for k in keywords]
+    n = len(keywords)
+    # Entrées creuses (requête, terme, fréquence)
+    ids, rows, term_ids, tf = {}, [], [], []
+    for i, w in enumerate(words):
+        for term, count in Counter(keyword_terms(w)).items():
+            rows.append(i)
+            term_ids.append(ids.setdefault(term, len(ids)))
+            tf.append(count)
+    rows = np.asarray(rows, dtype=np.int64)
+    term_ids = np.asarray(term_ids, dtype=np.int64)
+    tf = np.asarray(tf, dtype=float)
+
+    df = np.bincount(term_ids, minlength=len(ids))
+    idf = np.log((1 + n) / (1 + df)) + 1
+    weights = (1 + np.log(tf)) * idf[term_ids]
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+    norms[norms == 0] = 1
+
+    buckets = np.array([_bucket(term) for term in ids]).reshape(-1, 2)
+    shared = df[term_ids] > 1
+    cells = rows[shared] * N_COLONNES + buckets[term_ids[shared], 0].astype(np.int64)
+    values = buckets[term_ids[shared], 1] * weights[shared] / norms[rows[shared]]
+    matrix = np.bincount(cells, weights=values, minlength=n * N_COLONNES).reshape(n, N_COLONNES).astype(np.float32)
+    word_idf = {term[2:]: idf[i] for term, i in ids.items() if term.startswith("w:")}
+    return matrix, words, word_idf
+
+def nearest_neighbors(matrix, k=K_VOISINS, threshold=SEUIL_SIMILARITE, block=TAILLE_BLOC):
+    """
+    Graphe des k plus proches voisins (cosinus >= seuil), sous forme d'adjacence creuse
+    {i: {j: similarité}} symétrique. Similarités calculées par blocs de lignes : la
+    mémoire reste en bloc x n, jamais n x n.
+    """
+    n = len(matrix)
+    adj = {}
+    k = min(k, n - 1)
+    if k <= 0:
+        return adj
+    for start in range(0, n, block):
+        sims = matrix[start:start + block] @ matrix.T
+        local = np.arange(len(sims))
+        sims[local, start + local] = -1
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = sims[local[:, None], top]
+        for i, j in zip(*np.nonzero(top_sims >= threshold)):
+            a, b, w = start + int(i), int(top[i, j]), float(top_sims[i, j])
+            adj.setdefault(a, {})[b] = w
+            adj.setdefault(b, {})[a] = w
+    return adj
+
+
+# =============================================================================
+# 2. THÈMES
+# =============================================================================
+def group_neighbors(adj):
+    """
+    Groupes du graphe des voisins : {nœud: n° de groupe}. Les nœuds les plus centraux
+    deviennent centres et prennent leurs voisins encore libres ; un centre resté seul
+    rejoint le groupe de son voisin le plus proche.
+    """
+    strength = {node: sum(nbrs.values()) for node, nbrs in adj.items()}
+    groups = {}
+    for node in sorted(adj, key=lambda v: (-strength[v], v)):
+        if node in groups:
+            continue
+        free = [nbr for nbr in adj[node] if nbr not in groups]
+        if not free:
+            nearest = max(adj[node], key=lambda nbr: (adj[node][nbr], -nbr))
+            groups[node] = groups[nearest]
+            continue
+        groups[node] = node
+        for nbr in free:
+            groups[nbr] = node
+    return groups
+
+def topic_label(members, words, word_idf, forms, size=2):
+    """
+    Libellé d'un thème : mots présents dans le plus de requêtes du thème (pondérés par
+    l'IDF), dans l'ordre où ils apparaissent dans la requête la plus représentative
+    """
+    presence = Counter(w for i in members for w in set(words[i]))
+    ranked = sorted(presence, key=lambda w: (-presence[w] * word_idf.get(w, 1), w))
+    # Mots suivants retenus seulement s'ils figurent dans au moins la moitié des requêtes
+    top = ranked[:1] + [w for w in ranked[1:size] if presence[w] * 2 >= len(members)]
+    if not top:
+        return AUTRES
+    typical = words[min(members, key=lambda i: (-len(set(top) & set(words[i])), len(words[i])))]
+    top.sort(key=lambda w: typical.index(w) if w in typical else len(typical))
+    return " ".join(forms.get(w, w) for w in top)
+
+def cluster_keywords(keywords):
+    """
+    Thème de chaque requête : {requête: libellé}. Les requêtes sans voisin assez proche
+    sont regroupées sous "Autres". Entrées identiques ou vides acceptées.
+    """
+    keywords = sorted({str(k) for k in keywords if str(k).strip()})
+    if not keywords:
+        return {}
+    matrix, words, word_idf = tfidf_matrix(keywords)
+    communities = group_neighbors(nearest_neighbors(matrix))
+    forms = surface_forms(keywords)
+
+    members = {}
+    for node, community in communities.items():
+        members.setdefault(community, []).append(node)
+    topics = {kw: AUTRES for kw in keywords}
+    labels = Counter()
+    for community in sorted(members, key=lambda c: (-len(members[c]), c)):
+        nodes = members[community]
+        if len(nodes) < 2:
+            continue
+        label = topic_label(nodes, words, word_idf, forms)
+        labels[label] += 1
+        # Deux thèmes distincts au même libellé : numérotés pour rester séparés
+        if labels[label] > 1:
+            label = f"{label} ({labels[label]})"
+        for node in nodes:
+            topics[keywords[node]] = label
+    return topics
+
+
+# =============================================================================
+# BANC D'ESSAI
+# =============================================================================
+def synthetic_keywords(count, seed=42):
+    """Requêtes synthétiques : produits x intentions x qualificatifs"""
+    rng = random.Random(seed)
+    produits = ["canapé convertible", "canapé d'angle", "matelas mémoire de forme", "matelas ressorts",
+                "lave-linge hublot", "réfrigérateur américain", "table à manger", "armoire penderie",
+                "lit coffre", "bureau enfant", "chaise de bureau", "meuble tv", "cuisine équipée",
+                "plan de travail", "arrêter de fumer", "patch nicotine", "cigarette électronique",
+                "sevrage tabagique", "aide arrêt tabac", "tabacologue"]
+    intentions = ["meilleur", "pas cher", "avis", "comparatif", "où acheter", "promo", "livraison rapide",
+                  "comment choisir", "quel", "prix", "soldes", "test", "conseils", "gratuit"]
+    qualificatifs = ["", "2026", "paris", "lyon", "en ligne", "petit espace", "famille", "qualité", "design",
+                     "pour débutant", "rapide", "durable", "remboursé", "sans engagement"]
+    keywords = set()
+    while len(keywords) < count:
+        keywords.add(" ".join(p for p in (rng.choice(intentions), rng.choice(produits), rng.choice(qualificatifs),
+                                          str(rng.randrange(count))) if p))
+    return sorted(keywords)
+
+def benchmark(count):
+    keywords = synthetic_keywords(count)
+    start = time.perf_counter()
+    topics = cluster_keywords(keywords)
+    duree = time.perf_counter() - start
+    sizes = Counter(topics.values())
+    print(f"🧩 {len(keywords)} requêtes -> {len(sizes)} thèmes en {duree:.2f} s")
+    for label, size in sizes.most_common(12):
+        print(f"   {size:5d}  {label}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regroupement des requêtes GEO-Radar en thèmes")
+    parser.add_argument("--requetes", type=int, default=5000)
+    args = parser.parse_args()
+    benchmark(args.requetes)